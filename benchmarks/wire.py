@@ -0,0 +1,106 @@
+"""Encode/decode cost of large `ReferenceResponse` payloads per wire format.
+
+Compares the previous path (`model_dump` + stdlib json on one side, `json.loads`
++ `model_validate` on the other) with the single-pass JSON and msgpack paths in
+`lsp_cli.utils.http`.
+
+    uv run python benchmarks/wire.py [--items 5000] [--context-lines 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from lsap.schema.locate import Locate, SymbolScope
+from lsap.schema.models import Location, Position, Range
+from lsap.schema.reference import ReferenceItem, ReferenceRequest, ReferenceResponse
+
+from lsp_cli.utils.http import (
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    decode_model,
+    encode_model,
+)
+
+
+def make_response(items: int, context_lines: int) -> ReferenceResponse:
+    file_path = Path("/project/src/app/service.py")
+    req = ReferenceRequest(
+        locate=Locate(file_path=file_path, scope=SymbolScope(symbol_path=["Service"]))
+    )
+    code = "\n".join(
+        f"    result_{i} = service.handle(request, retries={i})"
+        for i in range(2 * context_lines + 1)
+    )
+    return ReferenceResponse(
+        request=req,
+        items=[
+            ReferenceItem(
+                location=Location(
+                    file_path=Path(f"/project/src/app/module_{i % 200}.py"),
+                    range=Range(
+                        start=Position(line=i + 1, character=5),
+                        end=Position(line=i + 1, character=12),
+                    ),
+                ),
+                code=code,
+            )
+            for i in range(items)
+        ],
+        start_index=0,
+        total=items,
+        has_more=False,
+    )
+
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--context-lines", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    resp = make_response(args.items, args.context_lines)
+    legacy = json.dumps(resp.model_dump(mode="json")).encode()
+    formats: dict[str, tuple[Callable[[], bytes], Callable[[bytes], object]]] = {
+        "legacy": (
+            lambda: json.dumps(resp.model_dump(mode="json")).encode(),
+            lambda data: ReferenceResponse.model_validate(json.loads(data)),
+        ),
+        "json": (
+            lambda: encode_model(resp, JSON_MEDIA_TYPE),
+            lambda data: decode_model(ReferenceResponse, data, JSON_MEDIA_TYPE),
+        ),
+        "msgpack": (
+            lambda: encode_model(resp, MSGPACK_MEDIA_TYPE),
+            lambda data: decode_model(ReferenceResponse, data, MSGPACK_MEDIA_TYPE),
+        ),
+    }
+
+    print(f"{args.items} references, {len(legacy) / 1e6:.1f} MB as JSON")
+    print(f"{'format':<10} {'encode ms':>10} {'decode ms':>10} {'size MB':>8}")
+    for name, (encode, decode) in formats.items():
+        data = encode()
+        assert decode(data) == resp
+        encode_ms = best_of(encode, args.repeat)
+        decode_ms = best_of(lambda d=decode, b=data: d(b), args.repeat)
+        print(
+            f"{name:<10} {encode_ms:>10.1f} {decode_ms:>10.1f} {len(data) / 1e6:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,56 @@
 import logging
 import sys
+from collections.abc import Mapping
+from typing import ClassVar
 
 import typer
 from loguru import logger
 
-from lsp_cli.cli import (
-    definition,
-    doc,
-    locate,
-    outline,
-    reference,
-    rename,
-    search,
-    symbol,
-)
 from lsp_cli.cli.main import main_callback
-from lsp_cli.cli.shared import get_msg
-from lsp_cli.server import app as server_app
 from lsp_cli.settings import CLI_LOG_PATH, CLIENT_LOG_DIR, MANAGER_LOG_PATH, settings
+from lsp_cli.utils.lazy import LazyTyperGroup, TyperSettings
 
-app = typer.Typer(
-    help="LSP CLI: A command-line tool for interacting with Language Server Protocol (LSP) features.",
-    context_settings={
+APP_SETTINGS: TyperSettings = {
+    "context_settings": {
         "help_option_names": ["-h", "--help"],
         "max_content_width": 1000,
         "terminal_width": 1000,
         "ignore_unknown_options": True,
         "allow_extra_args": True,
     },
-    add_completion=False,
-    rich_markup_mode=None,
-    pretty_exceptions_enable=False,
+    "add_completion": False,
+    "rich_markup_mode": None,
+    "pretty_exceptions_enable": False,
+}
+
+
+class LspGroup(LazyTyperGroup):
+    # Subcommands are imported on demand to keep CLI startup fast
+    lazy_commands: ClassVar[Mapping[str, str]] = {
+        "server": "lsp_cli.server:app",
+        "rename": "lsp_cli.cli.rename:app",
+        "definition": "lsp_cli.cli.definition:app",
+        "doc": "lsp_cli.cli.doc:app",
+        "locate": "lsp_cli.cli.locate:app",
+        "reference": "lsp_cli.cli.reference:app",
+        "outline": "lsp_cli.cli.outline:app",
+        "symbol": "lsp_cli.cli.symbol:app",
+        "search": "lsp_cli.cli.search:app",
+        "batch": "lsp_cli.cli.batch:app",
+        "serve": "lsp_cli.cli.serve:app",
+    }
+    app_settings: ClassVar[TyperSettings] = APP_SETTINGS
+
+
+app = typer.Typer(
+    cls=LspGroup,
+    help="LSP CLI: A command-line tool for interacting with Language Server Protocol (LSP) features.",
+    **APP_SETTINGS,
 )
 
 # Set callback
 app.callback(invoke_without_command=True)(main_callback)
 
-# Add sub-typers
-app.add_typer(server_app)
-app.add_typer(rename.app)
-app.add_typer(definition.app)
-app.add_typer(doc.app)
-app.add_typer(locate.app)
-app.add_typer(reference.app)
-app.add_typer(outline.app)
-app.add_typer(symbol.app)
-app.add_typer(search.app)
-
 
 def run() -> None:
     # Suppress httpx INFO logs in CLI (unless debug mode)
@@ -60,6 +64,9 @@ def run() -> None:
     except Exception as e:
         if settings.debug:
             raise
+
+        from lsp_cli.cli.shared import get_msg
+
         logger.opt(exception=e).debug("Unhandled exception")
         print(f"Error: {get_msg(e)}", file=sys.stderr)
         print("\nFor more details, see the log files:", file=sys.stderr)
@@ -0,0 +1,129 @@
+import sys
+from collections.abc import AsyncGenerator
+from pathlib import Path
+from typing import Annotated, Literal
+
+import anyio
+import typer
+from anyio.abc import ObjectSendStream
+
+from lsp_cli.utils.sync import cli_syncify
+
+from .query import OutputFormat, QueryAdapter, QueryResult, render_response
+from .shared import ClientPool, get_msg
+
+app = typer.Typer()
+
+
+async def _run_line(
+    index: int,
+    line: str,
+    pool: ClientPool,
+    output_format: OutputFormat,
+    send: ObjectSendStream[tuple[int, QueryResult]],
+) -> None:
+    result = QueryResult(id=index)
+    try:
+        query = QueryAdapter.validate_json(line)
+        result.id = query.id if query.id is not None else index
+        result.capability = query.capability
+        resp = await query.execute(pool)
+        result.result = render_response(resp, output_format)
+    except Exception as e:  # noqa: BLE001
+        # One failing query must not abort the rest of the batch
+        result.error = get_msg(e)
+
+    async with send:
+        await send.send((index, result))
+
+
+async def _iter_lines(input_path: Path | None) -> AsyncGenerator[str]:
+    if input_path is None:
+        async for line in anyio.wrap_file(sys.stdin):
+            yield line
+        return
+
+    async with await anyio.open_file(input_path) as f:
+        async for line in f:
+            yield line
+
+
+@app.command("batch")
+@cli_syncify
+async def run_batch(
+    input_path: Annotated[
+        Path | None,
+        typer.Argument(
+            help="JSONL file of queries. Reads from stdin if omitted or '-'.",
+            show_default=False,
+        ),
+    ] = None,
+    order: Annotated[
+        Literal["input", "completion"],
+        typer.Option(
+            "--order",
+            help="Emit results in input order or as soon as each query completes.",
+        ),
+    ] = "input",
+    output_format: Annotated[
+        OutputFormat,
+        typer.Option(
+            "--format",
+            "-f",
+            help="Emit results as JSON objects or as rendered markdown strings.",
+        ),
+    ] = "json",
+    concurrency: Annotated[
+        int,
+        typer.Option(
+            "--concurrency",
+            "-j",
+            min=1,
+            help="Maximum number of queries in flight at once.",
+        ),
+    ] = 8,
+) -> None:
+    """
+    Run a stream of queries (one JSON object per line) over a single session.
+
+    Each line names a `capability` (definition, doc, locate, outline, reference,
+    rename_preview, rename_execute, search, symbol) plus the arguments of the
+    matching subcommand, e.g. {"capability": "doc", "locate": "main.py:main"}.
+    Results are written as JSON lines carrying the query `id` (or line index).
+    """
+    if input_path == Path("-"):
+        input_path = None
+
+    limiter = anyio.CapacityLimiter(concurrency)
+    send, receive = anyio.create_memory_object_stream[tuple[int, QueryResult]]()
+
+    def write(index: int, result: QueryResult) -> None:
+        print(result.model_dump_json(), flush=True)
+        limiter.release_on_behalf_of(index)
+
+    async def emit() -> None:
+        pending: dict[int, QueryResult] = {}
+        next_index = 0
+        async with receive:
+            async for index, result in receive:
+                if order == "completion":
+                    write(index, result)
+                    continue
+                pending[index] = result
+                while next_index in pending:
+                    write(next_index, pending.pop(next_index))
+                    next_index += 1
+
+    async with ClientPool() as pool, anyio.create_task_group() as tg:
+        tg.start_soon(emit)
+        async with send:
+            index = 0
+            async for line in _iter_lines(input_path):
+                if not line.strip():
+                    continue
+                # Wait for a free slot before reading on. A query holds its
+                # slot until its result is written, so neither running queries
+                # nor results waiting on an earlier one outgrow `concurrency`.
+                await limiter.acquire_on_behalf_of(index)
+                tg.start_soon(_run_line, index, line, pool, output_format, send.clone())
+                index += 1
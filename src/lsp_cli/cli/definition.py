@@ -6,7 +6,7 @@ from lsap.schema.definition import DefinitionRequest, DefinitionResponse
 from lsp_cli.utils.sync import cli_syncify
 
 from . import options as op
-from .shared import create_locate, managed_client
+from .shared import ClientPool, create_locate, fan_out, read_locates
 
 app = typer.Typer()
 
@@ -14,7 +14,8 @@ app = typer.Typer()
 @app.command("definition")
 @cli_syncify
 async def get_definition(
-    locate: op.LocateOpt,
+    locate: op.LocatesOpt = None,
+    locate_file: op.LocateFileOpt = None,
     mode: Annotated[
         Literal["definition", "declaration", "type_definition"],
         typer.Option(
@@ -39,19 +40,21 @@ async def get_definition(
     elif type_def:
         mode = "type_definition"
 
-    locate_obj = create_locate(locate)
-
-    async with managed_client(locate_obj.file_path, project_path=project) as client:
-        resp_obj = await client.post(
-            "/capability/definition",
-            DefinitionResponse,
-            json=DefinitionRequest(
-                locate=locate_obj,
-                mode=mode,
-            ),
-        )
-
-    if resp_obj:
-        print(resp_obj.format())
-    else:
-        print(f"Warning: No {mode.replace('_', ' ')} found")
+    locates = read_locates(locate, locate_file)
+
+    async with ClientPool() as pool:
+
+        async def query(locate_str: str) -> str:
+            locate_obj = create_locate(locate_str)
+            resp_obj = await pool.post(
+                locate_obj.file_path,
+                project,
+                "/capability/definition",
+                DefinitionResponse,
+                json=DefinitionRequest(locate=locate_obj, mode=mode),
+            )
+            if resp_obj:
+                return resp_obj.format()
+            return f"Warning: No {mode.replace('_', ' ')} found"
+
+        await fan_out(locates, query)
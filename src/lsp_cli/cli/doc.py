@@ -4,7 +4,7 @@ from lsap.schema.doc import DocRequest, DocResponse
 from lsp_cli.utils.sync import cli_syncify
 
 from . import options as op
-from .shared import create_locate, managed_client
+from .shared import ClientPool, create_locate, fan_out, read_locates
 
 app = typer.Typer()
 
@@ -12,20 +12,26 @@ app = typer.Typer()
 @app.command("doc")
 @cli_syncify
 async def get_doc(
-    locate: op.LocateOpt,
+    locate: op.LocatesOpt = None,
+    locate_file: op.LocateFileOpt = None,
     project: op.ProjectOpt = None,
 ) -> None:
     """
     Get documentation and type information for a symbol at a specific location.
     """
-    locate_obj = create_locate(locate)
+    locates = read_locates(locate, locate_file)
 
-    async with managed_client(locate_obj.file_path, project_path=project) as client:
-        resp_obj = await client.post(
-            "/capability/hover", DocResponse, json=DocRequest(locate=locate_obj)
-        )
+    async with ClientPool() as pool:
 
-    if resp_obj:
-        print(resp_obj.format())
-    else:
-        print("Warning: No documentation found")
+        async def query(locate_str: str) -> str:
+            locate_obj = create_locate(locate_str)
+            resp_obj = await pool.post(
+                locate_obj.file_path,
+                project,
+                "/capability/hover",
+                DocResponse,
+                json=DocRequest(locate=locate_obj),
+            )
+            return resp_obj.format() if resp_obj else "Warning: No documentation found"
+
+        await fan_out(locates, query)
@@ -6,7 +6,7 @@ from lsap.schema.locate import LocateRequest, LocateResponse
 from lsp_cli.utils.sync import cli_syncify
 
 from . import options as op
-from .shared import create_locate, managed_client
+from .shared import ClientPool, create_locate, fan_out, read_locates
 
 app = typer.Typer()
 
@@ -14,28 +14,43 @@ app = typer.Typer()
 @app.command("locate")
 @cli_syncify
 async def get_location(
-    locate: Annotated[str, typer.Argument(help="The locate string to parse.")],
+    locate: Annotated[
+        list[str] | None,
+        typer.Argument(
+            help="The locate strings to parse. Several may be given at once.",
+            show_default=False,
+        ),
+    ] = None,
     check: bool = typer.Option(
         False,
         "--check",
         "-c",
         help="Verify if the target exists in the file and show its context.",
     ),
+    locate_opt: op.LocatesOpt = None,
+    locate_file: op.LocateFileOpt = None,
     project: op.ProjectOpt = None,
 ) -> None:
     """
     Locate a position or range in the codebase using a string syntax.
     """
-    locate_obj = create_locate(locate)
-
-    async with managed_client(locate_obj.file_path, project_path=project) as client:
-        resp_obj = await client.post(
-            "/capability/locate", LocateResponse, json=LocateRequest(locate=locate_obj)
-        )
-
-    if resp_obj:
-        print(resp_obj.format())
-    elif check:
-        raise RuntimeError(f"Target '{locate}' not found")
-    else:
-        print(locate_obj)
+    locates = read_locates([*(locate or []), *(locate_opt or [])], locate_file)
+
+    async with ClientPool() as pool:
+
+        async def query(locate_str: str) -> str:
+            locate_obj = create_locate(locate_str)
+            resp_obj = await pool.post(
+                locate_obj.file_path,
+                project,
+                "/capability/locate",
+                LocateResponse,
+                json=LocateRequest(locate=locate_obj),
+            )
+            if resp_obj:
+                return resp_obj.format()
+            if check:
+                raise RuntimeError(f"Target '{locate_str}' not found")
+            return str(locate_obj)
+
+        await fan_out(locates, query)
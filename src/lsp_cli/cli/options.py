@@ -12,6 +12,24 @@ LocateOpt = Annotated[
     ),
 ]
 
+LocatesOpt = Annotated[
+    list[str] | None,
+    typer.Option(
+        "--locate",
+        "-L",
+        help="Location string (see 'lsp locate --help' for syntax). Repeat to query several locations at once.",
+        show_default=False,
+    ),
+]
+
+LocateFileOpt = Annotated[
+    Path | None,
+    typer.Option(
+        "--locate-file",
+        help="File with one location string per line ('-' for stdin).",
+    ),
+]
+
 WorkspaceOpt = Annotated[
     Path | None,
     typer.Option(
@@ -48,6 +66,14 @@ PaginationIdOpt = Annotated[
     ),
 ]
 
+StreamOpt = Annotated[
+    bool,
+    typer.Option(
+        "--stream",
+        help="Print each result as soon as the server produces it (no pagination token).",
+    ),
+]
+
 ProjectOpt = Annotated[
     Path | None,
     typer.Option(
@@ -2,13 +2,13 @@ from pathlib import Path
 from typing import Annotated
 
 import typer
-from lsap.schema.models import SymbolKind
-from lsap.schema.outline import OutlineRequest, OutlineResponse
+from lsap.schema.outline import OutlineResponse
 
+from lsp_cli.manager.outline import OutlineFilterRequest
 from lsp_cli.utils.sync import cli_syncify
 
 from . import options as op
-from .shared import managed_client
+from .shared import OUTLINE_KINDS, managed_client
 
 app = typer.Typer()
 
@@ -28,6 +28,15 @@ async def get_outline(
             help="Show all symbols including local variables and parameters.",
         ),
     ] = False,
+    max_depth: Annotated[
+        int | None,
+        typer.Option(
+            "--max-depth",
+            "-d",
+            min=1,
+            help="Only show symbols nested at most this deep (1 for top-level).",
+        ),
+    ] = None,
     project: op.ProjectOpt = None,
 ) -> None:
     """
@@ -40,30 +49,16 @@ async def get_outline(
         resp_obj = await client.post(
             "/capability/outline",
             OutlineResponse,
-            json=OutlineRequest(file_path=file_path),
+            json=OutlineFilterRequest(
+                file_path=file_path,
+                kinds=None if all_symbols else list(OUTLINE_KINDS),
+                max_depth=max_depth,
+            ),
         )
 
     if resp_obj and resp_obj.items:
-        if not all_symbols:
-            filtered_items = [
-                item
-                for item in resp_obj.items
-                if item.kind
-                in {
-                    SymbolKind.Class,
-                    SymbolKind.Function,
-                    SymbolKind.Method,
-                    SymbolKind.Interface,
-                    SymbolKind.Enum,
-                    SymbolKind.Module,
-                    SymbolKind.Namespace,
-                    SymbolKind.Struct,
-                }
-            ]
-            resp_obj.items = filtered_items
-            if not filtered_items:
-                print("Warning: No symbols found (use --all to show local variables)")
-                return
         print(resp_obj.format())
+    elif not all_symbols:
+        print("Warning: No symbols found (use --all to show local variables)")
     else:
         print("Warning: No symbols found")
@@ -0,0 +1,254 @@
+"""Declarative queries mirroring the CLI subcommands.
+
+A query carries the same arguments as its subcommand (locate strings, flags,
+pagination options) and knows how to turn them into an LSAP request against a
+managed client. Long-running entry points such as `lsp batch` use these to run
+many queries over a shared `ClientPool`.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Annotated, Any, Literal
+
+from lsap.schema._abc import Response
+from lsap.schema.definition import DefinitionRequest, DefinitionResponse
+from lsap.schema.doc import DocRequest, DocResponse
+from lsap.schema.locate import LocateRequest, LocateResponse
+from lsap.schema.models import SymbolKind
+from lsap.schema.outline import OutlineResponse
+from lsap.schema.reference import ReferenceRequest, ReferenceResponse
+from lsap.schema.rename import (
+    RenameExecuteRequest,
+    RenameExecuteResponse,
+    RenamePreviewRequest,
+    RenamePreviewResponse,
+)
+from lsap.schema.search import SearchRequest, SearchResponse
+from lsap.schema.symbol import SymbolRequest, SymbolResponse
+from pydantic import BaseModel, Field, TypeAdapter
+
+from lsp_cli.manager.outline import OutlineFilterRequest
+from lsp_cli.settings import settings
+
+from .shared import OUTLINE_KINDS, ClientPool, create_locate
+
+QueryId = int | str
+OutputFormat = Literal["json", "markdown"]
+
+
+class BaseQuery(BaseModel, ABC):
+    id: QueryId | None = None
+    """Caller-supplied identifier echoed back with the result."""
+
+    project: Path | None = None
+
+    @abstractmethod
+    async def execute(self, pool: ClientPool) -> Response | None: ...
+
+
+class DefinitionQuery(BaseQuery):
+    capability: Literal["definition"]
+    locate: str
+    mode: Literal["definition", "declaration", "type_definition"] = "definition"
+
+    async def execute(self, pool: ClientPool) -> DefinitionResponse | None:
+        locate = create_locate(self.locate)
+        return await pool.post(
+            locate.file_path,
+            self.project,
+            "/capability/definition",
+            DefinitionResponse,
+            json=DefinitionRequest(locate=locate, mode=self.mode),
+        )
+
+
+class DocQuery(BaseQuery):
+    capability: Literal["doc"]
+    locate: str
+
+    async def execute(self, pool: ClientPool) -> DocResponse | None:
+        locate = create_locate(self.locate)
+        return await pool.post(
+            locate.file_path,
+            self.project,
+            "/capability/hover",
+            DocResponse,
+            json=DocRequest(locate=locate),
+        )
+
+
+class LocateQuery(BaseQuery):
+    capability: Literal["locate"]
+    locate: str
+
+    async def execute(self, pool: ClientPool) -> LocateResponse | None:
+        locate = create_locate(self.locate)
+        return await pool.post(
+            locate.file_path,
+            self.project,
+            "/capability/locate",
+            LocateResponse,
+            json=LocateRequest(locate=locate),
+        )
+
+
+class OutlineQuery(BaseQuery):
+    capability: Literal["outline"]
+    file_path: Path
+    all_symbols: bool = False
+    max_depth: int | None = Field(default=None, gt=0)
+
+    async def execute(self, pool: ClientPool) -> OutlineResponse | None:
+        file_path = self.file_path.absolute()
+        return await pool.post(
+            file_path,
+            self.project,
+            "/capability/outline",
+            OutlineResponse,
+            json=OutlineFilterRequest(
+                file_path=file_path,
+                kinds=None if self.all_symbols else list(OUTLINE_KINDS),
+                max_depth=self.max_depth,
+            ),
+        )
+
+
+class ReferenceQuery(BaseQuery):
+    capability: Literal["reference"]
+    locate: str
+    mode: Literal["references", "implementations"] = "references"
+    context_lines: int | None = None
+    max_items: int | None = None
+    start_index: int = 0
+    pagination_id: str | None = None
+
+    async def execute(self, pool: ClientPool) -> ReferenceResponse | None:
+        locate = create_locate(self.locate)
+        return await pool.post(
+            locate.file_path,
+            self.project,
+            "/capability/reference",
+            ReferenceResponse,
+            json=ReferenceRequest(
+                locate=locate,
+                mode=self.mode,
+                context_lines=self.context_lines
+                if self.context_lines is not None
+                else settings.default_context_lines,
+                max_items=self.max_items,
+                start_index=self.start_index,
+                pagination_id=self.pagination_id,
+            ),
+        )
+
+
+class RenamePreviewQuery(BaseQuery):
+    capability: Literal["rename_preview"]
+    locate: str
+    new_name: str
+
+    async def execute(self, pool: ClientPool) -> RenamePreviewResponse | None:
+        locate = create_locate(self.locate)
+        return await pool.post(
+            locate.file_path,
+            self.project,
+            "/capability/rename/preview",
+            RenamePreviewResponse,
+            json=RenamePreviewRequest(locate=locate, new_name=self.new_name),
+        )
+
+
+class RenameExecuteQuery(BaseQuery):
+    capability: Literal["rename_execute"]
+    rename_id: str
+    exclude: list[str] = Field(default_factory=list)
+    workspace: Path | None = None
+
+    async def execute(self, pool: ClientPool) -> RenameExecuteResponse | None:
+        workspace = (self.workspace or Path.cwd()).absolute()
+        cwd = Path.cwd()
+        exclude = [p if Path(p).is_absolute() else str(cwd / p) for p in self.exclude]
+        return await pool.post(
+            workspace,
+            self.project,
+            "/capability/rename/execute",
+            RenameExecuteResponse,
+            json=RenameExecuteRequest(rename_id=self.rename_id, exclude_files=exclude),
+        )
+
+
+class SearchQuery(BaseQuery):
+    capability: Literal["search"]
+    query: str
+    workspace: Path | None = None
+    kinds: list[SymbolKind] | None = None
+    max_items: int | None = None
+    start_index: int = 0
+    pagination_id: str | None = None
+
+    async def execute(self, pool: ClientPool) -> SearchResponse | None:
+        return await pool.post(
+            self.workspace or Path.cwd(),
+            self.project,
+            "/capability/search",
+            SearchResponse,
+            json=SearchRequest(
+                query=self.query,
+                kinds=self.kinds,
+                max_items=self.max_items
+                if self.max_items is not None
+                else settings.default_max_items,
+                start_index=self.start_index,
+                pagination_id=self.pagination_id,
+            ),
+        )
+
+
+class SymbolQuery(BaseQuery):
+    capability: Literal["symbol"]
+    locate: str
+
+    async def execute(self, pool: ClientPool) -> SymbolResponse | None:
+        locate = create_locate(self.locate)
+        return await pool.post(
+            locate.file_path,
+            self.project,
+            "/capability/symbol",
+            SymbolResponse,
+            json=SymbolRequest(locate=locate),
+        )
+
+
+type Query = Annotated[
+    DefinitionQuery
+    | DocQuery
+    | LocateQuery
+    | OutlineQuery
+    | ReferenceQuery
+    | RenamePreviewQuery
+    | RenameExecuteQuery
+    | SearchQuery
+    | SymbolQuery,
+    Field(discriminator="capability"),
+]
+
+QueryAdapter: TypeAdapter[Query] = TypeAdapter(Query)
+
+
+class QueryResult(BaseModel):
+    id: QueryId | None = None
+    capability: str | None = None
+    result: dict[str, Any] | str | None = None
+    error: str | None = None
+
+
+def render_response(
+    resp: Response | None, output_format: OutputFormat
+) -> dict[str, Any] | str | None:
+    if resp is None:
+        return None
+    if output_format == "markdown":
+        return resp.format()
+    return resp.model_dump(mode="json")
@@ -1,7 +1,8 @@
+from contextlib import aclosing
 from typing import Annotated, Literal
 
 import typer
-from lsap.schema.reference import ReferenceRequest, ReferenceResponse
+from lsap.schema.reference import ReferenceItem, ReferenceRequest, ReferenceResponse
 
 from lsp_cli.settings import settings
 from lsp_cli.utils.sync import cli_syncify
@@ -12,6 +13,16 @@ from .shared import create_locate, managed_client
 app = typer.Typer()
 
 
+def format_item(item: ReferenceItem) -> str:
+    """Render one reference the way the full `ReferenceResponse` lists it."""
+    loc = item.location
+    lines = [f"### `{loc.file_path}:{loc.range.start.line}`"]
+    if item.symbol:
+        lines.append(f"In `{'.'.join(item.symbol.path)}` (`{item.symbol.kind.value}`)")
+    lines.extend(["", f"```{loc.file_path.suffix.removeprefix('.')}", item.code, "```"])
+    return "\n".join(lines) + "\n"
+
+
 @app.command("reference")
 @cli_syncify
 async def get_reference(
@@ -38,6 +49,7 @@ async def get_reference(
     max_items: op.MaxItemsOpt = None,
     start_index: op.StartIndexOpt = 0,
     pagination_id: op.PaginationIdOpt = None,
+    stream: op.StreamOpt = False,
     project: op.ProjectOpt = None,
 ) -> None:
     """
@@ -60,17 +72,28 @@ async def get_reference(
             else settings.default_context_lines
         )
 
+        req = ReferenceRequest(
+            locate=locate_obj,
+            mode=mode,
+            context_lines=effective_context_lines,
+            max_items=max_items,
+            start_index=start_index,
+            pagination_id=pagination_id,
+        )
+
+        if stream:
+            found = False
+            items = client.stream("/capability/reference", ReferenceItem, json=req)
+            async with aclosing(items):
+                async for item in items:
+                    print(format_item(item), flush=True)
+                    found = True
+            if not found:
+                print(f"Warning: No {mode} found")
+            return
+
         resp_obj = await client.post(
-            "/capability/reference",
-            ReferenceResponse,
-            json=ReferenceRequest(
-                locate=locate_obj,
-                mode=mode,
-                context_lines=effective_context_lines,
-                max_items=max_items,
-                start_index=start_index,
-                pagination_id=pagination_id,
-            ),
+            "/capability/reference", ReferenceResponse, json=req
         )
 
     if resp_obj:
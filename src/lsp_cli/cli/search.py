@@ -1,9 +1,10 @@
+from contextlib import aclosing
 from pathlib import Path
 from typing import Annotated
 
 import typer
 from lsap.schema.models import SymbolKind
-from lsap.schema.search import SearchRequest, SearchResponse
+from lsap.schema.search import SearchItem, SearchRequest, SearchResponse
 
 from lsp_cli.settings import settings
 from lsp_cli.utils.sync import cli_syncify
@@ -14,6 +15,15 @@ from .shared import managed_client
 app = typer.Typer()
 
 
+def format_item(item: SearchItem) -> str:
+    """Render one match the way the full `SearchResponse` lists it."""
+    line = f":{item.line}" if item.line is not None else ""
+    text = f"- `{item.name}` ({item.kind.value}): `{item.file_path}{line}`"
+    if item.container is not None:
+        text += f" (in `{item.container}`)"
+    return text
+
+
 @app.command("search")
 @cli_syncify
 async def search(
@@ -33,6 +43,7 @@ async def search(
     max_items: op.MaxItemsOpt = None,
     start_index: op.StartIndexOpt = 0,
     pagination_id: op.PaginationIdOpt = None,
+    stream: op.StreamOpt = False,
     project: op.ProjectOpt = None,
 ) -> None:
     """
@@ -46,18 +57,27 @@ async def search(
             max_items if max_items is not None else settings.default_max_items
         )
 
-        resp_obj = await client.post(
-            "/capability/search",
-            SearchResponse,
-            json=SearchRequest(
-                query=query,
-                kinds=[SymbolKind(k) for k in kinds] if kinds else None,
-                max_items=effective_max_items,
-                start_index=start_index,
-                pagination_id=pagination_id,
-            ),
+        req = SearchRequest(
+            query=query,
+            kinds=[SymbolKind(k) for k in kinds] if kinds else None,
+            max_items=effective_max_items,
+            start_index=start_index,
+            pagination_id=pagination_id,
         )
 
+        if stream:
+            found = False
+            items = client.stream("/capability/search", SearchItem, json=req)
+            async with aclosing(items):
+                async for item in items:
+                    print(format_item(item), flush=True)
+                    found = True
+            if not found:
+                print("Warning: No matches found")
+            return
+
+        resp_obj = await client.post("/capability/search", SearchResponse, json=req)
+
     if resp_obj and resp_obj.items:
         print(resp_obj.format())
         if effective_max_items and len(resp_obj.items) >= effective_max_items:
@@ -0,0 +1,175 @@
+import sys
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Annotated, Any, Literal
+
+import anyio
+import typer
+from pydantic import BaseModel, Field, ValidationError
+
+from lsp_cli.manager import (
+    CreateClientRequest,
+    CreateClientResponse,
+    DeleteClientRequest,
+    DeleteClientResponse,
+    ManagedClientInfoList,
+)
+from lsp_cli.utils.sync import cli_syncify
+
+from .query import OutputFormat, QueryAdapter, render_response
+from .shared import ClientPool, get_msg
+
+app = typer.Typer()
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+RpcId = int | str | None
+
+
+class RpcRequest(BaseModel):
+    jsonrpc: Literal["2.0"] = "2.0"
+    id: RpcId = None
+    method: str
+    params: dict[str, Any] = Field(default_factory=dict)
+
+
+class JsonRpcError(BaseModel):
+    code: int
+    message: str
+
+
+class RpcResponse(BaseModel):
+    jsonrpc: Literal["2.0"] = "2.0"
+    id: RpcId = None
+    result: Any = None
+    error: JsonRpcError | None = None
+
+
+class ServerParams(BaseModel):
+    path: Path | None = None
+    project: Path | None = None
+
+    @property
+    def abs_path(self) -> Path:
+        return (self.path or Path.cwd()).absolute()
+
+
+class MethodNotFoundError(Exception): ...
+
+
+type Handler = Callable[[ClientPool, dict[str, Any]], Awaitable[Any]]
+
+
+async def _server_list(pool: ClientPool, params: dict[str, Any]) -> Any:  # noqa: ANN401
+    resp = await pool.manager.get("/list", ManagedClientInfoList)
+    return resp.model_dump(mode="json") if resp else []
+
+
+async def _server_start(pool: ClientPool, params: dict[str, Any]) -> Any:  # noqa: ANN401
+    p = ServerParams.model_validate(params)
+    resp = await pool.manager.post(
+        "/create",
+        CreateClientResponse,
+        json=CreateClientRequest(path=p.abs_path, project_path=p.project),
+    )
+    return resp.model_dump(mode="json") if resp else None
+
+
+async def _server_stop(pool: ClientPool, params: dict[str, Any]) -> Any:  # noqa: ANN401
+    p = ServerParams.model_validate(params)
+    resp = await pool.manager.delete(
+        "/delete",
+        DeleteClientResponse,
+        json=DeleteClientRequest(path=p.abs_path, project_path=p.project),
+    )
+    return resp.model_dump(mode="json") if resp else None
+
+
+SERVER_METHODS: dict[str, Handler] = {
+    "server/list": _server_list,
+    "server/start": _server_start,
+    "server/stop": _server_stop,
+}
+
+
+async def _call(pool: ClientPool, req: RpcRequest, output_format: OutputFormat) -> Any:  # noqa: ANN401
+    if handler := SERVER_METHODS.get(req.method):
+        return await handler(pool, req.params)
+
+    try:
+        query = QueryAdapter.validate_python({**req.params, "capability": req.method})
+    except ValidationError as e:
+        if any(err["type"] == "union_tag_invalid" for err in e.errors()):
+            raise MethodNotFoundError(f"Method not found: {req.method}") from e
+        raise
+
+    return render_response(await query.execute(pool), output_format)
+
+
+async def _handle(pool: ClientPool, line: str, output_format: OutputFormat) -> None:
+    try:
+        req = RpcRequest.model_validate_json(line)
+    except ValidationError as e:
+        code = (
+            PARSE_ERROR if e.errors()[0]["type"] == "json_invalid" else INVALID_REQUEST
+        )
+        _write(RpcResponse(error=JsonRpcError(code=code, message=get_msg(e))))
+        return
+
+    resp = RpcResponse(id=req.id)
+    try:
+        resp.result = await _call(pool, req, output_format)
+    except MethodNotFoundError as e:
+        resp.error = JsonRpcError(code=METHOD_NOT_FOUND, message=str(e))
+    except ValidationError as e:
+        resp.error = JsonRpcError(code=INVALID_PARAMS, message=get_msg(e))
+    except Exception as e:  # noqa: BLE001
+        resp.error = JsonRpcError(code=SERVER_ERROR, message=get_msg(e))
+
+    # Requests without an id are notifications and get no response
+    if req.id is not None:
+        _write(resp)
+
+
+def _write(resp: RpcResponse) -> None:
+    # A JSON-RPC response carries exactly one of `result` and `error`
+    exclude = {"result"} if resp.error else {"error"}
+    sys.stdout.write(resp.model_dump_json(exclude=exclude) + "\n")
+    sys.stdout.flush()
+
+
+@app.command("serve")
+@cli_syncify
+async def serve(
+    stdio: Annotated[
+        bool,
+        typer.Option("--stdio", help="Speak JSON-RPC over stdin/stdout."),
+    ] = False,
+    output_format: Annotated[
+        OutputFormat,
+        typer.Option(
+            "--format",
+            "-f",
+            help="Return capability results as JSON objects or rendered markdown.",
+        ),
+    ] = "json",
+) -> None:
+    """
+    Run a long-lived JSON-RPC server for agent integrations.
+
+    Requests are newline-delimited JSON-RPC 2.0 objects. Methods are the
+    capability names accepted by `lsp batch` (params are the same arguments),
+    plus `server/list`, `server/start` and `server/stop`. Requests are served
+    concurrently over pooled connections to the managed clients.
+    """
+    if not stdio:
+        raise ValueError("No transport selected, use --stdio")
+
+    async with ClientPool() as pool, anyio.create_task_group() as tg:
+        async for line in anyio.wrap_file(sys.stdin):
+            if line.strip():
+                tg.start_soon(_handle, pool, line, output_format)
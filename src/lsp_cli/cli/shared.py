@@ -1,47 +1,196 @@
+from __future__ import annotations
+
 import re
-from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+import sys
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from contextlib import aclosing, asynccontextmanager
 from pathlib import Path
+from typing import Final
 
+import anyio
 import httpx
+import typer
+from attrs import define, field
 from lsap.schema.locate import LineScope, Locate
+from lsap.schema.models import SymbolKind
 from lsap.utils.locate import parse_locate_string
-from pydantic import ValidationError
-
-from lsp_cli.manager import CreateClientRequest, CreateClientResponse
-from lsp_cli.server import get_manager_client
+from pydantic import BaseModel, ValidationError
+
+from lsp_cli.manager import (
+    NDJSON_MEDIA_TYPE,
+    CapabilityStreamEvent,
+    CapabilityTarget,
+    connect_manager_async,
+    connect_manager_rpc,
+    ensure_manager_async,
+)
+from lsp_cli.settings import settings
 from lsp_cli.utils.http import AsyncHttpClient
-from lsp_cli.utils.socket import wait_socket
+from lsp_cli.utils.rpc import AsyncRpcClient, RpcError
+
+OUTLINE_KINDS: Final = frozenset(
+    {
+        SymbolKind.Class,
+        SymbolKind.Function,
+        SymbolKind.Method,
+        SymbolKind.Interface,
+        SymbolKind.Enum,
+        SymbolKind.Module,
+        SymbolKind.Namespace,
+        SymbolKind.Struct,
+    }
+)
+"""Symbol kinds shown by `lsp outline` unless `--all` is given."""
 
 
 def clean_error_msg(msg: str) -> str:
     return re.sub(r"\[Errno \d+\] ", "", msg)
 
 
-@asynccontextmanager
-async def managed_client(
-    path: Path, project_path: Path | None = None
-) -> AsyncGenerator[AsyncHttpClient]:
-    path = path.absolute()
-    if not path.exists():
-        raise FileNotFoundError(f"File not found: {path}")
-
-    with get_manager_client() as client:
-        info = client.post(
-            "/create",
-            CreateClientResponse,
-            json=CreateClientRequest(path=path, project_path=project_path),
+@define
+class TargetClient:
+    """Capability requests for one target path, routed through the manager."""
+
+    manager: AsyncHttpClient
+    target: CapabilityTarget
+    rpc: AsyncRpcClient | None = None
+    """Carries `post` instead of `manager` when `settings.transport` is `rpc`."""
+
+    async def post[T: BaseModel](
+        self, url: str, resp_schema: type[T], *, json: BaseModel
+    ) -> T | None:
+        client = self.rpc or self.manager
+        try:
+            return await client.post(url, resp_schema, params=self.target, json=json)
+        except (httpx.ConnectError, FileNotFoundError, ConnectionRefusedError):
+            # The manager exited since the pool connected. The request never
+            # reached it, so even a rename is safe to send again once it is back.
+            await ensure_manager_async()
+            return await client.post(url, resp_schema, params=self.target, json=json)
+
+    async def stream[T: BaseModel](
+        self, url: str, item_schema: type[T], *, json: BaseModel
+    ) -> AsyncGenerator[T]:
+        """Yield the items of a streaming capability as the server produces them."""
+        events = self.manager.stream_lines(
+            "POST",
+            url,
+            CapabilityStreamEvent,
+            media_type=NDJSON_MEDIA_TYPE,
+            params=self.target,
+            json=json,
         )
-        assert info is not None
+        async with aclosing(events):
+            async for event in events:
+                if event.error is not None:
+                    raise RuntimeError(event.error)
+                yield item_schema.model_validate(event.item)
+
+
+@define
+class ClientPool:
+    """Share one manager connection across every request of a CLI run.
+
+    The manager routes each `/capability/*` request to the managed client for its
+    target path, starting the client on first use, so every query is a single
+    round trip on this connection. A request that finds the manager gone starts
+    it again and is retried once.
+    """
+
+    _manager: AsyncHttpClient = field(init=False)
+    """Connected, starting the manager if needed, once the pool is entered."""
+    _rpc: AsyncRpcClient | None = field(init=False, default=None)
+
+    @property
+    def manager(self) -> AsyncHttpClient:
+        return self._manager
+
+    def get(self, path: Path, project_path: Path | None = None) -> TargetClient:
+        path = path.absolute()
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {path}")
+
+        target = CapabilityTarget(
+            path=path, project_path=project_path, session=settings.session
+        )
+        return TargetClient(self._manager, target, self._rpc)
+
+    async def post[T: BaseModel](
+        self,
+        path: Path,
+        project_path: Path | None,
+        url: str,
+        resp_schema: type[T],
+        *,
+        json: BaseModel,
+    ) -> T | None:
+        return await self.get(path, project_path).post(url, resp_schema, json=json)
+
+    async def close(self) -> None:
+        if self._rpc:
+            await self._rpc.close()
+        await self._manager.close()
+
+    async def __aenter__(self) -> ClientPool:
+        self._manager = await connect_manager_async()
+        if settings.transport == "rpc":
+            self._rpc = await connect_manager_rpc()
+            await self._rpc.__aenter__()
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        await self.close()
 
-    uds_path = info.uds_path
-    await wait_socket(uds_path, timeout=10.0)
 
-    transport = httpx.AsyncHTTPTransport(uds=uds_path.as_posix())
-    async with AsyncHttpClient(
-        httpx.AsyncClient(transport=transport, base_url="http://localhost")
-    ) as client:
-        yield client
+@asynccontextmanager
+async def managed_client(
+    path: Path, project_path: Path | None = None
+) -> AsyncGenerator[TargetClient]:
+    async with ClientPool() as pool:
+        yield pool.get(path, project_path)
+
+
+def read_locates(locates: list[str] | None, locate_file: Path | None) -> list[str]:
+    """Collect locate strings given via repeated `-L` and/or `--locate-file`."""
+    result = list(locates or [])
+    if locate_file is not None:
+        text = sys.stdin.read() if locate_file == Path("-") else locate_file.read_text()
+        result.extend(line.strip() for line in text.splitlines() if line.strip())
+    if not result:
+        raise ValueError("Missing location: pass --locate/-L or --locate-file")
+    return result
+
+
+async def fan_out(items: list[str], query: Callable[[str], Awaitable[str]]) -> None:
+    """Print `query(item)` for each item, running queries concurrently.
+
+    A single item is printed as is and errors propagate. With several items each
+    output is printed under a `==> item <==` header as soon as it completes, and a
+    failing item is reported inline without stopping the others.
+    """
+    if len(items) == 1:
+        print(await query(items[0]))
+        return
+
+    limiter = anyio.CapacityLimiter(settings.batch_concurrency)
+    failed = False
+
+    async def run(item: str) -> None:
+        nonlocal failed
+        try:
+            async with limiter:
+                output = await query(item)
+        except Exception as e:  # noqa: BLE001
+            failed = True
+            output = f"Error: {get_msg(e)}"
+        print(f"==> {item} <==\n{output}\n", flush=True)
+
+    async with anyio.create_task_group() as tg:
+        for item in items:
+            tg.start_soon(run, item)
+
+    if failed:
+        raise typer.Exit(1)
 
 
 def create_locate(locate_str: str) -> Locate:
@@ -84,6 +233,10 @@ def get_msg(err: Exception | ExceptionGroup) -> str:
             if isinstance(data, dict) and "detail" in data:
                 return clean_error_msg(str(data["detail"]))
             return clean_error_msg(str(err))
+        case RpcError():
+            return clean_error_msg(err.detail)
+        case httpx.TimeoutException():
+            return f"Request timed out: {err.request.url}"
         case ValueError():
             msg = str(err)
             if "invalid literal for int()" in msg:
@@ -4,7 +4,7 @@ from lsap.schema.symbol import SymbolRequest, SymbolResponse
 from lsp_cli.utils.sync import cli_syncify
 
 from . import options as op
-from .shared import create_locate, managed_client
+from .shared import ClientPool, create_locate, fan_out, read_locates
 
 app = typer.Typer()
 
@@ -12,22 +12,28 @@ app = typer.Typer()
 @app.command("symbol")
 @cli_syncify
 async def get_symbol(
-    locate: op.LocateOpt,
+    locate: op.LocatesOpt = None,
+    locate_file: op.LocateFileOpt = None,
     project: op.ProjectOpt = None,
 ) -> None:
     """
     Get detailed symbol information at a specific location.
     """
-    locate_obj = create_locate(locate)
-
-    async with managed_client(locate_obj.file_path, project_path=project) as client:
-        resp_obj = await client.post(
-            "/capability/symbol",
-            SymbolResponse,
-            json=SymbolRequest(locate=locate_obj),
-        )
-
-    if resp_obj:
-        print(resp_obj.format())
-    else:
-        print("Warning: No symbol information found")
+    locates = read_locates(locate, locate_file)
+
+    async with ClientPool() as pool:
+
+        async def query(locate_str: str) -> str:
+            locate_obj = create_locate(locate_str)
+            resp_obj = await pool.post(
+                locate_obj.file_path,
+                project,
+                "/capability/symbol",
+                SymbolResponse,
+                json=SymbolRequest(locate=locate_obj),
+            )
+            if resp_obj:
+                return resp_obj.format()
+            return "Warning: No symbol information found"
+
+        await fan_out(locates, query)
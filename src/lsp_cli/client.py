@@ -1,6 +1,8 @@
+import time
 from pathlib import Path
 from typing import NamedTuple
 
+from attrs import Factory, define
 from lsp_client.client import Client
 from lsp_client.clients.lang import lang_clients
 
@@ -38,3 +40,87 @@ def match_target(project_path: Path) -> ClientTarget | None:
         if lang_config.is_project_root(project_path):
             return ClientTarget(client_cls=client_cls, project_path=project_path)
     return None
+
+
+_MTIME_SETTLE_NS = 2_000_000_000
+
+
+def _matches_suffix(client_cls: type[Client], path: Path) -> bool:
+    suffixes = client_cls.get_language_config().suffixes
+    return any(path.name.endswith(suffix) for suffix in suffixes)
+
+
+@define
+class TargetResolver:
+    """Resolve paths to client targets without re-scanning the filesystem.
+
+    Roots of running clients are indexed so any path under them resolves by
+    walking its ancestors, longest prefix first, without touching the disk. Other
+    paths fall back to the same search as `find_target`, with each directory's
+    project markers memoized and revalidated against the directory mtime, which
+    changes whenever a marker file is created, removed or renamed.
+    """
+
+    _served: dict[Path, list[ClientTarget]] = Factory(dict)
+    _roots: dict[Path, tuple[int, tuple[type[Client], ...]]] = Factory(dict)
+
+    def add(self, target: ClientTarget) -> None:
+        self._served.setdefault(target.project_path, []).append(target)
+
+    def remove(self, target: ClientTarget) -> None:
+        if targets := self._served.get(target.project_path):
+            targets.remove(target)
+            if not targets:
+                del self._served[target.project_path]
+
+    def _project_roots(self, directory: Path) -> tuple[type[Client], ...]:
+        """Language clients for which `directory` is a project root."""
+        try:
+            mtime = directory.stat().st_mtime_ns
+        except OSError:
+            return ()
+
+        if (cached := self._roots.get(directory)) and cached[0] == mtime:
+            return cached[1]
+
+        roots = tuple(
+            client_cls
+            for client_cls in lang_clients.values()
+            if client_cls.get_language_config().is_project_root(directory)
+        )
+        # Timestamps are coarse, so a change right after a recent mtime may not
+        # bump it again. Only trust entries whose mtime has settled.
+        if time.time_ns() - mtime > _MTIME_SETTLE_NS:
+            self._roots[directory] = (mtime, roots)
+        return roots
+
+    def _find_served(self, path: Path, is_file: bool) -> ClientTarget | None:
+        start = path.parent if is_file else path
+        for directory in (start, *start.parents):
+            for target in self._served.get(directory, ()):
+                if not is_file or _matches_suffix(target.client_cls, path):
+                    return target
+        return None
+
+    def find(self, path: Path) -> ClientTarget | None:
+        """Like `find_target`, preferring the nearest running client covering `path`."""
+        is_file = path.is_file()
+        if target := self._find_served(path, is_file):
+            return target
+
+        start = path.parent if is_file else path
+        for client_cls in lang_clients.values():
+            if is_file and not _matches_suffix(client_cls, path):
+                continue
+            for directory in (start, *start.parents):
+                if client_cls in self._project_roots(directory):
+                    return ClientTarget(client_cls=client_cls, project_path=directory)
+        return None
+
+    def match(self, project_path: Path) -> ClientTarget | None:
+        """Like `match_target`, preferring a running client for `project_path`."""
+        if targets := self._served.get(project_path):
+            return targets[0]
+        if roots := self._project_roots(project_path):
+            return ClientTarget(client_cls=roots[0], project_path=project_path)
+        return None
@@ -1,52 +1,147 @@
 from __future__ import annotations
 
+import fcntl
+import os
+import select
 import subprocess
 import sys
 
+import anyio.to_thread
 import httpx
 
-from lsp_cli.settings import MANAGER_UDS_PATH
-from lsp_cli.utils.http import HttpClient
+from lsp_cli.settings import (
+    MANAGER_LOCK_PATH,
+    MANAGER_LOG_PATH,
+    MANAGER_READY_FD_ENV,
+    MANAGER_RPC_PATH,
+    MANAGER_UDS_PATH,
+    settings,
+)
+from lsp_cli.utils.http import WIRE_MEDIA_TYPES, AsyncHttpClient, HttpClient
+from lsp_cli.utils.rpc import AsyncRpcClient
 from lsp_cli.utils.socket import is_socket_alive
 
-from .manager import Manager, get_manager, manager_lifespan
 from .models import (
+    NDJSON_MEDIA_TYPE,
+    CapabilityBatchItem,
+    CapabilityBatchRequest,
+    CapabilityBatchResponse,
+    CapabilityBatchResult,
+    CapabilityStreamEvent,
+    CapabilityTarget,
     CreateClientRequest,
     CreateClientResponse,
     DeleteClientRequest,
     DeleteClientResponse,
     ManagedClientInfo,
     ManagedClientInfoList,
+    MemoryUsage,
+    ResponseCacheStats,
+    SessionUsage,
+    SessionUsageList,
 )
 
 __all__ = [
+    "NDJSON_MEDIA_TYPE",
+    "CapabilityBatchItem",
+    "CapabilityBatchRequest",
+    "CapabilityBatchResponse",
+    "CapabilityBatchResult",
+    "CapabilityStreamEvent",
+    "CapabilityTarget",
     "CreateClientRequest",
     "CreateClientResponse",
     "DeleteClientRequest",
     "DeleteClientResponse",
     "ManagedClientInfo",
     "ManagedClientInfoList",
-    "Manager",
+    "MemoryUsage",
+    "ResponseCacheStats",
+    "SessionUsage",
+    "SessionUsageList",
     "connect_manager",
-    "get_manager",
-    "manager_lifespan",
+    "connect_manager_async",
+    "connect_manager_rpc",
+    "ensure_manager_async",
 ]
 
 
-def connect_manager() -> HttpClient:
-    if not is_socket_alive(MANAGER_UDS_PATH):
+MANAGER_START_TIMEOUT = 30.0
+
+
+def _spawn_manager() -> None:
+    read_fd, write_fd = os.pipe()
+    try:
         subprocess.Popen(
             (sys.executable, "-m", "lsp_cli.manager"),
             stdin=subprocess.DEVNULL,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             start_new_session=True,
+            pass_fds=(write_fd,),
+            env={**os.environ, MANAGER_READY_FD_ENV: str(write_fd)},
         )
+        os.close(write_fd)
+        write_fd = -1
+
+        # The manager writes one byte once it is listening; EOF means it died
+        readable, _, _ = select.select([read_fd], [], [], MANAGER_START_TIMEOUT)
+        if not readable or not os.read(read_fd, 1):
+            raise RuntimeError(
+                f"Manager failed to start, see {MANAGER_LOG_PATH} for details"
+            )
+    finally:
+        os.close(read_fd)
+        if write_fd != -1:
+            os.close(write_fd)
+
+
+def _ensure_manager() -> None:
+    if is_socket_alive(MANAGER_UDS_PATH):
+        return
+
+    MANAGER_LOCK_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with MANAGER_LOCK_PATH.open("w") as lock:
+        # Concurrent cold invocations queue here and reuse the first one's manager
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not is_socket_alive(MANAGER_UDS_PATH):
+            _spawn_manager()
+
+
+async def ensure_manager_async() -> None:
+    """Start the manager unless it is running, waiting for it in a worker thread."""
+    await anyio.to_thread.run_sync(_ensure_manager)
+
+
+def connect_manager() -> HttpClient:
+    _ensure_manager()
 
     return HttpClient(
         httpx.Client(
-            transport=httpx.HTTPTransport(uds=str(MANAGER_UDS_PATH), retries=5),
+            transport=httpx.HTTPTransport(uds=str(MANAGER_UDS_PATH)),
             base_url="http://localhost",
             timeout=30.0,
-        )
+        ),
+        media_type=WIRE_MEDIA_TYPES[settings.wire_format],
+    )
+
+
+async def connect_manager_async() -> AsyncHttpClient:
+    await ensure_manager_async()
+
+    return AsyncHttpClient(
+        httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=str(MANAGER_UDS_PATH)),
+            base_url="http://localhost",
+            timeout=30.0,
+        ),
+        media_type=WIRE_MEDIA_TYPES[settings.wire_format],
+    )
+
+
+async def connect_manager_rpc() -> AsyncRpcClient:
+    await ensure_manager_async()
+
+    return AsyncRpcClient(
+        MANAGER_RPC_PATH, media_type=WIRE_MEDIA_TYPES[settings.wire_format]
     )
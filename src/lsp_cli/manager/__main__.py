@@ -1,10 +1,29 @@
+import os
+
 import uvicorn
 
-from lsp_cli.settings import MANAGER_UDS_PATH
+from lsp_cli.settings import MANAGER_READY_FD_ENV, MANAGER_RPC_PATH, MANAGER_UDS_PATH
+from lsp_cli.utils.socket import is_socket_alive, listen_unix
 
 from .manager import app
 
+
+def notify_ready() -> None:
+    # Requests arriving from now on wait in the accept backlog until startup ends
+    if fd := os.environ.pop(MANAGER_READY_FD_ENV, None):
+        os.write(int(fd), b"1")
+        os.close(int(fd))
+
+
 if __name__ == "__main__":
-    MANAGER_UDS_PATH.unlink(missing_ok=True)
-    MANAGER_UDS_PATH.parent.mkdir(parents=True, exist_ok=True)
-    uvicorn.run(app, uds=str(MANAGER_UDS_PATH))
+    # Never steal the socket from a manager that is already serving
+    if is_socket_alive(MANAGER_UDS_PATH):
+        notify_ready()
+    else:
+        with (
+            listen_unix(MANAGER_UDS_PATH) as sock,
+            listen_unix(MANAGER_RPC_PATH) as rpc_sock,
+        ):
+            app.state.rpc_socket = rpc_sock
+            notify_ready()
+            uvicorn.run(app, fd=sock.fileno())
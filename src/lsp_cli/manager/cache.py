@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from pathlib import Path
+from typing import Any
+
+import anyio
+import xxhash
+from attrs import define, field, frozen
+from pydantic import BaseModel
+
+from .models import ResponseCacheStats
+
+type Digest = str | None
+"""xxhash of a file's content, `None` if the file does not exist."""
+
+
+@frozen
+class CacheEntry:
+    value: BaseModel | None
+    provenance: dict[Path, Digest]
+    """Files the response was derived from, with their digests at that time."""
+    size: int
+    workspace: bool
+    """Whether the answer may depend on files outside its provenance."""
+
+
+def collect_paths(data: Any, paths: set[Path] | None = None) -> set[Path]:  # noqa: ANN401
+    """Collect every `Path` in a (nested) `model_dump()` result."""
+    paths = set() if paths is None else paths
+    match data:
+        case Path():
+            paths.add(data)
+        case dict():
+            for value in data.values():
+                collect_paths(value, paths)
+        case list() | tuple():
+            for value in data:
+                collect_paths(value, paths)
+    return paths
+
+
+def file_version(path: Path) -> tuple[int, int] | None:
+    """(mtime_ns, size) of a file, `None` if it does not exist."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@define
+class ResponseCache:
+    """LRU cache of capability responses, validated by content provenance.
+
+    Each entry records the digest of every file its request and response refer
+    to. A lookup only hits while all of them are unchanged, and `invalidate`
+    evicts exactly the entries derived from the given files. Entries flagged as
+    `workspace` (e.g. references) can change with any file, so they are only
+    stored while `watched` is set by something that calls `invalidate` on every
+    change in the workspace. Nothing is stored while `paused`.
+    """
+
+    max_bytes: int
+    watched: bool = False
+    paused: bool = False
+
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+
+    _entries: OrderedDict[str, CacheEntry] = field(init=False, factory=OrderedDict)
+    _by_file: dict[Path, set[str]] = field(init=False, factory=dict)
+    _workspace_keys: set[str] = field(init=False, factory=set)
+    _size: int = field(init=False, default=0)
+    _digests: dict[Path, tuple[int, int, Digest]] = field(init=False, factory=dict)
+    """Path -> (mtime_ns, size, digest), so unchanged files are not re-read."""
+
+    @staticmethod
+    def make_key(name: str, req: BaseModel) -> str:
+        return f"{name}:{xxhash.xxh3_128_hexdigest(req.model_dump_json())}"
+
+    def digest(self, path: Path) -> Digest:
+        try:
+            stat = path.stat()
+        except OSError:
+            self._digests.pop(path, None)
+            return None
+
+        cached = self._digests.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        try:
+            digest = xxhash.xxh3_64_hexdigest(path.read_bytes())
+        except OSError:
+            return None
+        self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def get(self, key: str) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is not None and any(
+            self.digest(path) != digest for path, digest in entry.provenance.items()
+        ):
+            self._evict(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(
+        self,
+        key: str,
+        value: BaseModel | None,
+        files: Iterable[Path],
+        *,
+        workspace: bool = False,
+    ) -> None:
+        if self.paused or (workspace and not self.watched):
+            return
+
+        size = len(value.model_dump_json()) if value is not None else 0
+        if size > self.max_bytes:
+            return
+
+        self._evict(key)
+        provenance = {path: self.digest(path) for path in files}
+        self._entries[key] = CacheEntry(value, provenance, size, workspace)
+        self._size += size
+        for path in provenance:
+            self._by_file.setdefault(path, set()).add(key)
+        if workspace:
+            self._workspace_keys.add(key)
+
+        while self._size > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def invalidate(self, paths: Iterable[Path]) -> int:
+        """Evict entries derived from any of `paths` and all workspace entries.
+
+        Returns the number of evicted entries.
+        """
+        keys = set(self._workspace_keys)
+        for path in paths:
+            self._digests.pop(path, None)
+            keys |= self._by_file.get(path, set())
+
+        for key in keys:
+            self._evict(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_file.clear()
+        self._workspace_keys.clear()
+        self._digests.clear()
+        self._size = 0
+
+    @property
+    def stats(self) -> ResponseCacheStats:
+        return ResponseCacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            entries=len(self._entries),
+            size=self._size,
+        )
+
+    def _evict(self, key: str) -> None:
+        if (entry := self._entries.pop(key, None)) is None:
+            return
+
+        self._size -= entry.size
+        self._workspace_keys.discard(key)
+        for path in entry.provenance:
+            if keys := self._by_file.get(path):
+                keys.discard(key)
+                if not keys:
+                    del self._by_file[path]
+                    self._digests.pop(path, None)
+
+
+@define
+class _Flight:
+    done: anyio.Event = field(factory=anyio.Event)
+    value: BaseModel | None = None
+    error: Exception | None = None
+    abandoned: bool = False
+    """The computation was cancelled, so a waiting request takes it over."""
+
+
+@define
+class SingleFlight:
+    """Share one computation between identical requests in flight at once.
+
+    Keys should include the version of every file a request depends on, so a
+    request never joins a computation that started before those files changed.
+    """
+
+    coalesced: int = field(init=False, default=0)
+    """Requests answered by another request's computation."""
+
+    _flights: dict[Hashable, _Flight] = field(init=False, factory=dict)
+
+    async def do(
+        self, key: Hashable, call: Callable[[], Awaitable[BaseModel | None]]
+    ) -> BaseModel | None:
+        while (flight := self._flights.get(key)) is not None:
+            await flight.done.wait()
+            if flight.abandoned:
+                continue
+            self.coalesced += 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        flight = self._flights[key] = _Flight()
+        try:
+            flight.value = await call()
+        except Exception as e:
+            flight.error = e
+            raise
+        except BaseException:
+            flight.abandoned = True
+            raise
+        finally:
+            del self._flights[key]
+            flight.done.set()
+        return flight.value
@@ -0,0 +1,159 @@
+"""Stopping work whose caller has gone away.
+
+A capability request is cancelled as a task once its HTTP caller disconnects,
+see `until_disconnected`. Cancellation then reaches the language server as
+`$/cancelRequest` through the clients made by `cancellable`.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable, Hashable
+from functools import cache
+from importlib.metadata import version
+from typing import Any, Final, cast
+
+import anyio
+import attrs
+from litestar import Request
+from litestar.exceptions import HTTPException
+from loguru import logger
+from lsp_client import Client
+from lsp_client.jsonrpc.channel import RespReceiver, RespSender
+from lsp_client.jsonrpc.convert import request_serialize, response_deserialize
+from lsp_client.jsonrpc.types import RawResponsePackage
+from lsp_client.server.abc import StreamServer
+from lsp_client.utils.channel import OneShotTable
+from lsp_client.utils.types import Request as LspRequest
+from lsp_client.utils.types import Response, lsp_type
+
+CLIENT_CLOSED_STATUS: Final = 499
+"""Status of a request whose caller disconnected, as nobody receives it."""
+
+
+class _DroppedResponse:
+    """Stands in for an abandoned request in the server's response table."""
+
+    def __init__(self, expires: float) -> None:
+        self.expires = expires
+
+    def send(self, item: RawResponsePackage) -> None:
+        logger.debug("Dropping late response to cancelled request {}", item["id"])
+
+
+def _check_internals() -> None:
+    # lsp-client has no public way to abandon a request, `_request` works on
+    # its response table instead, so a release that changes it must not
+    # silently stop cancellation from working
+    try:
+        supported = (
+            "_resp_table" in attrs.fields_dict(StreamServer)
+            and "_pending" in attrs.fields_dict(OneShotTable)
+            and callable(getattr(OneShotTable, "reserve", None))
+        )
+    except attrs.exceptions.NotAnAttrsClassError:
+        supported = False
+    if not supported:
+        raise RuntimeError(
+            f"lsp-client {version('lsp-client')} is not supported: cancelling "
+            "requests relies on the response table of lsp-client 0.3"
+        )
+
+
+def _sweep(pending: dict[Hashable, Any]) -> None:
+    """Free the slots of abandoned requests the server never answered."""
+    now = anyio.current_time()
+    for req_id, sender in list(pending.items()):
+        if isinstance(sender, _DroppedResponse) and sender.expires < now:
+            logger.debug("Giving up on a late response to request {}", req_id)
+            del pending[req_id]
+
+
+async def _request[R](self: Client, req: LspRequest, schema: type[Response[R]]) -> R:
+    server = self.get_server()
+    if not isinstance(server, StreamServer):
+        return await Client.request(self, req, schema)
+
+    raw_req = request_serialize(req)
+    # Unlike notifications, requests always carry an id
+    req_id = cast(int | str, raw_req["id"])
+    _sweep(server._resp_table._pending)
+    rx = server._resp_table.reserve(req_id)
+    try:
+        with anyio.fail_after(self.request_timeout):
+            await server.send(raw_req)
+            raw_resp = await rx.receive()
+    except BaseException:
+        with anyio.CancelScope(shield=True):
+            await _abandon(self, server, req_id, rx)
+        raise
+    return response_deserialize(raw_resp, schema)
+
+
+async def _abandon(
+    client: Client, server: StreamServer, req_id: int | str, rx: RespReceiver
+) -> None:
+    pending = server._resp_table._pending
+    if req_id not in pending:
+        return
+    # Servers still answer cancelled requests, which must not find the slot
+    # gone, as lsp-client then fails, nor wait for a receiver. One that has
+    # not answered within the request timeout is not expected to anymore.
+    expires = anyio.current_time() + client.request_timeout
+    pending[req_id] = cast(RespSender, _DroppedResponse(expires))
+    rx.receiver.close()
+    try:
+        await client.notify(
+            lsp_type.CancelNotification(params=lsp_type.CancelParams(id=req_id))
+        )
+    except Exception as e:  # noqa: BLE001
+        logger.debug("Failed to cancel request {}: {}", req_id, e)
+
+
+@cache
+def cancellable[C: Client](client_cls: type[C]) -> type[C]:
+    """`client_cls`, with requests cancelled on the server once abandoned.
+
+    lsp-client waits for the answer to every request it sends. A request whose
+    task is cancelled, or which times out, leaves its slot in the response table
+    behind, and the server's late answer then finds nobody waiting for it.
+    Raises `RuntimeError` if the installed lsp-client cannot support this.
+    """
+    _check_internals()
+    return cast(
+        type[C], type(client_cls.__name__, (client_cls,), {"request": _request})
+    )
+
+
+async def until_disconnected[T](
+    request: Request, call: Callable[[], Awaitable[T]]
+) -> T:
+    """Await `call()`, cancelling it once the HTTP client disconnects.
+
+    The request body must be read before, the ASGI receive channel then only
+    reports the disconnect.
+    """
+    results: list[T] = []
+    errors: list[Exception] = []
+    async with anyio.create_task_group() as tg:
+
+        async def watch() -> None:
+            while (await request.receive())["type"] != "http.disconnect":
+                pass
+            tg.cancel_scope.cancel()
+
+        tg.start_soon(watch)
+        try:
+            results.append(await call())
+        except Exception as e:  # noqa: BLE001
+            # Raised below, rather than wrapped in an exception group
+            errors.append(e)
+        tg.cancel_scope.cancel()
+
+    if errors:
+        raise errors[0]
+    if not results:
+        logger.debug("Client disconnected, cancelled {}", request.url.path)
+        raise HTTPException(
+            status_code=CLIENT_CLOSED_STATUS, detail="Client disconnected"
+        )
+    return results[0]
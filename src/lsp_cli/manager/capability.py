@@ -1,8 +1,14 @@
-from typing import Self
+from collections.abc import AsyncGenerator, Sequence
+from functools import partial
+from itertools import batched
+from typing import Any, Final, Self, cast
 
-from attrs import frozen
-from litestar import Controller, post
+import anyio
+from anyio.abc import TaskGroup
+from attrs import field, frozen
+from litestar import Controller, Request, post
 from litestar.datastructures.state import State
+from litestar.exceptions import HTTPException, NotFoundException, ValidationException
 from lsap.capability.definition import (
     DefinitionCapability,
     DefinitionRequest,
@@ -10,9 +16,10 @@ from lsap.capability.definition import (
 )
 from lsap.capability.doc import DocCapability, DocRequest, DocResponse
 from lsap.capability.locate import LocateCapability, LocateRequest, LocateResponse
-from lsap.capability.outline import OutlineCapability, OutlineRequest, OutlineResponse
+from lsap.capability.outline import OutlineCapability, OutlineResponse
 from lsap.capability.reference import (
     ReferenceCapability,
+    ReferenceItem,
     ReferenceRequest,
     ReferenceResponse,
 )
@@ -24,9 +31,111 @@ from lsap.capability.rename import (
     RenamePreviewRequest,
     RenamePreviewResponse,
 )
-from lsap.capability.search import SearchCapability, SearchRequest, SearchResponse
+from lsap.capability.search import (
+    CanResolveWorkspaceSymbol,
+    SearchCapability,
+    SearchItem,
+    SearchRequest,
+    SearchResponse,
+)
 from lsap.capability.symbol import SymbolCapability, SymbolRequest, SymbolResponse
+from lsap.schema.models import SymbolKind
+from lsap.utils.capability import ensure_capability
 from lsp_client import Client
+from lsp_client.capability.request import (
+    WithRequestImplementation,
+    WithRequestReferences,
+    WithRequestWorkspaceSymbol,
+)
+from lsprotocol.types import Location
+from pydantic import BaseModel, ValidationError
+
+from lsp_cli.settings import settings
+
+from .cache import ResponseCache, SingleFlight, collect_paths, file_version
+from .cancel import until_disconnected
+from .items import reference_item, search_items
+from .models import (
+    CapabilityBatchItem,
+    CapabilityBatchRequest,
+    CapabilityBatchResponse,
+    CapabilityBatchResult,
+)
+from .outline import OutlineFilterRequest
+from .scheduler import DEFAULT_SESSION, Scheduler
+from .snapshot import (
+    OutlineSnapshot,
+    SnapshotDefinitionCapability,
+    SnapshotDocCapability,
+    SnapshotLocateCapability,
+    SnapshotOutlineCapability,
+    SnapshotReferenceCapability,
+    SnapshotSymbolCapability,
+)
+
+CAPABILITY_ROUTES: Final[dict[str, tuple[str, type[BaseModel]]]] = {
+    "definition": ("definition", DefinitionRequest),
+    "hover": ("doc", DocRequest),
+    "locate": ("locate", LocateRequest),
+    "outline": ("outline", OutlineFilterRequest),
+    "reference": ("reference", ReferenceRequest),
+    "rename/preview": ("rename_preview", RenamePreviewRequest),
+    "rename/execute": ("rename_execute", RenameExecuteRequest),
+    "search": ("search", SearchRequest),
+    "symbol": ("symbol", SymbolRequest),
+    "batch": ("batch", CapabilityBatchRequest),
+}
+"""Route name under `/capability` -> (`Capabilities` field, request schema)."""
+
+CACHED_ROUTES: Final = frozenset({"definition", "locate"})
+"""Routes whose answers depend only on the files named in request and response."""
+
+WORKSPACE_ROUTES: Final = frozenset(
+    {"hover", "outline", "reference", "search", "symbol"}
+)
+"""Routes whose answers may change with any file in the workspace.
+
+This includes every route with hover text, whose types and signatures may be
+resolved from other files.
+"""
+
+MUTATING_ROUTES: Final = frozenset({"rename/execute"})
+"""Routes with side effects, so identical requests are never shared."""
+
+STREAM_ROUTES: Final[dict[str, tuple[str, type[BaseModel]]]] = {
+    "reference": ("stream_reference", ReferenceRequest),
+    "search": ("stream_search", SearchRequest),
+}
+"""Routes that can also stream their items, -> (`Capabilities` method, schema)."""
+
+STREAM_CHUNK_SIZE: Final = 32
+"""Workspace symbols resolved per round trip when streaming search results,
+and references read ahead of the consumer when streaming them."""
+
+STREAM_CONCURRENCY: Final = 8
+"""Reference snippets read at once when streaming references."""
+
+
+def parse_request(
+    routes: dict[str, tuple[str, type[BaseModel]]],
+    name: str,
+    data: bytes | dict[str, Any],
+) -> tuple[str, BaseModel]:
+    if (route := routes.get(name)) is None:
+        raise NotFoundException(f"Unknown capability: {name}")
+
+    field_name, req_schema = route
+    try:
+        if isinstance(data, bytes):
+            return field_name, req_schema.model_validate_json(data)
+        return field_name, req_schema.model_validate(data)
+    except ValidationError as e:
+        raise ValidationException(str(e)) from e
+
+
+def _page[T](items: Sequence[T], start_index: int, max_items: int | None) -> list[T]:
+    end = None if max_items is None else start_index + max_items
+    return list(items[start_index:end])
 
 
 @frozen
@@ -40,67 +149,322 @@ class Capabilities:
     rename_execute: RenameExecuteCapability
     search: SearchCapability
     symbol: SymbolCapability
+    cache: ResponseCache | None = field(default=None, kw_only=True)
+    scheduler: Scheduler | None = field(default=None, kw_only=True)
+    flights: SingleFlight | None = field(default=None, kw_only=True)
+    task_group: TaskGroup | None = field(default=None, kw_only=True)
+    """Hosts the producers of streamed responses, which outlive each item."""
 
     @classmethod
-    def build(cls, client: Client) -> Self:
+    def build(
+        cls,
+        client: Client,
+        cache: ResponseCache | None = None,
+        snapshot: OutlineSnapshot | None = None,
+        scheduler: Scheduler | None = None,
+        flights: SingleFlight | None = None,
+        task_group: TaskGroup | None = None,
+    ) -> Self:
         return cls(
-            definition=DefinitionCapability(client),
-            doc=DocCapability(client),
-            locate=LocateCapability(client),
-            outline=OutlineCapability(client),
-            reference=ReferenceCapability(client),
+            definition=SnapshotDefinitionCapability(client, snapshot=snapshot),
+            doc=SnapshotDocCapability(client, snapshot=snapshot),
+            locate=SnapshotLocateCapability(client, snapshot=snapshot),
+            outline=SnapshotOutlineCapability(client, snapshot=snapshot),
+            reference=SnapshotReferenceCapability(client, snapshot=snapshot),
             rename_preview=RenamePreviewCapability(client),
             rename_execute=RenameExecuteCapability(client),
             search=SearchCapability(client),
-            symbol=SymbolCapability(client),
+            symbol=SnapshotSymbolCapability(client, snapshot=snapshot),
+            cache=cache,
+            scheduler=scheduler,
+            flights=flights,
+            task_group=task_group,
+        )
+
+    async def dispatch(
+        self,
+        name: str,
+        data: bytes | dict[str, Any],
+        session: str = DEFAULT_SESSION,
+    ) -> BaseModel | None:
+        """Validate a raw request body and run it through the named capability.
+
+        Cacheable routes are answered from `cache` while the files they were
+        derived from are unchanged. Identical requests in flight at once share
+        one computation through `flights`, which waits for a `scheduler` slot
+        that `session` shares fairly with other callers.
+        """
+        field_name, req = parse_request(CAPABILITY_ROUTES, name, data)
+        if isinstance(req, CapabilityBatchRequest):
+            return await self.batch(req, session)
+
+        workspace = name in WORKSPACE_ROUTES
+        cache = self.cache if workspace or name in CACHED_ROUTES else None
+        key = ResponseCache.make_key(name, req)
+        if cache is not None and (entry := cache.get(key)):
+            return entry.value
+
+        files = collect_paths(req.model_dump())
+
+        async def run() -> BaseModel | None:
+            resp = await self._run(name, field_name, req, session)
+            if cache is not None:
+                cache_files = set(files)
+                if resp is not None:
+                    collect_paths(resp.model_dump(), cache_files)
+                cache.put(key, resp, cache_files, workspace=workspace)
+            return resp
+
+        if self.flights is None or name in MUTATING_ROUTES:
+            return await run()
+        versions = tuple(sorted((path, file_version(path)) for path in files))
+        return await self.flights.do((key, versions), run)
+
+    def stream(
+        self,
+        name: str,
+        data: bytes | dict[str, Any],
+        session: str = DEFAULT_SESSION,
+    ) -> AsyncGenerator[BaseModel]:
+        """Validate a raw request body and stream the named capability's items.
+
+        Validation errors are raised here, before the first item is produced.
+        """
+        field_name, req = parse_request(STREAM_ROUTES, name, data)
+        items = getattr(self, field_name)(req)
+        if self.scheduler is None:
+            return items
+        return self.scheduler.stream(name, items, session)
+
+    async def _run(
+        self, name: str, field_name: str, req: BaseModel, session: str
+    ) -> BaseModel | None:
+        if self.scheduler is None:
+            return await getattr(self, field_name)(req)
+        async with self.scheduler.slot(name, session):
+            return await getattr(self, field_name)(req)
+
+    async def stream_reference(
+        self, req: ReferenceRequest
+    ) -> AsyncGenerator[ReferenceItem]:
+        """Yield references in completion order as each snippet is read.
+
+        Snippets are read by a producer task in `task_group`, at most
+        `STREAM_CONCURRENCY` at once and `STREAM_CHUNK_SIZE` ahead of the
+        consumer. Pagination is applied to the raw locations; `pagination_id`
+        is ignored.
+        """
+        if self.task_group is None:
+            raise RuntimeError("Streaming references needs a task group")
+        client = self.reference.client
+        if not (loc_resp := await self.reference.locate(req)):
+            return
+
+        file_path, lsp_pos = loc_resp.file_path, loc_resp.position.to_lsp()
+        if req.mode == "references":
+            locations = await ensure_capability(
+                client, WithRequestReferences
+            ).request_references(file_path, lsp_pos, include_declaration=True)
+        else:
+            locations = await ensure_capability(
+                client, WithRequestImplementation
+            ).request_implementation_locations(file_path, lsp_pos)
+        page = _page(locations or [], req.start_index, req.max_items)
+
+        send, receive = anyio.create_memory_object_stream[ReferenceItem](
+            STREAM_CHUNK_SIZE
         )
+        producer = anyio.CancelScope()
+        errors: list[Exception] = []
+        done = anyio.Event()
+
+        async def process(
+            loc: Location, limiter: anyio.CapacityLimiter, token: object
+        ) -> None:
+            try:
+                item = await reference_item(client, loc, req.context_lines)
+            finally:
+                limiter.release_on_behalf_of(token)
+            if item:
+                await send.send(item)
+
+        async def produce() -> None:
+            limiter = anyio.CapacityLimiter(STREAM_CONCURRENCY)
+            try:
+                with producer, send:
+                    async with anyio.create_task_group() as tg:
+                        for loc in page:
+                            token = object()
+                            await limiter.acquire_on_behalf_of(token)
+                            tg.start_soon(process, loc, limiter, token)
+                    done.set()
+            except* (anyio.BrokenResourceError, anyio.ClosedResourceError):
+                # The consumer stopped reading
+                pass
+            except* Exception as group:  # noqa: BLE001
+                # Raised to the consumer, not into the host task group
+                errors.extend(group.exceptions)
+
+        self.task_group.start_soon(produce)
+        try:
+            with receive:
+                async for item in receive:
+                    yield item
+        finally:
+            producer.cancel()
+        if errors:
+            raise errors[0]
+        if not done.is_set():
+            raise RuntimeError("Reference stream stopped before it was complete")
+
+    async def stream_search(self, req: SearchRequest) -> AsyncGenerator[SearchItem]:
+        """Yield search results, resolving them `STREAM_CHUNK_SIZE` at a time.
+
+        Pagination is applied to the raw symbols; `pagination_id` is ignored.
+        """
+        client = self.search.client
+        symbols = await ensure_capability(
+            client, WithRequestWorkspaceSymbol
+        ).request_workspace_symbol_list(req.query)
+        if req.kinds:
+            kinds = set(req.kinds)
+            symbols = [s for s in symbols if SymbolKind.from_lsp(s.kind) in kinds]
+
+        page = _page(symbols, req.start_index, req.max_items)
+        for chunk in batched(page, STREAM_CHUNK_SIZE, strict=False):
+            resolved: Sequence = chunk
+            if isinstance(client, CanResolveWorkspaceSymbol):
+                resolved = await client.resolve_workspace_symbols(chunk)
+            for item in search_items(client, resolved):
+                yield item
+
+    async def batch(
+        self, req: CapabilityBatchRequest, session: str = DEFAULT_SESSION
+    ) -> CapabilityBatchResponse:
+        """Run heterogeneous requests concurrently, collecting per-item errors."""
+        limiter = anyio.CapacityLimiter(req.concurrency or settings.batch_concurrency)
+        results = [CapabilityBatchResult() for _ in req.items]
+
+        async def run(item: CapabilityBatchItem, result: CapabilityBatchResult) -> None:
+            try:
+                async with limiter:
+                    resp = await self.dispatch(item.capability, item.request, session)
+                result.result = resp.model_dump(mode="json") if resp else None
+            except HTTPException as e:
+                result.error = e.detail
+            except Exception as e:  # noqa: BLE001
+                result.error = str(e)
+
+        async with anyio.create_task_group() as tg:
+            for item, result in zip(req.items, results, strict=True):
+                if item.capability == "batch":
+                    result.error = "Batches cannot be nested"
+                    continue
+                tg.start_soon(run, item, result)
+
+        return CapabilityBatchResponse(items=results)
 
 
 class CapabilityController(Controller):
+    """Capability routes of a client's own socket.
+
+    Requests go through `Capabilities.dispatch`, as those relayed by the manager,
+    so they share the client's cache and request slots. A request is cancelled,
+    on the language server too, once its caller disconnects.
+    """
+
     path = "/capability"
 
+    @staticmethod
+    async def _dispatch[T: BaseModel](
+        name: str,
+        resp_schema: type[T],
+        body: bytes,
+        session: str | None,
+        state: State,
+        request: Request,
+    ) -> T | None:
+        capabilities: Capabilities = state.capabilities
+        resp = await until_disconnected(
+            request,
+            partial(capabilities.dispatch, name, body, session or DEFAULT_SESSION),
+        )
+        return cast(T | None, resp)
+
     @post("/definition")
     async def definition(
-        self, data: DefinitionRequest, state: State
+        self, body: bytes, state: State, request: Request, session: str | None = None
     ) -> DefinitionResponse | None:
-        return await state.capabilities.definition(data)
+        return await self._dispatch(
+            "definition", DefinitionResponse, body, session, state, request
+        )
 
     @post("/hover")
-    async def hover(self, data: DocRequest, state: State) -> DocResponse | None:
-        return await state.capabilities.doc(data)
+    async def hover(
+        self, body: bytes, state: State, request: Request, session: str | None = None
+    ) -> DocResponse | None:
+        return await self._dispatch("hover", DocResponse, body, session, state, request)
 
     @post("/locate")
-    async def locate(self, data: LocateRequest, state: State) -> LocateResponse | None:
-        return await state.capabilities.locate(data)
+    async def locate(
+        self, body: bytes, state: State, request: Request, session: str | None = None
+    ) -> LocateResponse | None:
+        return await self._dispatch(
+            "locate", LocateResponse, body, session, state, request
+        )
 
     @post("/outline")
     async def outline(
-        self, data: OutlineRequest, state: State
+        self, body: bytes, state: State, request: Request, session: str | None = None
     ) -> OutlineResponse | None:
-        return await state.capabilities.outline(data)
+        return await self._dispatch(
+            "outline", OutlineResponse, body, session, state, request
+        )
 
     @post("/reference")
     async def reference(
-        self, data: ReferenceRequest, state: State
+        self, body: bytes, state: State, request: Request, session: str | None = None
     ) -> ReferenceResponse | None:
-        return await state.capabilities.reference(data)
+        return await self._dispatch(
+            "reference", ReferenceResponse, body, session, state, request
+        )
 
     @post("/rename/preview")
     async def rename_preview(
-        self, data: RenamePreviewRequest, state: State
+        self, body: bytes, state: State, request: Request, session: str | None = None
     ) -> RenamePreviewResponse | None:
-        return await state.capabilities.rename_preview(data)
+        return await self._dispatch(
+            "rename/preview", RenamePreviewResponse, body, session, state, request
+        )
 
     @post("/rename/execute")
     async def rename_execute(
-        self, data: RenameExecuteRequest, state: State
+        self, body: bytes, state: State, request: Request, session: str | None = None
     ) -> RenameExecuteResponse | None:
-        return await state.capabilities.rename_execute(data)
+        return await self._dispatch(
+            "rename/execute", RenameExecuteResponse, body, session, state, request
+        )
 
     @post("/search")
-    async def search(self, data: SearchRequest, state: State) -> SearchResponse | None:
-        return await state.capabilities.search(data)
+    async def search(
+        self, body: bytes, state: State, request: Request, session: str | None = None
+    ) -> SearchResponse | None:
+        return await self._dispatch(
+            "search", SearchResponse, body, session, state, request
+        )
 
     @post("/symbol")
-    async def symbol(self, data: SymbolRequest, state: State) -> SymbolResponse | None:
-        return await state.capabilities.symbol(data)
+    async def symbol(
+        self, body: bytes, state: State, request: Request, session: str | None = None
+    ) -> SymbolResponse | None:
+        return await self._dispatch(
+            "symbol", SymbolResponse, body, session, state, request
+        )
+
+    @post("/batch")
+    async def batch(
+        self, body: bytes, state: State, request: Request, session: str | None = None
+    ) -> CapabilityBatchResponse | None:
+        return await self._dispatch(
+            "batch", CapabilityBatchResponse, body, session, state, request
+        )
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import os
+import socket
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import cast
 
 import anyio
 import asyncer
@@ -12,12 +15,36 @@ import xxhash
 from attrs import define, field
 from litestar import Litestar, Request, Response
 from loguru import logger as global_logger
+from lsap.schema.locate import LocateRequest
+from lsap.schema.outline import OutlineRequest
+from lsap.schema.search import SearchRequest
+from pydantic import BaseModel
 
 from lsp_cli.client import ClientTarget
-from lsp_cli.manager.capability import Capabilities, CapabilityController
-from lsp_cli.settings import CLIENT_LOG_DIR, RUNTIME_DIR, settings
+from lsp_cli.manager.capability import (
+    CAPABILITY_ROUTES,
+    STREAM_ROUTES,
+    Capabilities,
+    CapabilityController,
+    parse_request,
+)
+from lsp_cli.settings import (
+    CLIENT_LOG_DIR,
+    INDEX_DIR,
+    RUNTIME_DIR,
+    SNAPSHOT_DIR,
+    settings,
+)
+from lsp_cli.utils.socket import listen_unix, unlink_unix
 
+from .cache import ResponseCache, SingleFlight
+from .cancel import cancellable
+from .index import SymbolIndex
+from .memory import ProcessMemory
 from .models import ManagedClientInfo
+from .scheduler import DEFAULT_SESSION, Scheduler
+from .snapshot import OutlineSnapshot
+from .watcher import WorkspaceWatcher
 
 
 def get_client_id(target: ClientTarget) -> str:
@@ -30,9 +57,25 @@ def get_client_id(target: ClientTarget) -> str:
 class ManagedClient:
     target: ClientTarget
 
-    _server: uvicorn.Server = field(init=False)
-    _timeout_scope: anyio.CancelScope = field(init=False)
-    _server_scope: anyio.CancelScope = field(init=False)
+    _uds_path: Path | None = field(init=False, default=None)
+    _sock: socket.socket | None = field(init=False, default=None)
+    _sock_stat: os.stat_result | None = field(init=False, default=None)
+    _capabilities: Capabilities | None = field(init=False, default=None)
+    _ready: anyio.Event = field(init=False, factory=anyio.Event)
+    _cache: ResponseCache = field(
+        init=False, factory=lambda: ResponseCache(settings.cache_max_bytes)
+    )
+    _scheduler: Scheduler = field(init=False, factory=Scheduler.create)
+    _flights: SingleFlight = field(init=False, factory=SingleFlight)
+    _watcher: WorkspaceWatcher | None = field(init=False, default=None)
+    _index: SymbolIndex | None = field(init=False, default=None)
+    _snapshot: OutlineSnapshot | None = field(init=False, default=None)
+    _pid: int | None = field(init=False, default=None)
+    memory: ProcessMemory = field(init=False, factory=ProcessMemory)
+    """Measured by the manager, see `pid`."""
+
+    _timeout_scope: anyio.CancelScope = field(init=False, factory=anyio.CancelScope)
+    _run_scope: anyio.CancelScope = field(init=False, factory=anyio.CancelScope)
 
     _deadline: float = field(init=False)
     _should_exit: bool = False
@@ -59,13 +102,46 @@ class ManagedClient:
         self._logger = global_logger.bind(client_id=self.id)
         self._logger.info("Client log initialized at {}", log_path)
 
+        if settings.client_sockets:
+            self._uds_path = RUNTIME_DIR / f"{self.id}.sock"
+            # Listen before the language server starts, so early connections
+            # wait in the accept backlog instead of being refused and retried.
+            self._sock = listen_unix(self._uds_path)
+            self._sock_stat = self._uds_path.stat()
+
+        if settings.symbol_index:
+            self._index = SymbolIndex.open(
+                INDEX_DIR / f"{self.id}.sqlite",
+                root=self.target.project_path,
+                suffixes=self.target.client_cls.get_language_config().suffixes,
+            )
+        if settings.snapshot_max_bytes:
+            self._snapshot = OutlineSnapshot.open(
+                SNAPSHOT_DIR / f"{self.id}.sqlite", settings.snapshot_max_bytes
+            )
+
     @property
     def id(self) -> str:
         return get_client_id(self.target)
 
     @property
-    def uds_path(self) -> Path:
-        return RUNTIME_DIR / f"{self.id}.sock"
+    def uds_path(self) -> Path | None:
+        """The client's own socket, `None` when only the manager serves it."""
+        return self._uds_path
+
+    @property
+    def pid(self) -> int | None:
+        """The local language server process, once started."""
+        return self._pid
+
+    @property
+    def deadline(self) -> float:
+        """When the client times out unless used again, earliest if least recently used."""
+        return self._deadline
+
+    @property
+    def stopping(self) -> bool:
+        return self._run_scope.cancel_called
 
     @property
     def info(self) -> ManagedClientInfo:
@@ -73,23 +149,75 @@ class ManagedClient:
             project_path=self.target.project_path,
             language=self.target.client_cls.get_language_config().kind.value,
             remaining_time=max(0.0, self._deadline - anyio.current_time()),
+            cache=self._cache.stats if settings.cache_max_bytes else None,
+            queues=self._scheduler.stats,
+            coalesced=self._flights.coalesced,
+            rss=self.memory.rss,
+            peak_rss=self.memory.peak_rss if self.memory.rss is not None else None,
         )
 
     def stop(self) -> None:
         self._logger.info("Stopping managed client")
         self._should_exit = True
-        self._server.should_exit = True
-        self._server_scope.cancel()
-        self._timeout_scope.cancel()
+        self._run_scope.cancel()
 
     def _reset_timeout(self) -> None:
         self._deadline = anyio.current_time() + settings.idle_timeout
         self._timeout_scope.cancel()
 
+    async def request(
+        self, name: str, data: bytes, session: str = DEFAULT_SESSION
+    ) -> BaseModel | None:
+        """Run a capability request, waiting for the language server to start."""
+        self._reset_timeout()
+        if resp := self._from_disk(name, data):
+            return resp
+
+        await self._ready.wait()
+        if self._watcher:
+            await self._watcher.settled()
+        if self._capabilities is None:
+            raise RuntimeError(f"Client {self.id} is not running")
+        return await self._capabilities.dispatch(name, data, session)
+
+    def _from_disk(self, name: str, data: bytes) -> BaseModel | None:
+        """Answer from the symbol index or outline snapshot, if they can.
+
+        Neither needs the language server, so this works right after a restart.
+        Once the server is up, the capabilities consult the snapshot themselves,
+        behind the in-memory response cache.
+        """
+        starting = not self._ready.is_set()
+        match name:
+            case "search" if self._index and self._index.ready:
+                _, req = parse_request(CAPABILITY_ROUTES, name, data)
+                return self._index.search(cast(SearchRequest, req))
+            case "outline" if self._snapshot and starting:
+                _, req = parse_request(CAPABILITY_ROUTES, name, data)
+                return self._snapshot.outline(cast(OutlineRequest, req))
+            case "locate" if self._snapshot and starting:
+                _, req = parse_request(CAPABILITY_ROUTES, name, data)
+                return self._snapshot.locate(cast(LocateRequest, req))
+        return None
+
+    async def open_stream(
+        self, name: str, data: bytes, session: str = DEFAULT_SESSION
+    ) -> AsyncGenerator[BaseModel]:
+        """Validate a streaming capability request once the server is ready."""
+        self._reset_timeout()
+        if name == "search" and self._index and self._index.ready:
+            _, req = parse_request(STREAM_ROUTES, name, data)
+            return self._index.stream(cast(SearchRequest, req))
+
+        await self._ready.wait()
+        if self._watcher:
+            await self._watcher.settled()
+        if self._capabilities is None:
+            raise RuntimeError(f"Client {self.id} is not running")
+        return self._capabilities.stream(name, data, session)
+
     async def _timeout_loop(self) -> None:
         while not self._should_exit:
-            if self._server.should_exit:
-                break
             remaining = self._deadline - anyio.current_time()
             if remaining <= 0:
                 break
@@ -97,19 +225,13 @@ class ManagedClient:
                 self._timeout_scope = scope
                 await anyio.sleep(remaining)
 
-        self._server.should_exit = True
-        self._server_scope.cancel()
+        self._run_scope.cancel()
 
-    async def _serve(self) -> None:
+    async def _serve(self, capabilities: Capabilities, sock: socket.socket) -> None:
         @asynccontextmanager
         async def lifespan(app: Litestar) -> AsyncGenerator[None]:
-            async with self.target.client_cls(
-                workspace=self.target.project_path,
-                request_timeout=120,
-            ) as client:
-                app.state.client = client
-                app.state.capabilities = Capabilities.build(client)
-                yield
+            app.state.capabilities = capabilities
+            yield
 
         def exception_handler(request: Request, exc: Exception) -> Response:
             self._logger.exception("Unhandled exception in Litestar: {}", exc)
@@ -125,31 +247,74 @@ class ManagedClient:
             exception_handlers={Exception: exception_handler},
         )
 
-        config = uvicorn.Config(app, uds=str(self.uds_path), loop="asyncio")
-        self._server = uvicorn.Server(config)
-
-        async with asyncer.create_task_group() as tg:
-            with anyio.CancelScope() as scope:
-                self._server_scope = scope
-                tg.soonify(self._timeout_loop)()
-                await self._server.serve()
+        config = uvicorn.Config(app, loop="asyncio")
+        await uvicorn.Server(config).serve(sockets=[sock])
 
     async def run(self) -> None:
         self._logger.info(
             "Starting managed client for project {} at {}",
             self.target.project_path,
-            self.uds_path,
+            self.uds_path or "the manager socket",
         )
 
-        uds_path = anyio.Path(self.uds_path)
-        await uds_path.unlink(missing_ok=True)
-        await uds_path.parent.mkdir(parents=True, exist_ok=True)
-
         try:
-            await self._serve()
+            with self._run_scope:
+                async with asyncer.create_task_group() as tg:
+                    tg.soonify(self._timeout_loop)()
+                    async with cancellable(self.target.client_cls)(
+                        workspace=self.target.project_path,
+                        request_timeout=120,
+                    ) as client:
+                        # Private to lsp-client, memory goes unaccounted without it
+                        process = getattr(client.get_server(), "_process", None)
+                        self._pid = getattr(process, "pid", None)
+                        if self._pid is None:
+                            self._logger.debug(
+                                "Server process unknown, its memory is not measured"
+                            )
+                        cache = self._cache if settings.cache_max_bytes else None
+                        self._capabilities = Capabilities.build(
+                            client,
+                            cache=cache,
+                            snapshot=self._snapshot,
+                            scheduler=self._scheduler,
+                            flights=self._flights,
+                            task_group=tg,
+                        )
+                        if settings.watch_files:
+                            self._watcher = WorkspaceWatcher(
+                                root=self.target.project_path,
+                                client=client,
+                                logger=self._logger,
+                                cache=cache,
+                                index=self._index,
+                            )
+                        self._ready.set()
+                        async with asyncer.create_task_group() as serve_tg:
+                            if self._watcher:
+                                serve_tg.soonify(self._watcher.run)()
+                            if self._index:
+                                serve_tg.soonify(self._index.run)(client, self._logger)
+                            if self._sock:
+                                await self._serve(self._capabilities, self._sock)
+                            else:
+                                await anyio.sleep_forever()
+                            serve_tg.cancel_scope.cancel()
+                    tg.cancel_scope.cancel()
         finally:
             self._logger.info("Cleaning up client")
-            await uds_path.unlink(missing_ok=True)
+            # Wake pending requests, which now see the client is gone
+            self._capabilities = None
+            self._watcher = None
+            self._pid = None
+            self._ready.set()
+            if self._sock:
+                self._sock.close()
+            if self._index:
+                self._index.close()
+            if self._snapshot:
+                self._snapshot.close()
+            if self._uds_path and self._sock_stat:
+                # A replacement client may already listen at the same path
+                await unlink_unix(self._uds_path, self._sock_stat)
             self._logger.remove(self._logger_sink_id)
-            self._timeout_scope.cancel()
-            self._server_scope.cancel()
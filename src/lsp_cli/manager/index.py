@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from collections.abc import AsyncGenerator, Iterable, Sequence
+from pathlib import Path
+from typing import Final, Self
+
+import anyio
+import anyio.to_thread
+import loguru
+import xxhash
+from attrs import define, field
+from lsap.schema.models import SymbolKind
+from lsap.schema.search import SearchItem, SearchRequest, SearchResponse
+from lsp_client import Client
+from lsp_client.capability.request import WithRequestDocumentSymbol
+from lsprotocol import types as lsp_type
+from watchfiles import DefaultFilter
+
+from lsp_cli.settings import settings
+
+SCHEMA_VERSION: Final = 2
+"""Bumped whenever what is indexed changes, so older indexes are rebuilt."""
+
+SCHEMA: Final = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    line INTEGER,
+    container TEXT
+);
+CREATE INDEX IF NOT EXISTS symbols_path ON symbols (path);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name COLLATE NOCASE);
+CREATE VIRTUAL TABLE IF NOT EXISTS symbol_names USING fts5 (
+    name, content='symbols', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS symbols_insert AFTER INSERT ON symbols BEGIN
+    INSERT INTO symbol_names (rowid, name) VALUES (new.id, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS symbols_delete AFTER DELETE ON symbols BEGIN
+    INSERT INTO symbol_names (symbol_names, rowid, name)
+    VALUES ('delete', old.id, old.name);
+END;
+"""
+
+# Shorter queries have no trigram to look up and fall back to a prefix scan
+MIN_TRIGRAM_QUERY: Final = 3
+
+# Indexing competes with interactive requests for the language server
+INDEX_CONCURRENCY: Final = 2
+
+# Symbols below these are locals and parameters, which `workspace/symbol` omits
+CALLABLE_KINDS: Final = frozenset(
+    {
+        lsp_type.SymbolKind.Function,
+        lsp_type.SymbolKind.Method,
+        lsp_type.SymbolKind.Constructor,
+    }
+)
+
+type FileStat = tuple[int, int]
+"""(mtime_ns, size) of a file, used to skip re-reading unchanged files."""
+
+
+def to_search_items(
+    file_path: Path,
+    symbols: Sequence[lsp_type.DocumentSymbol] | Sequence[lsp_type.SymbolInformation],
+    container: str | None = None,
+) -> list[SearchItem]:
+    """Flatten a `textDocument/documentSymbol` result into search items.
+
+    Only declarations are kept, not the symbols declared inside a function.
+    """
+    callables = {
+        symbol.name
+        for symbol in symbols
+        if isinstance(symbol, lsp_type.SymbolInformation)
+        and symbol.kind in CALLABLE_KINDS
+    }
+    items: list[SearchItem] = []
+    for symbol in symbols:
+        match symbol:
+            case lsp_type.DocumentSymbol():
+                line, parent = symbol.selection_range.start.line, container
+            case lsp_type.SymbolInformation():
+                # Flat results only name the container, look it up by name
+                if symbol.container_name in callables:
+                    continue
+                line, parent = symbol.location.range.start.line, symbol.container_name
+        items.append(
+            SearchItem(
+                name=symbol.name,
+                kind=SymbolKind.from_lsp(symbol.kind),
+                file_path=file_path,
+                line=line + 1,
+                container=parent,
+            )
+        )
+        if (
+            isinstance(symbol, lsp_type.DocumentSymbol)
+            and symbol.children
+            and symbol.kind not in CALLABLE_KINDS
+        ):
+            items.extend(to_search_items(file_path, symbol.children, symbol.name))
+    return items
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    db = sqlite3.connect(path)
+    if (version := db.execute("PRAGMA user_version").fetchone()[0]) not in (
+        0,
+        SCHEMA_VERSION,
+    ):
+        db.close()
+        raise sqlite3.DatabaseError(f"Unsupported index schema version {version}")
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    db.executescript(SCHEMA)
+    db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return db
+
+
+@define
+class SymbolIndex:
+    """Persistent per-project index of document symbols, searchable by name.
+
+    Symbols are stored in sqlite with an FTS5 trigram table over their names,
+    so substring queries stay fast on large projects. Files are re-indexed
+    only when their content digest changes, and the index outlives the
+    language server, so `search` can be answered before one is running.
+    """
+
+    root: Path
+    suffixes: Sequence[str]
+    _db: sqlite3.Connection
+    ignore_dirs: frozenset[str] = field(
+        factory=lambda: frozenset({*DefaultFilter.ignore_dirs, *settings.ignore_paths})
+    )
+
+    _stale: set[Path] = field(init=False, factory=set)
+    _wake: anyio.Event = field(init=False, factory=anyio.Event)
+
+    @classmethod
+    def open(cls, path: Path, root: Path, suffixes: Sequence[str]) -> Self:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            db = _connect(path)
+        except sqlite3.DatabaseError:
+            # Outdated or corrupt indexes are rebuilt from scratch
+            path.unlink(missing_ok=True)
+            db = _connect(path)
+        return cls(root, suffixes, db)
+
+    def close(self) -> None:
+        self._db.close()
+
+    @property
+    def ready(self) -> bool:
+        """Whether a full pass over the project has completed at least once."""
+        row = self._db.execute("SELECT 1 FROM meta WHERE key = 'complete'").fetchone()
+        return row is not None
+
+    def search(self, req: SearchRequest) -> SearchResponse:
+        query = req.query
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        if len(query) >= MIN_TRIGRAM_QUERY:
+            source = "symbol_names JOIN symbols s ON s.id = symbol_names.rowid"
+            where, params = (
+                ["symbol_names MATCH ?"],
+                ['"' + query.replace('"', '""') + '"'],
+            )
+        else:
+            source = "symbols s"
+            where, params = ["s.name LIKE ? ESCAPE '\\'"], [escaped + "%"]
+        if req.kinds:
+            where.append(f"s.kind IN ({', '.join('?' * len(req.kinds))})")
+            params.extend(kind.value for kind in req.kinds)
+        condition = " AND ".join(where)
+
+        (total,) = self._db.execute(
+            f"SELECT count(*) FROM {source} WHERE {condition}", params
+        ).fetchone()
+        # Exact matches first, then prefixes, then the shortest names
+        rows = self._db.execute(
+            f"SELECT s.path, s.name, s.kind, s.line, s.container FROM {source} "
+            f"WHERE {condition} "
+            "ORDER BY s.name = ? COLLATE NOCASE DESC, "
+            "s.name LIKE ? ESCAPE '\\' DESC, length(s.name), s.name, s.path, s.line "
+            "LIMIT ? OFFSET ?",
+            [
+                *params,
+                query,
+                escaped + "%",
+                -1 if req.max_items is None else req.max_items,
+                req.start_index,
+            ],
+        ).fetchall()
+
+        items = [
+            SearchItem(
+                name=name,
+                kind=SymbolKind(kind),
+                file_path=Path(path),
+                line=line,
+                container=container,
+            )
+            for path, name, kind, line, container in rows
+        ]
+        return SearchResponse(
+            request=req,
+            items=items,
+            start_index=req.start_index,
+            max_items=req.max_items,
+            total=total,
+            has_more=req.start_index + len(items) < total,
+        )
+
+    async def stream(self, req: SearchRequest) -> AsyncGenerator[SearchItem]:
+        for item in self.search(req).items:
+            yield item
+
+    def replace(
+        self, path: Path, stat: FileStat, digest: str, items: Iterable[SearchItem]
+    ) -> None:
+        key = path.as_posix()
+        with self._db:
+            self._db.execute("DELETE FROM symbols WHERE path = ?", (key,))
+            self._db.executemany(
+                "INSERT INTO symbols (path, name, kind, line, container) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, item.name, item.kind.value, item.line, item.container)
+                    for item in items
+                ],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (key, *stat, digest)
+            )
+
+    def replace_stat(self, path: Path, stat: FileStat) -> None:
+        with self._db:
+            self._db.execute(
+                "UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?",
+                (*stat, path.as_posix()),
+            )
+
+    def remove(self, paths: Iterable[Path]) -> None:
+        keys = [(path.as_posix(),) for path in paths]
+        with self._db:
+            self._db.executemany("DELETE FROM symbols WHERE path = ?", keys)
+            self._db.executemany("DELETE FROM files WHERE path = ?", keys)
+
+    def files(self) -> dict[Path, tuple[FileStat, str]]:
+        rows = self._db.execute("SELECT path, mtime_ns, size, digest FROM files")
+        return {Path(p): ((mtime, size), digest) for p, mtime, size, digest in rows}
+
+    def is_source(self, path: Path) -> bool:
+        try:
+            relative = path.relative_to(self.root)
+        except ValueError:
+            return False
+        return path.name.endswith(tuple(self.suffixes)) and not any(
+            part in self.ignore_dirs for part in relative.parts[:-1]
+        )
+
+    def scan(self) -> dict[Path, FileStat]:
+        """Stat every source file under `root`, skipping ignored directories."""
+        found: dict[Path, FileStat] = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in self.ignore_dirs]
+            for name in filenames:
+                if not name.endswith(tuple(self.suffixes)):
+                    continue
+                path = Path(dirpath, name)
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                found[path] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def mark_stale(self, paths: Iterable[Path]) -> None:
+        """Queue changed files for re-indexing by `run`."""
+        self._stale.update(path for path in paths if self.is_source(path))
+        if self._stale:
+            self._wake.set()
+
+    async def run(self, client: Client, logger: loguru.Logger) -> None:
+        """Bring the index up to date, then follow `mark_stale` until cancelled."""
+        if not isinstance(client, WithRequestDocumentSymbol):
+            return
+
+        found = await anyio.to_thread.run_sync(self.scan)
+        known = self.files()
+        self.remove(known.keys() - found.keys())
+        stale = [
+            p for p, stat in found.items() if p not in known or known[p][0] != stat
+        ]
+        logger.info("Indexing symbols of {}/{} files", len(stale), len(found))
+        await self._update(client, logger, stale)
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('complete', '1')")
+        logger.info("Symbol index is up to date")
+
+        while True:
+            await self._wake.wait()
+            self._wake = anyio.Event()
+            stale, self._stale = list(self._stale), set()
+            await self._update(client, logger, stale)
+
+    async def _update(
+        self,
+        client: WithRequestDocumentSymbol,
+        logger: loguru.Logger,
+        paths: Sequence[Path],
+    ) -> None:
+        limiter = anyio.CapacityLimiter(INDEX_CONCURRENCY)
+        known = self.files()
+
+        async def index_file(path: Path) -> None:
+            async with limiter:
+                try:
+                    stat = path.stat()
+                    digest = xxhash.xxh3_64_hexdigest(
+                        await anyio.Path(path).read_bytes()
+                    )
+                except OSError:
+                    self.remove([path])
+                    return
+
+                if (old := known.get(path)) and old[1] == digest:
+                    # Touched but unchanged, only remember the new stat
+                    self.replace_stat(path, (stat.st_mtime_ns, stat.st_size))
+                    return
+
+                try:
+                    symbols = await client.request_document_symbol(path)
+                except Exception as e:  # noqa: BLE001
+                    logger.warning("Failed to index symbols of {}: {}", path, e)
+                    return
+                items = to_search_items(path, symbols or [])
+                self.replace(path, (stat.st_mtime_ns, stat.st_size), digest, items)
+
+        async with anyio.create_task_group() as tg:
+            for path in paths:
+                tg.start_soon(index_file, path)
@@ -0,0 +1,88 @@
+"""Streamed response items, built from LSP results.
+
+lsap's capabilities only build whole responses, so the streaming routes build
+their items here, the same way lsap does.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+from lsap.schema.models import Location as LSAPLocation
+from lsap.schema.models import Position, Range, SymbolDetailInfo, SymbolKind
+from lsap.schema.reference import ReferenceItem
+from lsap.schema.search import SearchItem
+from lsap.utils.capability import ensure_capability
+from lsap.utils.document import DocumentReader
+from lsap.utils.markdown import clean_hover_content
+from lsap.utils.symbol import symbol_at
+from lsp_client import Client
+from lsp_client.capability.request import WithRequestDocumentSymbol, WithRequestHover
+from lsprotocol import types as lsp_type
+
+
+def _range(lsp_range: lsp_type.Range) -> Range:
+    return Range(
+        start=Position.from_lsp(lsp_range.start), end=Position.from_lsp(lsp_range.end)
+    )
+
+
+async def reference_item(
+    client: Client, loc: lsp_type.Location, context_lines: int
+) -> ReferenceItem | None:
+    """The reference at `loc`, with its surrounding code and enclosing symbol."""
+    file_path = client.from_uri(loc.uri)
+    reader = DocumentReader(await client.read_file(file_path))
+    line = loc.range.start.line
+    context = lsp_type.Range(
+        start=lsp_type.Position(line=max(0, line - context_lines), character=0),
+        end=lsp_type.Position(line=line + context_lines + 1, character=0),
+    )
+    if not (snippet := reader.read(context)):
+        return None
+
+    symbol: SymbolDetailInfo | None = None
+    symbols = await ensure_capability(
+        client, WithRequestDocumentSymbol
+    ).request_document_symbol_list(file_path)
+    if symbols and (match := symbol_at(symbols, loc.range.start)):
+        path, sym = match
+        symbol = SymbolDetailInfo(
+            file_path=file_path,
+            name=sym.name,
+            path=path,
+            kind=SymbolKind.from_lsp(sym.kind),
+            detail=sym.detail,
+            range=_range(sym.range),
+        )
+        if hover := await ensure_capability(client, WithRequestHover).request_hover(
+            file_path, loc.range.start
+        ):
+            symbol.hover = clean_hover_content(hover.value)
+
+    return ReferenceItem(
+        location=LSAPLocation(file_path=file_path, range=_range(loc.range)),
+        code=snippet.content,
+        symbol=symbol,
+    )
+
+
+def search_items(
+    client: Client,
+    symbols: Sequence[lsp_type.WorkspaceSymbol | lsp_type.SymbolInformation],
+) -> list[SearchItem]:
+    """`workspace/symbol` results as search items."""
+    return [
+        SearchItem(
+            name=symbol.name,
+            kind=SymbolKind.from_lsp(symbol.kind),
+            file_path=client.from_uri(symbol.location.uri),
+            line=(
+                symbol.location.range.start.line + 1
+                if isinstance(symbol.location, lsp_type.Location)
+                else None
+            ),
+            container=symbol.container_name,
+        )
+        for symbol in symbols
+    ]
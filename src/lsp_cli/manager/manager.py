@@ -1,36 +1,70 @@
 from __future__ import annotations
 
+import socket
+from collections import Counter
 from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+from contextlib import aclosing, asynccontextmanager
+from functools import partial
 from pathlib import Path
 from typing import Final, cast
 
 import anyio
+import anyio.to_thread
 import asyncer
+import msgspec
 from attrs import Factory, define, field
-from litestar import Litestar, delete, get, post
+from litestar import Litestar, Request, Response, delete, get, post
 from litestar.datastructures import State
 from litestar.di import Provide
-from litestar.exceptions import NotFoundException
+from litestar.exceptions import HTTPException, NotFoundException, ValidationException
+from litestar.response import Stream
 from loguru import logger
+from pydantic import BaseModel, ValidationError
 
-from lsp_cli.client import ClientTarget, find_target, match_target
+from lsp_cli.client import ClientTarget, TargetResolver
 from lsp_cli.settings import LOG_DIR, MANAGER_LOG_PATH, settings
+from lsp_cli.utils import rpc
+from lsp_cli.utils.http import (
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    EncodedModel,
+    encode_model,
+)
+from lsp_cli.utils.rpc import RpcRequest, RpcResponse, error_response
 
+from .cancel import until_disconnected
 from .client import ManagedClient, get_client_id
+from .memory import process_tree_rss
 from .models import (
+    NDJSON_MEDIA_TYPE,
+    CapabilityStreamEvent,
+    CapabilityTarget,
     CreateClientRequest,
     CreateClientResponse,
     DeleteClientRequest,
     DeleteClientResponse,
     ManagedClientInfo,
+    MemoryUsage,
+    SessionUsage,
 )
+from .scheduler import DEFAULT_SESSION, SessionQuotas
+from .worker import WorkerClient
+
+MEMORY_POLL_INTERVAL: Final = 5.0
+"""Seconds between measurements of the language servers' resident memory."""
 
 
 @define
 class Manager:
-    _clients: dict[str, ManagedClient] = Factory(dict)
+    _clients: dict[str, ManagedClient | WorkerClient] = Factory(dict)
+    _resolver: TargetResolver = Factory(TargetResolver)
+    _sessions: SessionQuotas = Factory(SessionQuotas)
+    _in_flight: Counter[str] = Factory(Counter)
+    """Client id -> requests it is serving, clients without any are idle."""
+    _peak_rss: int = 0
+    _evicted: int = 0
     _tg: asyncer.TaskGroup = field(init=False)
+    _memory_scope: anyio.CancelScope = field(init=False, factory=anyio.CancelScope)
     _logger_sink_id: int = field(init=False)
 
     def __attrs_post_init__(self) -> None:
@@ -53,10 +87,12 @@ class Manager:
         self, path: Path, project_path: Path | None = None
     ) -> ClientTarget | None:
         if project_path:
-            return match_target(project_path)
-        return find_target(path)
+            return self._resolver.match(project_path)
+        return self._resolver.find(path)
 
-    async def create_client(self, path: Path, project_path: Path | None = None) -> Path:
+    def _ensure_client(
+        self, path: Path, project_path: Path | None = None
+    ) -> ManagedClient | WorkerClient:
         target = self._get_target(path, project_path)
         if not target:
             raise NotFoundException(f"No LSP client found for path: {path}")
@@ -64,52 +100,187 @@ class Manager:
         logger.debug(f"[Manager] Found client target: {target}")
 
         client_id = get_client_id(target)
-        if client_id not in self._clients:
+        existing = self._clients.get(client_id)
+        # A stopping client no longer serves requests, so it is replaced
+        if existing is None or existing.stopping:
+            # Make room for the new client first
+            self._evict(reserve=1)
             logger.info(f"[Manager] Creating new client: {client_id}")
-            m_client = ManagedClient(target)
+            m_client = (
+                WorkerClient(target)
+                if settings.client_workers
+                else ManagedClient(target)
+            )
             self._clients[client_id] = m_client
+            self._resolver.add(target)
             self._tg.soonify(self._run_client)(m_client)
         else:
             logger.info(f"[Manager] Reusing existing client: {client_id}")
-            self._clients[client_id]._reset_timeout()
+            existing._reset_timeout()
+
+        return self._clients[client_id]
 
-        return self._clients[client_id].uds_path
+    async def create_client(
+        self, path: Path, project_path: Path | None = None
+    ) -> ManagedClient | WorkerClient:
+        return self._ensure_client(path, project_path)
+
+    async def request(
+        self,
+        name: str,
+        data: bytes,
+        path: Path,
+        project_path: Path | None = None,
+        session: str | None = None,
+    ) -> BaseModel | EncodedModel | None:
+        """Forward a capability request to the client for `path`, starting it if needed.
+
+        The request counts against the quotas of `session`.
+        """
+        client = self._ensure_client(path, project_path)
+        session = session or DEFAULT_SESSION
+        self._sessions.take(session)
+        async with self._using(client), self._sessions.slot(session):
+            return await client.request(name, data, session)
+
+    async def open_stream(
+        self,
+        name: str,
+        data: bytes,
+        path: Path,
+        project_path: Path | None = None,
+        session: str | None = None,
+    ) -> AsyncGenerator[BaseModel | EncodedModel]:
+        """Like `request`, but stream the capability's items as they are produced."""
+        client = self._ensure_client(path, project_path)
+        session = session or DEFAULT_SESSION
+        self._sessions.take(session)
+        async with self._using(client):
+            items = await client.open_stream(name, data, session)
+        return self._sessions.stream(session, self._stream_using(client, items))
+
+    @asynccontextmanager
+    async def _using(
+        self, client: ManagedClient | WorkerClient
+    ) -> AsyncGenerator[None]:
+        self._in_flight[client.id] += 1
+        try:
+            yield
+        finally:
+            self._in_flight[client.id] -= 1
+            if not self._in_flight[client.id]:
+                del self._in_flight[client.id]
+
+    async def _stream_using[T](
+        self, client: ManagedClient | WorkerClient, items: AsyncGenerator[T]
+    ) -> AsyncGenerator[T]:
+        async with self._using(client), aclosing(items):
+            async for item in items:
+                yield item
+
+    def _evict(self, reserve: int = 0) -> None:
+        """Stop least recently used idle clients until back within the limits.
+
+        `reserve` counts clients about to start against `settings.max_clients`.
+        Clients serving requests are never stopped, so the limits may be
+        exceeded while they are busy.
+        """
+        running = [c for c in self._clients.values() if not c.stopping]
+        count = len(running) + reserve
+        rss = sum(c.memory.rss or 0 for c in running)
+
+        def over() -> bool:
+            return bool(
+                (settings.max_clients and count > settings.max_clients)
+                or (settings.memory_budget and rss > settings.memory_budget)
+            )
+
+        idle = (c for c in running if not self._in_flight[c.id])
+        for client in sorted(idle, key=lambda c: c.deadline):
+            if not over():
+                return
+            logger.info(
+                f"[Manager] Evicting idle client: {client.id} "
+                f"({count} servers, {rss} bytes resident)"
+            )
+            client.stop()
+            self._evicted += 1
+            count -= 1
+            rss -= client.memory.rss or 0
+        if over():
+            logger.warning(
+                f"[Manager] Over limits with all clients busy: "
+                f"{count} servers, {rss} bytes resident"
+            )
+
+    async def _measure_memory(self) -> None:
+        clients = {c.pid: c for c in self._clients.values() if c.pid is not None}
+        if not clients:
+            return
+        usage = await anyio.to_thread.run_sync(process_tree_rss, list(clients))
+        for pid, client in clients.items():
+            client.memory.update(usage.get(pid, 0))
+        self._peak_rss = max(self._peak_rss, self.memory_usage().rss)
+
+    async def _watch_memory(self) -> None:
+        with self._memory_scope:
+            while True:
+                await anyio.sleep(MEMORY_POLL_INTERVAL)
+                await self._measure_memory()
+                self._evict()
 
     @logger.catch(level="ERROR")
-    async def _run_client(self, client: ManagedClient) -> None:
+    async def _run_client(self, client: ManagedClient | WorkerClient) -> None:
         try:
             logger.info(f"[Manager] Running client: {client.id}")
             await client.run()
         finally:
             logger.info(f"[Manager] Removing client: {client.id}")
-            self._clients.pop(client.id, None)
-
-    async def delete_client(self, path: Path, project_path: Path | None = None) -> None:
-        if target := self._get_target(path, project_path):
-            client_id = get_client_id(target)
-            if client := self._clients.get(client_id):
-                logger.info(f"[Manager] Stopping client: {client_id}")
-                client.stop()
+            # Once stopped, by eviction or `delete`, a client is replaced by
+            # `_ensure_client` as soon as its project is requested again
+            if self._clients.get(client.id) is client:
+                del self._clients[client.id]
+            self._resolver.remove(client.target)
 
-    def inspect_client(
+    async def delete_client(
         self, path: Path, project_path: Path | None = None
     ) -> ManagedClientInfo | None:
         if target := self._get_target(path, project_path):
             client_id = get_client_id(target)
             if client := self._clients.get(client_id):
-                return client.info
+                logger.info(f"[Manager] Stopping client: {client_id}")
+                info = client.info
+                client.stop()
+                return info
         return None
 
     def list_clients(self) -> list[ManagedClientInfo]:
         return [client.info for client in self._clients.values()]
 
+    def list_sessions(self) -> list[SessionUsage]:
+        return self._sessions.usage
+
+    def memory_usage(self) -> MemoryUsage:
+        return MemoryUsage(
+            rss=sum(c.memory.rss or 0 for c in self._clients.values()),
+            peak_rss=self._peak_rss,
+            budget=settings.memory_budget,
+            clients=len(self._clients),
+            max_clients=settings.max_clients,
+            evicted=self._evicted,
+        )
+
     @asynccontextmanager
     async def run(self) -> AsyncGenerator[Manager]:
         logger.info("[Manager] Starting manager")
         try:
             async with asyncer.create_task_group() as tg:
                 self._tg = tg
-                yield self
+                tg.soonify(self._watch_memory)()
+                try:
+                    yield self
+                finally:
+                    self._memory_scope.cancel()
         finally:
             logger.info("[Manager] Shutting down manager")
             logger.remove(self._logger_sink_id)
@@ -122,9 +293,13 @@ def get_manager(state: State) -> Manager:
 @asynccontextmanager
 async def manager_lifespan(app: Litestar) -> AsyncGenerator[None]:
     await anyio.Path(LOG_DIR).mkdir(parents=True, exist_ok=True)
-    async with Manager().run() as manager:
+    async with Manager().run() as manager, anyio.create_task_group() as tg:
         app.state.manager = manager
+        rpc_socket: socket.socket | None = app.state.get("rpc_socket")
+        if rpc_socket is not None:
+            tg.start_soon(serve_rpc, manager, rpc_socket)
         yield
+        tg.cancel_scope.cancel()
 
 
 logger.add(
@@ -140,12 +315,8 @@ async def create_client_handler(
     data: CreateClientRequest, state: State
 ) -> CreateClientResponse:
     manager = get_manager(state)
-    uds_path = await manager.create_client(data.path, project_path=data.project_path)
-    info = manager.inspect_client(data.path, project_path=data.project_path)
-    if not info:
-        raise RuntimeError("Failed to create client")
-
-    return CreateClientResponse(uds_path=uds_path, info=info)
+    client = await manager.create_client(data.path, project_path=data.project_path)
+    return CreateClientResponse(uds_path=client.uds_path, info=client.info)
 
 
 @delete("/delete", status_code=200)
@@ -153,9 +324,7 @@ async def delete_client_handler(
     data: DeleteClientRequest, state: State
 ) -> DeleteClientResponse:
     manager = get_manager(state)
-    info = manager.inspect_client(data.path, project_path=data.project_path)
-    await manager.delete_client(data.path, project_path=data.project_path)
-
+    info = await manager.delete_client(data.path, project_path=data.project_path)
     return DeleteClientResponse(info=info)
 
 
@@ -165,13 +334,149 @@ async def list_clients_handler(state: State) -> list[ManagedClientInfo]:
     return manager.list_clients()
 
 
+@get("/sessions")
+async def list_sessions_handler(state: State) -> list[SessionUsage]:
+    manager = get_manager(state)
+    return manager.list_sessions()
+
+
+@get("/memory")
+async def memory_usage_handler(state: State) -> MemoryUsage:
+    manager = get_manager(state)
+    return manager.memory_usage()
+
+
+async def _ndjson_lines(
+    items: AsyncGenerator[BaseModel | EncodedModel],
+) -> AsyncGenerator[bytes]:
+    # The status line is already sent, so a failure becomes a terminal error event
+    try:
+        async for item in items:
+            data = (
+                msgspec.json.decode(item.content)
+                if isinstance(item, EncodedModel)
+                else item.model_dump(mode="json")
+            )
+            event = CapabilityStreamEvent(item=data)
+            yield event.model_dump_json(exclude_none=True).encode() + b"\n"
+    except Exception as e:  # noqa: BLE001
+        logger.exception("[Manager] Capability stream failed: {}", e)
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        yield CapabilityStreamEvent(error=detail).model_dump_json().encode() + b"\n"
+    finally:
+        await items.aclose()
+
+
+@post("/capability/{name:path}", status_code=200)
+async def capability_handler(
+    name: str,
+    path: Path,
+    body: bytes,
+    request: Request,
+    state: State,
+    project_path: Path | None = None,
+    session: str | None = None,
+) -> Response | Stream | None:
+    manager = get_manager(state)
+    name = name.strip("/")
+    accept = request.headers.get("accept", "")
+    # Litestar stops a stream itself once its client disconnects, but not
+    # the handler, so until then the caller is watched here
+    if NDJSON_MEDIA_TYPE in accept:
+        items = await until_disconnected(
+            request,
+            partial(
+                manager.open_stream,
+                name,
+                body,
+                path,
+                project_path=project_path,
+                session=session,
+            ),
+        )
+        return Stream(_ndjson_lines(items), media_type=NDJSON_MEDIA_TYPE)
+
+    resp = await until_disconnected(
+        request,
+        partial(
+            manager.request,
+            name,
+            body,
+            path,
+            project_path=project_path,
+            session=session,
+        ),
+    )
+    if resp is None:
+        return None
+    # Encode here in one pass rather than through Litestar's generic serializer
+    media_type = MSGPACK_MEDIA_TYPE if MSGPACK_MEDIA_TYPE in accept else JSON_MEDIA_TYPE
+    return Response(encode_model(resp, media_type), media_type=media_type)
+
+
+def _error_status(exc: Exception) -> tuple[int, str]:
+    if isinstance(exc, HTTPException):
+        return exc.status_code, exc.detail
+    logger.exception("[Manager] Unhandled exception: {}", exc)
+    return 500, str(exc)
+
+
+def exception_handler(request: Request, exc: Exception) -> Response:
+    status_code, detail = _error_status(exc)
+    return Response(content={"detail": detail}, status_code=status_code)
+
+
+async def _dispatch_rpc(
+    manager: Manager, req: RpcRequest
+) -> BaseModel | EncodedModel | None:
+    if not req.method.startswith("/capability/"):
+        raise NotFoundException(f"Unknown RPC method: {req.method}")
+    try:
+        target = CapabilityTarget.model_validate(req.params)
+    except ValidationError as e:
+        raise ValidationException(str(e)) from e
+    name = req.method.removeprefix("/capability/").strip("/")
+    return await manager.request(
+        name,
+        req.payload,
+        target.path,
+        project_path=target.project_path,
+        session=target.session,
+    )
+
+
+async def _answer_rpc(manager: Manager, req: RpcRequest) -> AsyncGenerator[RpcResponse]:
+    try:
+        resp = await _dispatch_rpc(manager, req)
+    except Exception as e:  # noqa: BLE001
+        yield error_response(req.id, *_error_status(e))
+        return
+
+    if resp is None:
+        yield RpcResponse(req.id, 200, JSON_MEDIA_TYPE, b"")
+        return
+    media_type = (
+        MSGPACK_MEDIA_TYPE if MSGPACK_MEDIA_TYPE in req.accept else JSON_MEDIA_TYPE
+    )
+    yield RpcResponse(req.id, 200, media_type, encode_model(resp, media_type))
+
+
+async def serve_rpc(manager: Manager, sock: socket.socket) -> None:
+    """Answer `/capability/*` requests framed by `lsp_cli.utils.rpc` on `sock`."""
+    await rpc.serve(sock, partial(_answer_rpc, manager))
+
+
 app: Final = Litestar(
     route_handlers=[
         create_client_handler,
         delete_client_handler,
         list_clients_handler,
+        list_sessions_handler,
+        memory_usage_handler,
+        capability_handler,
     ],
     dependencies={"manager": Provide(get_manager, sync_to_thread=False)},
     lifespan=[manager_lifespan],
     debug=settings.debug,
+    exception_handlers={Exception: exception_handler},
 )
@@ -0,0 +1,90 @@
+"""Resident memory of the language servers the manager runs.
+
+A client's footprint is the resident set of its process tree: the language
+server and whatever it spawned, or for worker clients the worker process with
+its server. Shared pages are counted once per process, so the figures are an
+upper bound.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+from collections.abc import Iterable
+from pathlib import Path
+
+from attrs import define
+
+PROC_DIR = Path("/proc")
+
+
+def _proc_table() -> dict[int, tuple[int, int]]:
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    table: dict[int, tuple[int, int]] = {}
+    for entry in PROC_DIR.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            # Exited since the directory was listed
+            continue
+        # The command name in parentheses may itself contain spaces
+        fields = stat[stat.rindex(")") + 2 :].split()
+        table[int(entry.name)] = (int(fields[1]), int(fields[21]) * page_size)
+    return table
+
+
+def _ps_table() -> dict[int, tuple[int, int]]:
+    out = subprocess.run(
+        ["ps", "-A", "-o", "pid=,ppid=,rss="],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    table: dict[int, tuple[int, int]] = {}
+    for line in out.splitlines():
+        pid, ppid, rss_kib = map(int, line.split())
+        table[pid] = (ppid, rss_kib * 1024)
+    return table
+
+
+def process_table() -> dict[int, tuple[int, int]]:
+    """pid -> (parent pid, resident bytes) of every process on the system."""
+    return _proc_table() if (PROC_DIR / "self" / "stat").exists() else _ps_table()
+
+
+def process_tree_rss(pids: Iterable[int]) -> dict[int, int]:
+    """Resident bytes of each process in `pids` together with its descendants.
+
+    Processes that are gone are left out. Blocks on reading the process table.
+    """
+    table = process_table()
+    children: dict[int, list[int]] = {}
+    for pid, (ppid, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+
+    result: dict[int, int] = {}
+    for root in pids:
+        if root not in table:
+            continue
+        total, stack = 0, [root]
+        while stack:
+            pid = stack.pop()
+            total += table[pid][1]
+            stack.extend(children.get(pid, ()))
+        result[root] = total
+    return result
+
+
+@define
+class ProcessMemory:
+    """Last measured and peak resident memory of one client's processes."""
+
+    rss: int | None = None
+    """`None` until the client's processes are first measured."""
+    peak_rss: int = 0
+
+    def update(self, rss: int) -> None:
+        self.rss = rss
+        self.peak_rss = max(self.peak_rss, rss)
@@ -1,23 +1,96 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Any, Final
 
 from lsp_client.jsonrpc.types import RawNotification, RawRequest, RawResponsePackage
-from pydantic import BaseModel, RootModel
+from pydantic import BaseModel, Field, RootModel
+
+
+class ResponseCacheStats(BaseModel):
+    hits: int
+    misses: int
+    entries: int
+    size: int
+    """Approximate size of the cached responses in bytes."""
+
+
+class RequestQueueStats(BaseModel):
+    priority: str
+    limit: int
+    """Requests of this class the client runs at once."""
+    running: int
+    waiting: int
+    completed: int
+    wait_p99_ms: float
+    """99th percentile of the time recent requests waited for a slot."""
+    latency_p50_ms: float
+    latency_p99_ms: float
+    """Percentiles of the time recent requests took from arrival to answer."""
+
+    def format(self) -> str:
+        return (
+            f"{self.priority}: {self.running}/{self.limit} running, "
+            f"{self.waiting} waiting, {self.completed} done, "
+            f"p50 {self.latency_p50_ms:.0f} ms, p99 {self.latency_p99_ms:.0f} ms"
+        )
+
+
+class SessionUsage(BaseModel):
+    session: str
+    weight: float
+    in_flight: int
+    waiting: int
+    """Requests waiting for one of the session's in-flight slots."""
+    completed: int
+    rejected: int
+    """Requests refused for exceeding the session's rate limit."""
+
+    @classmethod
+    def format(cls, data: list[SessionUsage]) -> str:
+        return "\n".join(
+            f"{usage.session:<10} weight {usage.weight:g}, "
+            f"{usage.in_flight} in flight, {usage.waiting} waiting, "
+            f"{usage.completed} done, {usage.rejected} refused"
+            for usage in data
+        )
+
+
+class SessionUsageList(RootModel[list[SessionUsage]]):
+    pass
+
+
+def format_bytes(size: int) -> str:
+    return f"{size / 2**20:.1f} MiB"
 
 
 class ManagedClientInfo(BaseModel):
     project_path: Path
     language: str
     remaining_time: float
+    cache: ResponseCacheStats | None = None
+    queues: list[RequestQueueStats] | None = None
+    coalesced: int = 0
+    """Requests answered by an identical request that was already in flight."""
+    rss: int | None = None
+    """Resident bytes of the client's language server processes, once measured."""
+    peak_rss: int | None = None
 
     @classmethod
     def format(cls, data: list[ManagedClientInfo] | ManagedClientInfo) -> str:
         infos = [data] if isinstance(data, ManagedClientInfo) else data
-        lines = [
-            f"{info.language:<10} {info.project_path} ({info.remaining_time:.1f}s)"
-            for info in infos
-        ]
+        lines = []
+        for info in infos:
+            memory = (
+                f", {format_bytes(info.rss)}, peak {format_bytes(info.peak_rss or 0)}"
+                if info.rss is not None
+                else ""
+            )
+            lines.append(
+                f"{info.language:<10} {info.project_path} "
+                f"({info.remaining_time:.1f}s{memory})"
+            )
+            lines.extend(f"  {queue.format()}" for queue in info.queues or ())
         return "\n".join(lines)
 
 
@@ -25,13 +98,35 @@ class ManagedClientInfoList(RootModel[list[ManagedClientInfo]]):
     pass
 
 
+class MemoryUsage(BaseModel):
+    rss: int
+    """Resident bytes of all managed language servers, as last measured."""
+    peak_rss: int
+    budget: int
+    """`settings.memory_budget`, 0 if unlimited."""
+    clients: int
+    max_clients: int
+    """`settings.max_clients`, 0 if unlimited."""
+    evicted: int
+    """Idle clients stopped to stay within the budget or client limit."""
+
+    def format(self) -> str:
+        budget = f" of {format_bytes(self.budget)}" if self.budget else ""
+        limit = f"/{self.max_clients}" if self.max_clients else ""
+        return (
+            f"{format_bytes(self.rss)}{budget}, peak {format_bytes(self.peak_rss)}, "
+            f"{self.clients}{limit} servers, {self.evicted} evicted"
+        )
+
+
 class CreateClientRequest(BaseModel):
     path: Path
     project_path: Path | None = None
 
 
 class CreateClientResponse(BaseModel):
-    uds_path: Path
+    uds_path: Path | None = None
+    """The client's own socket, unset when only the manager serves it."""
     info: ManagedClientInfo
 
 
@@ -44,6 +139,49 @@ class DeleteClientResponse(BaseModel):
     info: ManagedClientInfo | None
 
 
+class CapabilityTarget(BaseModel):
+    """Query parameters selecting the managed client for `/capability/*` requests."""
+
+    path: Path
+    project_path: Path | None = None
+    session: str | None = None
+    """Caller the request is accounted to, see `settings.session`."""
+
+
+class CapabilityBatchItem(BaseModel):
+    capability: str
+    """Route name under `/capability`, e.g. `hover` or `rename/preview`."""
+
+    request: dict[str, Any]
+
+
+class CapabilityBatchRequest(BaseModel):
+    items: list[CapabilityBatchItem]
+    concurrency: int | None = Field(default=None, gt=0)
+    """Maximum number of items in flight, defaults to `settings.batch_concurrency`."""
+
+
+class CapabilityBatchResult(BaseModel):
+    result: dict[str, Any] | None = None
+    error: str | None = None
+
+
+class CapabilityBatchResponse(BaseModel):
+    items: list[CapabilityBatchResult]
+    """One result per request item, in request order."""
+
+
+NDJSON_MEDIA_TYPE: Final = "application/x-ndjson"
+"""`Accept` type asking `/capability/*` to stream items as newline-delimited JSON."""
+
+
+class CapabilityStreamEvent(BaseModel):
+    """One line of a streamed capability response: an item or a terminal error."""
+
+    item: dict[str, Any] | None = None
+    error: str | None = None
+
+
 class LspRequest(BaseModel):
     payload: RawRequest
 
@@ -0,0 +1,64 @@
+"""Outline requests that the manager prunes before resolving hovers.
+
+Kept out of `models`, which the lightest CLI commands import, because this
+needs the LSAP schema.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+
+from lsap.schema.models import SymbolKind
+from lsap.schema.outline import OutlineRequest, OutlineResponse
+from lsap.schema.types import SymbolPath
+from lsprotocol import types as lsp_type
+from pydantic import Field, field_validator
+
+
+class OutlineFilterRequest(OutlineRequest):
+    """An `OutlineRequest` pruned by the manager before hovers are resolved."""
+
+    kinds: list[SymbolKind] | None = None
+    """Only keep symbols of these kinds, all kinds if unset."""
+
+    max_depth: int | None = Field(default=None, gt=0)
+    """Only keep symbols nested at most this deep, 1 being top-level."""
+
+    @field_validator("kinds")
+    @classmethod
+    def _normalize_kinds(
+        cls, kinds: list[SymbolKind] | None
+    ) -> list[SymbolKind] | None:
+        # Equal filters must share cache keys and snapshot views
+        return None if kinds is None else sorted(set(kinds))
+
+    @property
+    def view(self) -> str:
+        """Name of the outline snapshot entry holding the pruned outline."""
+        if self.kinds is None and self.max_depth is None:
+            return "outline"
+        kinds = ",".join(self.kinds) if self.kinds is not None else "*"
+        return f"outline:{kinds}:{self.max_depth or '*'}"
+
+    def keep(self, path: SymbolPath, kind: SymbolKind) -> bool:
+        return (self.kinds is None or kind in self.kinds) and (
+            self.max_depth is None or len(path) <= self.max_depth
+        )
+
+    def select(
+        self, symbols: Iterable[tuple[SymbolPath, lsp_type.DocumentSymbol]]
+    ) -> Iterator[tuple[SymbolPath, lsp_type.DocumentSymbol]]:
+        for path, symbol in symbols:
+            if self.keep(path, SymbolKind.from_lsp(symbol.kind)):
+                yield path, symbol
+
+    def prune(self, resp: OutlineResponse) -> OutlineResponse:
+        items = [item for item in resp.items if self.keep(item.path, item.kind)]
+        return resp.model_copy(update={"items": items})
+
+    @classmethod
+    def of(cls, req: OutlineRequest) -> OutlineFilterRequest:
+        """The request itself if it filters, else an unfiltered equivalent."""
+        if isinstance(req, OutlineFilterRequest):
+            return req
+        return cls(file_path=req.file_path)
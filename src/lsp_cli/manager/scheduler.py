@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+from collections import deque
+from collections.abc import AsyncGenerator, Iterator, Sequence
+from contextlib import aclosing, asynccontextmanager
+from enum import StrEnum
+from typing import Final, Self
+
+import anyio
+from attrs import define, field
+from litestar.exceptions import TooManyRequestsException
+
+from lsp_cli.settings import settings
+
+from .models import RequestQueueStats, SessionUsage
+
+
+class Priority(StrEnum):
+    INTERACTIVE = "interactive"
+    """Point queries, answered from a single location or file."""
+    BULK = "bulk"
+    """Workspace-wide queries, which may keep the server busy for seconds."""
+
+
+ROUTE_PRIORITIES: Final[dict[str, Priority]] = {
+    "definition": Priority.INTERACTIVE,
+    "hover": Priority.INTERACTIVE,
+    "locate": Priority.INTERACTIVE,
+    "outline": Priority.INTERACTIVE,
+    "symbol": Priority.INTERACTIVE,
+    "reference": Priority.BULK,
+    "rename/preview": Priority.BULK,
+    "rename/execute": Priority.BULK,
+    "search": Priority.BULK,
+}
+"""Route name under `/capability` -> its class, `batch` items are scheduled one by one."""
+
+DEFAULT_SESSION: Final = "default"
+"""Session of the requests that name none."""
+
+LATENCY_WINDOW: Final = 1024
+"""Recent requests per class that the latency percentiles are computed over."""
+
+
+def _percentile_ms(samples: Sequence[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+@define
+class RequestQueue:
+    """Slots of one priority class, shared fairly between sessions.
+
+    Waiting requests are granted slots by start-time fair queuing: each gets a
+    start tag no earlier than the finish tag of its session's previous request,
+    which lies `1 / weight` after that request's own start. A session with many
+    queued requests therefore takes turns with the others rather than going
+    ahead of them.
+    """
+
+    priority: Priority
+    limit: int
+    running: int = 0
+    completed: int = 0
+    waits: deque[float] = field(factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    latencies: deque[float] = field(factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    _heap: list[tuple[float, int, anyio.Event]] = field(init=False, factory=list)
+    _finish_tags: dict[str, float] = field(init=False, factory=dict)
+    _virtual_time: float = field(init=False, default=0.0)
+    _seq: Iterator[int] = field(init=False, factory=itertools.count)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._heap)
+
+    @property
+    def stats(self) -> RequestQueueStats:
+        return RequestQueueStats(
+            priority=self.priority.value,
+            limit=self.limit,
+            running=self.running,
+            waiting=self.waiting,
+            completed=self.completed,
+            wait_p99_ms=_percentile_ms(self.waits, 0.99),
+            latency_p50_ms=_percentile_ms(self.latencies, 0.5),
+            latency_p99_ms=_percentile_ms(self.latencies, 0.99),
+        )
+
+    async def acquire(self, session: str) -> None:
+        weight = settings.session_weights.get(session, 1.0)
+        start = max(self._virtual_time, self._finish_tags.get(session, 0.0))
+        self._finish_tags[session] = start + 1 / weight
+        if self.running < self.limit and not self._heap:
+            self._virtual_time = start
+            self.running += 1
+            return
+
+        entry = (start, next(self._seq), anyio.Event())
+        heapq.heappush(self._heap, entry)
+        try:
+            await entry[2].wait()
+        except BaseException:
+            if entry[2].is_set():
+                # Granted just as the wait was cancelled, pass the slot on
+                self.release()
+            else:
+                self._heap.remove(entry)
+                heapq.heapify(self._heap)
+            raise
+
+    def release(self) -> None:
+        self.running -= 1
+        while self._heap and self.running < self.limit:
+            start, _, event = heapq.heappop(self._heap)
+            self._virtual_time = start
+            self.running += 1
+            event.set()
+        if not self.running:
+            # Idle, so no session has a head start to carry over
+            self._finish_tags.clear()
+            self._virtual_time = 0.0
+
+
+@define
+class Scheduler:
+    """Admission control for the capability requests of one client.
+
+    Each priority class has its own concurrency limit, so however many bulk
+    queries are queued, at most `settings.bulk_concurrency` of them occupy the
+    language server, and point queries never wait behind them. Within a class,
+    sessions share the slots by weight.
+    """
+
+    queues: dict[Priority, RequestQueue]
+
+    @classmethod
+    def create(cls) -> Self:
+        limits = {
+            Priority.INTERACTIVE: settings.interactive_concurrency,
+            Priority.BULK: settings.bulk_concurrency,
+        }
+        return cls(
+            {
+                priority: RequestQueue(priority, limit)
+                for priority, limit in limits.items()
+            }
+        )
+
+    @property
+    def stats(self) -> list[RequestQueueStats]:
+        return [queue.stats for queue in self.queues.values()]
+
+    @asynccontextmanager
+    async def slot(
+        self, name: str, session: str = DEFAULT_SESSION
+    ) -> AsyncGenerator[None]:
+        """Hold a slot of the named route's class, waiting for one if needed."""
+        if (priority := ROUTE_PRIORITIES.get(name)) is None:
+            yield
+            return
+
+        queue = self.queues[priority]
+        start = anyio.current_time()
+        await queue.acquire(session)
+        queue.waits.append(anyio.current_time() - start)
+        try:
+            yield
+        finally:
+            queue.release()
+            queue.completed += 1
+            queue.latencies.append(anyio.current_time() - start)
+
+    async def stream[T](
+        self, name: str, items: AsyncGenerator[T], session: str = DEFAULT_SESSION
+    ) -> AsyncGenerator[T]:
+        """Like `slot`, held until the stream is exhausted or closed."""
+        async with self.slot(name, session), aclosing(items):
+            async for item in items:
+                yield item
+
+
+@define
+class SessionQuota:
+    name: str
+    limiter: anyio.CapacityLimiter
+    tokens: float
+    refilled: float
+    completed: int = 0
+    rejected: int = 0
+
+    @property
+    def usage(self) -> SessionUsage:
+        return SessionUsage(
+            session=self.name,
+            weight=settings.session_weights.get(self.name, 1.0),
+            in_flight=self.limiter.borrowed_tokens,
+            waiting=self.limiter.statistics().tasks_waiting,
+            completed=self.completed,
+            rejected=self.rejected,
+        )
+
+
+@define
+class SessionQuotas:
+    """Per-session limits on the capability requests the manager forwards.
+
+    A session may start `settings.session_rate_limit` requests per second, with
+    bursts of up to a second's worth, and is refused beyond that. At most
+    `settings.session_max_in_flight` of its requests run at once, the rest wait.
+    """
+
+    _quotas: dict[str, SessionQuota] = field(init=False, factory=dict)
+
+    @property
+    def usage(self) -> list[SessionUsage]:
+        return [quota.usage for quota in self._quotas.values()]
+
+    def _get(self, session: str) -> SessionQuota:
+        if quota := self._quotas.get(session):
+            return quota
+        # Forget sessions that have gone quiet, their quotas are full again
+        now = anyio.current_time()
+        for name, idle in list(self._quotas.items()):
+            if not idle.limiter.borrowed_tokens and (
+                now - idle.refilled > settings.idle_timeout
+            ):
+                del self._quotas[name]
+        quota = self._quotas[session] = SessionQuota(
+            session,
+            anyio.CapacityLimiter(settings.session_max_in_flight or math.inf),
+            tokens=self._burst,
+            refilled=now,
+        )
+        return quota
+
+    @property
+    def _burst(self) -> float:
+        return max(1.0, settings.session_rate_limit)
+
+    def take(self, session: str) -> None:
+        """Count a request against the session's rate, refusing it if over."""
+        quota = self._get(session)
+        now = anyio.current_time()
+        if rate := settings.session_rate_limit:
+            elapsed = now - quota.refilled
+            quota.tokens = min(self._burst, quota.tokens + elapsed * rate)
+        quota.refilled = now
+        if rate and quota.tokens < 1:
+            quota.rejected += 1
+            raise TooManyRequestsException(
+                f"Session {session!r} exceeds {rate:g} requests per second"
+            )
+        quota.tokens -= 1
+
+    @asynccontextmanager
+    async def slot(self, session: str) -> AsyncGenerator[None]:
+        """Hold one of the session's in-flight slots, waiting for one if needed."""
+        quota = self._get(session)
+        # Streams may be opened and closed by different tasks
+        token = object()
+        await quota.limiter.acquire_on_behalf_of(token)
+        try:
+            yield
+        finally:
+            quota.limiter.release_on_behalf_of(token)
+            quota.completed += 1
+
+    async def stream[T](
+        self, session: str, items: AsyncGenerator[T]
+    ) -> AsyncGenerator[T]:
+        """Like `slot`, held until the stream is exhausted or closed."""
+        async with self.slot(session), aclosing(items):
+            async for item in items:
+                yield item
@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections.abc import Sequence
+from functools import cached_property
+from pathlib import Path
+from typing import Final, Self, override
+
+import msgspec
+import xxhash
+from attrs import define, field
+from lsap.capability.definition import DefinitionCapability
+from lsap.capability.doc import DocCapability
+from lsap.capability.locate import LocateCapability
+from lsap.capability.outline import OutlineCapability
+from lsap.capability.reference import ReferenceCapability
+from lsap.capability.symbol import SymbolCapability
+from lsap.exception import NotFoundError
+from lsap.schema.locate import Locate, LocateRequest, LocateResponse, SymbolScope
+from lsap.schema.models import Position
+from lsap.schema.outline import OutlineRequest, OutlineResponse
+from lsap.schema.types import SymbolPath
+from lsap.utils.capability import ensure_capability
+from lsap.utils.symbol import iter_symbols
+from lsp_client.capability.request import WithRequestDocumentSymbol
+from lsprotocol import types as lsp_type
+
+from .outline import OutlineFilterRequest
+
+SCHEMA_VERSION: Final = 1
+
+SCHEMA: Final = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    data BLOB NOT NULL,
+    used INTEGER NOT NULL,
+    PRIMARY KEY (path, kind)
+);
+CREATE INDEX IF NOT EXISTS snapshots_used ON snapshots (used);
+"""
+
+type SnapshotKind = str
+"""`symbols`, `outline`, or a pruned outline view (`OutlineFilterRequest.view`)."""
+
+
+class SymbolDeclaration(msgspec.Struct, array_like=True, frozen=True):
+    """Where a document symbol is declared, as 0-based LSP positions."""
+
+    path: SymbolPath
+    selection: tuple[int, int]
+
+    @property
+    def selection_start(self) -> lsp_type.Position:
+        return lsp_type.Position(line=self.selection[0], character=self.selection[1])
+
+
+def to_declarations(
+    symbols: Sequence[lsp_type.DocumentSymbol],
+) -> list[SymbolDeclaration]:
+    declarations: list[SymbolDeclaration] = []
+    for path, symbol in iter_symbols(symbols):
+        start = symbol.selection_range.start
+        declarations.append(
+            SymbolDeclaration(path=path, selection=(start.line, start.character))
+        )
+    return declarations
+
+
+def declared_symbol(req: LocateRequest) -> SymbolPath | None:
+    """The symbol path of a locate that resolves to a declaration, if it is one."""
+    match req.locate:
+        case Locate(scope=SymbolScope(symbol_path=symbol_path), find=None):
+            return symbol_path
+    return None
+
+
+def find_declaration(
+    file_path: Path, declarations: Sequence[SymbolDeclaration], symbol_path: SymbolPath
+) -> LocateResponse | None:
+    for declaration in declarations:
+        if declaration.path == symbol_path:
+            return LocateResponse(
+                file_path=file_path,
+                position=Position.from_lsp(declaration.selection_start),
+            )
+    return None
+
+
+_declarations_decoder: Final = msgspec.msgpack.Decoder(list[SymbolDeclaration])
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    db = sqlite3.connect(path)
+    if (version := db.execute("PRAGMA user_version").fetchone()[0]) not in (
+        0,
+        SCHEMA_VERSION,
+    ):
+        db.close()
+        raise sqlite3.DatabaseError(f"Unsupported snapshot schema version {version}")
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    db.executescript(SCHEMA)
+    db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return db
+
+
+@define
+class OutlineSnapshot:
+    """On-disk outlines and symbol declarations per file, keyed by content.
+
+    Entries are msgpack-encoded and only returned while the file's content
+    digest matches the one they were computed from, so they survive server
+    restarts but never outlive an edit. The least recently used entries are
+    evicted once the total size exceeds `max_bytes`.
+
+    Lookups only read: files are rehashed when their size or mtime changes, and
+    entry use is written along with the next store.
+    """
+
+    max_bytes: int
+    _db: sqlite3.Connection
+    _size: int = field(init=False)
+    _digests: dict[Path, tuple[int, int, str]] = field(init=False, factory=dict)
+    _used: dict[tuple[str, SnapshotKind], int] = field(init=False, factory=dict)
+    """Last use of entries read since the last write, recorded with the next one."""
+
+    def __attrs_post_init__(self) -> None:
+        (size,) = self._db.execute(
+            "SELECT coalesce(sum(length(data)), 0) FROM snapshots"
+        ).fetchone()
+        self._size = size
+
+    @classmethod
+    def open(cls, path: Path, max_bytes: int) -> Self:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            db = _connect(path)
+        except sqlite3.DatabaseError:
+            path.unlink(missing_ok=True)
+            db = _connect(path)
+        return cls(max_bytes, db)
+
+    def close(self) -> None:
+        with self._db:
+            self._flush_used()
+        self._db.close()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def digest(self, path: Path) -> str | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            self._digests.pop(path, None)
+            return None
+
+        cached = self._digests.get(path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        try:
+            digest = xxhash.xxh3_64_hexdigest(path.read_bytes())
+        except OSError:
+            return None
+        self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    @staticmethod
+    def encode_outline(resp: OutlineResponse) -> bytes:
+        return msgspec.msgpack.encode(resp.model_dump(mode="json", exclude_none=True))
+
+    def get_outline(self, path: Path, view: str = "outline") -> OutlineResponse | None:
+        if (data := self._get(path, view)) is None:
+            return None
+        return OutlineResponse.model_validate(msgspec.msgpack.decode(data))
+
+    def put_outline(
+        self, digest: str, resp: OutlineResponse, view: str = "outline"
+    ) -> None:
+        self._put(resp.file_path, view, digest, self.encode_outline(resp))
+
+    def outline(self, req: OutlineRequest) -> OutlineResponse | None:
+        """The requested view of an outline, pruned from the full one if needed."""
+        req = OutlineFilterRequest.of(req)
+        if (resp := self.get_outline(req.file_path, req.view)) is not None:
+            return resp
+        if req.view != "outline" and (full := self.get_outline(req.file_path)):
+            return req.prune(full)
+        return None
+
+    def get_symbols(self, path: Path) -> list[SymbolDeclaration] | None:
+        if (data := self._get(path, "symbols")) is None:
+            return None
+        return _declarations_decoder.decode(data)
+
+    def put_symbols(
+        self, path: Path, digest: str, symbols: Sequence[SymbolDeclaration]
+    ) -> None:
+        self._put(path, "symbols", digest, msgspec.msgpack.encode(symbols))
+
+    def locate(self, req: LocateRequest) -> LocateResponse | None:
+        """Resolve a symbol-path locate from stored declarations, if possible."""
+        if (symbol_path := declared_symbol(req)) is None:
+            return None
+        file_path = req.locate.file_path
+        if (declarations := self.get_symbols(file_path)) is None:
+            return None
+        return find_declaration(file_path, declarations, symbol_path)
+
+    def _get(self, path: Path, kind: SnapshotKind) -> bytes | None:
+        key = path.as_posix()
+        row = self._db.execute(
+            "SELECT digest, data FROM snapshots WHERE path = ? AND kind = ?",
+            (key, kind),
+        ).fetchone()
+        if row is None or row[0] != self.digest(path):
+            return None
+
+        self._used[key, kind] = time.time_ns()
+        return row[1]
+
+    def _flush_used(self) -> None:
+        self._db.executemany(
+            "UPDATE snapshots SET used = ? WHERE path = ? AND kind = ?",
+            [(used, key, kind) for (key, kind), used in self._used.items()],
+        )
+        self._used.clear()
+
+    def _put(self, path: Path, kind: SnapshotKind, digest: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+
+        key = path.as_posix()
+        with self._db:
+            # Before choosing what to evict, so the order reflects recent reads
+            self._flush_used()
+            row = self._db.execute(
+                "SELECT length(data) FROM snapshots WHERE path = ? AND kind = ?",
+                (key, kind),
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                (key, kind, digest, data, time.time_ns()),
+            )
+            self._size += len(data) - (row[0] if row else 0)
+
+            while self._size > self.max_bytes:
+                path_, kind_, length = self._db.execute(
+                    "SELECT path, kind, length(data) FROM snapshots "
+                    "ORDER BY used LIMIT 1"
+                ).fetchone()
+                self._db.execute(
+                    "DELETE FROM snapshots WHERE path = ? AND kind = ?", (path_, kind_)
+                )
+                self._size -= length
+
+
+@define
+class SnapshotLocateCapability(LocateCapability):
+    """Resolve symbol-path locates (`file.py:Class.method`) from the snapshot."""
+
+    snapshot: OutlineSnapshot | None = None
+
+    @override
+    async def __call__(self, req: LocateRequest) -> LocateResponse | None:
+        if self.snapshot is None or (symbol_path := declared_symbol(req)) is None:
+            return await super().__call__(req)
+        if resp := self.snapshot.locate(req):
+            return resp
+
+        file_path = req.locate.file_path
+        declarations = await self._declarations(self.snapshot, file_path)
+        if resp := find_declaration(file_path, declarations, symbol_path):
+            return resp
+        raise NotFoundError(f"Symbol {symbol_path} not found in {file_path}")
+
+    async def _declarations(
+        self, snapshot: OutlineSnapshot, file_path: Path
+    ) -> list[SymbolDeclaration]:
+        digest = snapshot.digest(file_path)
+        symbols = await ensure_capability(
+            self.client, WithRequestDocumentSymbol
+        ).request_document_symbol_list(file_path)
+        declarations = to_declarations(symbols or [])
+        if digest and symbols is not None:
+            snapshot.put_symbols(file_path, digest, declarations)
+        return declarations
+
+
+@define
+class SnapshotOutlineCapability(OutlineCapability):
+    """Serve outlines of unchanged files from the snapshot.
+
+    Symbols filtered out by an `OutlineFilterRequest` are dropped before their
+    hovers are requested, and each filter is snapshotted as its own view.
+    """
+
+    snapshot: OutlineSnapshot | None = None
+
+    @override
+    async def __call__(self, req: OutlineRequest) -> OutlineResponse | None:
+        req = OutlineFilterRequest.of(req)
+        if self.snapshot and (resp := self.snapshot.outline(req)) is not None:
+            return resp
+
+        # Digest before asking the server, so a concurrent edit is never masked
+        digest = self.snapshot.digest(req.file_path) if self.snapshot else None
+        symbols = await ensure_capability(
+            self.client, WithRequestDocumentSymbol
+        ).request_document_symbol_list(req.file_path)
+        if symbols is None:
+            return None
+
+        items = await self.resolve_symbols(
+            req.file_path, req.select(iter_symbols(symbols))
+        )
+        resp = OutlineResponse(file_path=req.file_path, items=items)
+        if self.snapshot and digest:
+            self.snapshot.put_outline(digest, resp, req.view)
+            self.snapshot.put_symbols(req.file_path, digest, to_declarations(symbols))
+        return resp
+
+
+# Capabilities that resolve their `locate` field through the snapshot
+
+
+@define
+class SnapshotDefinitionCapability(DefinitionCapability):
+    snapshot: OutlineSnapshot | None = None
+
+    @cached_property
+    @override
+    def locate(self) -> LocateCapability:
+        return SnapshotLocateCapability(self.client, snapshot=self.snapshot)
+
+
+@define
+class SnapshotDocCapability(DocCapability):
+    snapshot: OutlineSnapshot | None = None
+
+    @cached_property
+    @override
+    def locate(self) -> LocateCapability:
+        return SnapshotLocateCapability(self.client, snapshot=self.snapshot)
+
+
+@define
+class SnapshotReferenceCapability(ReferenceCapability):
+    snapshot: OutlineSnapshot | None = None
+
+    @cached_property
+    @override
+    def locate(self) -> LocateCapability:
+        return SnapshotLocateCapability(self.client, snapshot=self.snapshot)
+
+
+@define
+class SnapshotSymbolCapability(SymbolCapability):
+    snapshot: OutlineSnapshot | None = None
+
+    @cached_property
+    @override
+    def locate(self) -> LocateCapability:
+        return SnapshotLocateCapability(self.client, snapshot=self.snapshot)
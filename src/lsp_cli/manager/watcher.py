@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+
+import anyio
+import loguru
+from attrs import define, field
+from lsp_client import Client
+from lsp_client.capability.notification import WithNotifyTextDocumentSynchronize
+from lsprotocol import types as lsp_type
+from watchfiles import Change, DefaultFilter, awatch
+
+from lsp_cli.settings import settings
+
+from .cache import ResponseCache
+from .index import SymbolIndex
+
+
+def _common_prefix_len(a: str, b: str) -> int:
+    # Binary search over slice comparisons, which run at C speed
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix_len(a: str, b: str) -> int:
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid :] == b[len(b) - mid :]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _position(text: str, offset: int) -> lsp_type.Position:
+    line_start = text.rfind("\n", 0, offset) + 1
+    # LSP counts characters in UTF-16 code units by default
+    character = len(text[line_start:offset].encode("utf-16-le")) // 2
+    return lsp_type.Position(line=text.count("\n", 0, offset), character=character)
+
+
+def content_change(old: str, new: str) -> lsp_type.TextDocumentContentChangePartial:
+    """Describe `old` -> `new` as one edit replacing only the range that differs."""
+    prefix = _common_prefix_len(old, new)
+    suffix = _common_suffix_len(old[prefix:], new[prefix:])
+    return lsp_type.TextDocumentContentChangePartial(
+        range=lsp_type.Range(
+            start=_position(old, prefix),
+            end=_position(old, len(old) - suffix),
+        ),
+        text=new[prefix : len(new) - suffix],
+    )
+
+
+def coalesce(
+    changes: Iterable[tuple[Change, str]],
+) -> dict[Path, lsp_type.FileChangeType]:
+    """Collapse a burst of raw events into one final change per path.
+
+    Events in a burst are unordered, so the outcome is decided by whether the
+    path still exists: gone means deleted, otherwise created if it was added
+    during the burst and changed if not.
+    """
+    added: set[Path] = set()
+    paths: set[Path] = set()
+    for change, raw_path in changes:
+        path = Path(raw_path)
+        paths.add(path)
+        if change == Change.added:
+            added.add(path)
+
+    result: dict[Path, lsp_type.FileChangeType] = {}
+    for path in paths:
+        if not path.exists():
+            result[path] = lsp_type.FileChangeType.Deleted
+        elif path in added:
+            result[path] = lsp_type.FileChangeType.Created
+        else:
+            result[path] = lsp_type.FileChangeType.Changed
+    return result
+
+
+# Longest a request waits for a change storm to settle before it runs anyway
+STORM_MAX_HOLD = 30.0
+
+
+@define
+class WorkspaceWatcher:
+    """Forward file changes under a project to its language server.
+
+    Bursts of events are collected for `debounce_ms` and sent as one
+    `workspace/didChangeWatchedFiles` notification. Documents the server has
+    open additionally get an incremental `textDocument/didChange`, and the
+    response cache drops every entry derived from a changed file. Changed
+    files are queued for re-indexing in the symbol index.
+
+    A burst of at least `storm_threshold` changes (a branch switch, a formatter
+    run) starts a change storm: events are only collected until nothing changes
+    for `storm_quiet_ms`, then forwarded at once, so the server re-indexes a
+    single time. Meanwhile cache fills are paused and `settled` holds requests.
+    """
+
+    root: Path
+    client: Client
+    logger: loguru.Logger
+    cache: ResponseCache | None = None
+    index: SymbolIndex | None = None
+    ignore_paths: Sequence[str] = field(factory=lambda: settings.ignore_paths)
+    debounce_ms: int = field(factory=lambda: settings.watch_debounce_ms)
+    storm_threshold: int = field(factory=lambda: settings.watch_storm_threshold)
+    storm_quiet_ms: int = field(factory=lambda: settings.watch_storm_quiet_ms)
+
+    _storm: set[tuple[Change, str]] | None = field(init=False, default=None)
+    _settled: anyio.Event = field(init=False, factory=anyio.Event)
+
+    def __attrs_post_init__(self) -> None:
+        self._settled.set()
+
+    @property
+    def storming(self) -> bool:
+        return self._storm is not None
+
+    async def settled(self) -> None:
+        """Wait until no change storm is in progress."""
+        with anyio.move_on_after(STORM_MAX_HOLD):
+            await self._settled.wait()
+
+    async def run(self) -> None:
+        """Watch until cancelled."""
+        watch_filter = DefaultFilter(
+            ignore_dirs=(*DefaultFilter.ignore_dirs, *self.ignore_paths)
+        )
+        if self.cache:
+            self.cache.watched = True
+        try:
+            # Empty batches mark `storm_quiet_ms` without changes
+            async for changes in awatch(
+                self.root,
+                watch_filter=watch_filter,
+                debounce=self.debounce_ms,
+                rust_timeout=self.storm_quiet_ms,
+                yield_on_timeout=True,
+            ):
+                await self.handle(changes)
+        except (OSError, RuntimeError) as e:
+            self.logger.warning("Watching {} failed: {}", self.root, e)
+        finally:
+            self._end_storm()
+            if self.cache:
+                # Without a watcher, workspace-wide entries can no longer be trusted
+                self.cache.watched = False
+                self.cache.invalidate(())
+
+    async def handle(self, changes: set[tuple[Change, str]]) -> None:
+        """Process one batch of raw events, an empty one after a quiet period."""
+        if self._storm is not None:
+            if changes:
+                self._storm |= changes
+                return
+            storm = self._storm
+            self.logger.info("Change storm settled after {} events", len(storm))
+            try:
+                await self.forward(coalesce(storm))
+            finally:
+                self._end_storm()
+        elif len(changes) >= self.storm_threshold:
+            self.logger.info("Change storm started with {} events", len(changes))
+            self._storm = set(changes)
+            self._settled = anyio.Event()
+            if self.cache:
+                self.cache.paused = True
+        elif changes:
+            await self.forward(coalesce(changes))
+
+    def _end_storm(self) -> None:
+        self._storm = None
+        self._settled.set()
+        if self.cache:
+            self.cache.paused = False
+
+    async def forward(self, changes: dict[Path, lsp_type.FileChangeType]) -> None:
+        if not changes:
+            return
+
+        self.logger.debug("Forwarding {} file changes", len(changes))
+        if self.cache:
+            self.cache.invalidate(changes)
+        if self.index:
+            self.index.mark_stale(changes)
+
+        await self.client.notify(
+            lsp_type.DidChangeWatchedFilesNotification(
+                params=lsp_type.DidChangeWatchedFilesParams(
+                    changes=[
+                        lsp_type.FileEvent(uri=self.client.as_uri(path), type=kind)
+                        for path, kind in changes.items()
+                    ]
+                )
+            )
+        )
+
+        for path, kind in changes.items():
+            if kind != lsp_type.FileChangeType.Deleted:
+                await self._sync_document(path)
+
+    async def _sync_document(self, path: Path) -> None:
+        if not isinstance(self.client, WithNotifyTextDocumentSynchronize):
+            return
+
+        uri = self.client.as_uri(path)
+        state = self.client.document_state
+        if (old := state.get_content(uri)) is None:
+            return
+
+        try:
+            # Decode like lsp-client does when opening, keeping line endings
+            new = (await anyio.Path(path).read_bytes()).decode("utf-8")
+        except (OSError, UnicodeDecodeError):
+            return
+        if new == old or (version := state.update_content(uri, new)) is None:
+            return
+
+        # The bundled servers all declare incremental text document sync
+        await self.client.notify_text_document_changed(
+            path, [content_change(old, new)], version=version
+        )
@@ -0,0 +1,292 @@
+"""Managed clients running in worker processes of their own.
+
+`WorkerClient` stands in for a `ManagedClient` inside the manager. It starts
+`python -m lsp_cli.manager.worker`, which runs the real `ManagedClient` and
+answers the requests forwarded to it over `lsp_cli.utils.rpc`. Language server
+I/O, validation and encoding for each project then use a core of their own
+rather than sharing the manager's event loop.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import subprocess
+import sys
+from collections.abc import AsyncGenerator
+from contextlib import aclosing
+from functools import partial
+from pathlib import Path
+from typing import Final, cast
+
+import anyio
+from anyio.abc import Process, TaskGroup
+from attrs import define, field
+from litestar.exceptions import HTTPException
+from loguru import logger
+from lsp_client.clients.lang import Language, lang_clients
+
+from lsp_cli.client import ClientTarget
+from lsp_cli.settings import RUNTIME_DIR, settings
+from lsp_cli.utils import rpc
+from lsp_cli.utils.http import JSON_MEDIA_TYPE, EncodedModel, encode_model
+from lsp_cli.utils.rpc import (
+    PARTIAL_STATUS,
+    AsyncRpcClient,
+    RpcError,
+    RpcRequest,
+    RpcResponse,
+    error_response,
+)
+from lsp_cli.utils.socket import listen_unix, unlink_unix
+
+from .client import ManagedClient, get_client_id
+from .memory import ProcessMemory
+from .models import ManagedClientInfo
+from .scheduler import DEFAULT_SESSION
+
+WORKER_STOP_TIMEOUT: Final = 10.0
+"""How long a stopped worker may take to shut its language server down."""
+
+
+@define
+class WorkerClient:
+    """The manager's handle on a `ManagedClient` running in a worker process.
+
+    The worker exits on idle timeout like an in-process client, or once its
+    stdin closes, which happens when it is stopped or the manager goes away.
+    Responses are passed on as encoded by the worker.
+    """
+
+    target: ClientTarget
+
+    _sock: socket.socket = field(init=False)
+    _sock_stat: os.stat_result = field(init=False)
+    _rpc: AsyncRpcClient = field(init=False)
+    _tg: TaskGroup | None = field(init=False, default=None)
+    _ready: anyio.Event = field(init=False, factory=anyio.Event)
+    _run_scope: anyio.CancelScope = field(init=False, factory=anyio.CancelScope)
+    _deadline: float = field(init=False)
+    _pid: int | None = field(init=False, default=None)
+    memory: ProcessMemory = field(init=False, factory=ProcessMemory)
+    """Measured by the manager, see `pid`."""
+
+    def __attrs_post_init__(self) -> None:
+        self._deadline = anyio.current_time() + settings.idle_timeout
+        # The worker inherits the listening socket, so requests sent while it
+        # starts wait in the accept backlog.
+        self._sock = listen_unix(self.rpc_path)
+        self._sock_stat = self.rpc_path.stat()
+        self._rpc = AsyncRpcClient(self.rpc_path, timeout=None)
+
+    @property
+    def id(self) -> str:
+        return get_client_id(self.target)
+
+    @property
+    def rpc_path(self) -> Path:
+        return RUNTIME_DIR / f"{self.id}.worker.sock"
+
+    @property
+    def uds_path(self) -> Path | None:
+        """The worker client's own socket, as for `ManagedClient.uds_path`."""
+        return RUNTIME_DIR / f"{self.id}.sock" if settings.client_sockets else None
+
+    @property
+    def pid(self) -> int | None:
+        """The worker process, whose tree includes its language server."""
+        return self._pid
+
+    @property
+    def deadline(self) -> float:
+        return self._deadline
+
+    @property
+    def stopping(self) -> bool:
+        return self._run_scope.cancel_called
+
+    @property
+    def info(self) -> ManagedClientInfo:
+        # Cache statistics stay in the worker
+        return ManagedClientInfo(
+            project_path=self.target.project_path,
+            language=self.target.client_cls.get_language_config().kind.value,
+            remaining_time=max(0.0, self._deadline - anyio.current_time()),
+            rss=self.memory.rss,
+            peak_rss=self.memory.peak_rss if self.memory.rss is not None else None,
+        )
+
+    def stop(self) -> None:
+        logger.info(f"[Manager] Stopping worker for client: {self.id}")
+        self._run_scope.cancel()
+
+    def _reset_timeout(self) -> None:
+        self._deadline = anyio.current_time() + settings.idle_timeout
+        if self._tg:
+            self._tg.start_soon(self._touch)
+
+    async def _touch(self) -> None:
+        try:
+            await self._rpc.call("/touch")
+        except (RpcError, OSError) as e:
+            logger.debug(f"[Manager] Failed to reset timeout of {self.id}: {e}")
+
+    async def _connected(self) -> AsyncRpcClient:
+        self._deadline = anyio.current_time() + settings.idle_timeout
+        await self._ready.wait()
+        if self._tg is None:
+            raise RuntimeError(f"Client {self.id} is not running")
+        return self._rpc
+
+    async def request(
+        self, name: str, data: bytes, session: str = DEFAULT_SESSION
+    ) -> EncodedModel | None:
+        """Run a capability request in the worker."""
+        client = await self._connected()
+        try:
+            resp = await client.call(
+                f"/capability/{name}", params={"session": session}, payload=data
+            )
+        except RpcError as e:
+            raise HTTPException(status_code=e.status, detail=e.detail) from None
+        except ConnectionError as e:
+            raise RuntimeError(f"Client {self.id} is not running") from e
+        return EncodedModel(resp.payload) if resp.payload else None
+
+    async def open_stream(
+        self, name: str, data: bytes, session: str = DEFAULT_SESSION
+    ) -> AsyncGenerator[EncodedModel]:
+        """Start a streaming capability request, once the worker accepts it."""
+        client = await self._connected()
+        frames = client.stream(
+            f"/stream/{name}", params={"session": session}, payload=data
+        )
+        try:
+            # The worker acknowledges a valid request before its first item
+            await anext(frames)
+        except RpcError as e:
+            await frames.aclose()
+            raise HTTPException(status_code=e.status, detail=e.detail) from None
+        except (ConnectionError, StopAsyncIteration) as e:
+            await frames.aclose()
+            raise RuntimeError(f"Client {self.id} is not running") from e
+        return self._items(frames)
+
+    async def _items(
+        self, frames: AsyncGenerator[RpcResponse]
+    ) -> AsyncGenerator[EncodedModel]:
+        async with aclosing(frames):
+            async for frame in frames:
+                yield EncodedModel(frame.payload)
+
+    async def run(self) -> None:
+        kind = next(k for k, v in lang_clients.items() if v is self.target.client_cls)
+        command = [
+            sys.executable,
+            "-m",
+            "lsp_cli.manager.worker",
+            kind,
+            self.target.project_path.as_posix(),
+            str(self._sock.fileno()),
+        ]
+        logger.info(f"[Manager] Starting worker for client: {self.id}")
+
+        try:
+            with self._run_scope:
+                async with self._rpc, anyio.create_task_group() as tg:
+                    process = await anyio.open_process(
+                        command,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                        pass_fds=(self._sock.fileno(),),
+                    )
+                    # The worker now owns the listening socket
+                    self._sock.close()
+                    self._pid = process.pid
+                    self._tg = tg
+                    self._ready.set()
+                    try:
+                        await process.wait()
+                    finally:
+                        with anyio.CancelScope(shield=True):
+                            await self._stop_process(process)
+                    tg.cancel_scope.cancel()
+        finally:
+            # Wake pending requests, which now see the client is gone
+            self._tg = None
+            self._pid = None
+            self._ready.set()
+            self._sock.close()
+            # A replacement worker may already listen at the same path
+            await unlink_unix(self.rpc_path, self._sock_stat)
+
+    async def _stop_process(self, process: Process) -> None:
+        if process.returncode is not None:
+            return
+        if process.stdin:
+            await process.stdin.aclose()
+        with anyio.move_on_after(WORKER_STOP_TIMEOUT):
+            await process.wait()
+            return
+        logger.warning(f"[Manager] Killing unresponsive worker: {self.id}")
+        process.kill()
+        await process.wait()
+
+
+async def _answer(
+    client: ManagedClient, req: RpcRequest
+) -> AsyncGenerator[RpcResponse]:
+    kind, _, name = req.method.strip("/").partition("/")
+    session = req.params.get("session", DEFAULT_SESSION)
+    try:
+        match kind:
+            case "capability":
+                resp = await client.request(name, req.payload, session)
+                payload = encode_model(resp) if resp else b""
+                yield RpcResponse(req.id, 200, JSON_MEDIA_TYPE, payload)
+            case "stream":
+                items = await client.open_stream(name, req.payload, session)
+                yield RpcResponse(req.id, PARTIAL_STATUS, JSON_MEDIA_TYPE, b"")
+                async with aclosing(items):
+                    async for item in items:
+                        payload = encode_model(item)
+                        yield RpcResponse(
+                            req.id, PARTIAL_STATUS, JSON_MEDIA_TYPE, payload
+                        )
+                yield RpcResponse(req.id, 200, JSON_MEDIA_TYPE, b"")
+            case "touch":
+                client._reset_timeout()
+                yield RpcResponse(req.id, 200, JSON_MEDIA_TYPE, b"")
+            case _:
+                yield error_response(req.id, 404, f"Unknown RPC method: {req.method}")
+    except HTTPException as e:
+        yield error_response(req.id, e.status_code, e.detail)
+    except Exception as e:  # noqa: BLE001
+        logger.exception("Unhandled exception in worker: {}", e)
+        yield error_response(req.id, 500, str(e))
+
+
+async def _stop_on_eof(client: ManagedClient) -> None:
+    fd = sys.stdin.fileno()
+    while True:
+        await anyio.wait_readable(fd)
+        if not os.read(fd, 4096):
+            break
+    client.stop()
+
+
+async def serve_worker(target: ClientTarget, sock: socket.socket) -> None:
+    """Run a client for `target`, answering forwarded requests on `sock`."""
+    client = ManagedClient(target)
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(rpc.serve, sock, partial(_answer, client))
+        tg.start_soon(_stop_on_eof, client)
+        await client.run()
+        tg.cancel_scope.cancel()
+
+
+if __name__ == "__main__":
+    kind, project_path, fd = sys.argv[1:]
+    target = ClientTarget(lang_clients[cast(Language, kind)], Path(project_path))
+    with socket.socket(fileno=int(fd)) as sock:
+        anyio.run(serve_worker, target, sock)
@@ -10,6 +10,9 @@ from lsp_cli.manager import (
     DeleteClientResponse,
     ManagedClientInfo,
     ManagedClientInfoList,
+    MemoryUsage,
+    SessionUsage,
+    SessionUsageList,
     connect_manager,
 )
 from lsp_cli.utils.http import HttpClient
@@ -57,6 +60,14 @@ def list_servers() -> None:
             return
         print(ManagedClientInfo.format(servers))
 
+        memory = client.get("/memory", MemoryUsage)
+        if memory:
+            print(f"\nMemory: {memory.format()}")
+
+        usage = client.get("/sessions", SessionUsageList)
+        if usage and usage.root:
+            print(f"\nSessions:\n{SessionUsage.format(usage.root)}")
+
 
 @app.command("start")
 def start_server(
@@ -1,7 +1,13 @@
 from pathlib import Path
 from typing import Final, Literal
 
-from platformdirs import user_config_dir, user_log_dir, user_runtime_dir
+from platformdirs import (
+    user_cache_dir,
+    user_config_dir,
+    user_log_dir,
+    user_runtime_dir,
+)
+from pydantic import PositiveFloat
 from pydantic_settings import (
     BaseSettings,
     PydanticBaseSettingsSource,
@@ -16,7 +22,15 @@ LOG_DIR = Path(user_log_dir(APP_NAME))
 CLI_LOG_PATH = LOG_DIR / "cli.log"
 MANAGER_LOG_PATH = LOG_DIR / "manager.log"
 CLIENT_LOG_DIR = LOG_DIR / "clients"
+CACHE_DIR = Path(user_cache_dir(APP_NAME))
+INDEX_DIR = CACHE_DIR / "index"
+SNAPSHOT_DIR = CACHE_DIR / "outline"
 MANAGER_UDS_PATH = RUNTIME_DIR / "manager.sock"
+MANAGER_RPC_PATH = RUNTIME_DIR / "manager.rpc.sock"
+"""Framed RPC alternative to `MANAGER_UDS_PATH` for capability requests."""
+MANAGER_LOCK_PATH = RUNTIME_DIR / "manager.lock"
+MANAGER_READY_FD_ENV = "LSP_CLI_MANAGER_READY_FD"
+"""Env var naming the pipe fd a spawned manager writes to once it is listening."""
 
 LogLevel = Literal["TRACE", "DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
 
@@ -25,10 +39,49 @@ class Settings(BaseSettings):
     debug: bool = False
     idle_timeout: int = 600
     log_level: LogLevel = "INFO"
+    memory_budget: int = 0
+    """Resident bytes all managed language servers may use together, 0 disables."""
+    max_clients: int = 0
+    """Language servers the manager keeps running at once, 0 disables the limit."""
 
     # UX improvements
     default_max_items: int | None = 20
     default_context_lines: int = 2
+    batch_concurrency: int = 8
+    interactive_concurrency: int = 8
+    """Point queries (hover, definition, ...) each client runs at once."""
+    bulk_concurrency: int = 2
+    """Workspace-wide queries (reference, search, rename) each client runs at once."""
+    session: str | None = None
+    """Name the manager accounts this CLI's requests to, e.g. one per agent."""
+    session_weights: dict[str, PositiveFloat] = {}
+    """Share of each client's request slots per session, relative to 1 for others."""
+    session_max_in_flight: int = 16
+    """Requests one session may have running at once, 0 disables the limit."""
+    session_rate_limit: float = 0.0
+    """Requests per second one session may start before it is refused, 0 disables."""
+    cache_max_bytes: int = 64 * 1024 * 1024
+    """Memory cap of each client's response cache, 0 disables caching."""
+    watch_files: bool = True
+    """Forward file changes in managed projects to their language servers."""
+    watch_debounce_ms: int = 100
+    """How long a burst of file events is collected before it is forwarded."""
+    watch_storm_threshold: int = 200
+    """File changes within one debounce window that start a change storm."""
+    watch_storm_quiet_ms: int = 1000
+    """Time without file changes that ends a change storm."""
+    symbol_index: bool = True
+    """Keep an on-disk symbol index per project and answer `search` from it."""
+    snapshot_max_bytes: int = 32 * 1024 * 1024
+    """Disk cap of each project's outline snapshot, 0 disables it."""
+    wire_format: Literal["json", "msgpack"] = "json"
+    """Encoding of capability responses sent from the manager to the CLI."""
+    transport: Literal["http", "rpc"] = "http"
+    """How the CLI sends capability requests, streams always use HTTP."""
+    client_sockets: bool = True
+    """Also serve each managed client on its own socket, besides the manager's."""
+    client_workers: bool = False
+    """Run each managed client in a worker process of its own."""
     ignore_paths: list[str] = [
         ".git",
         "node_modules",
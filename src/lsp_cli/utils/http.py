@@ -1,13 +1,82 @@
 from __future__ import annotations
 
+from collections.abc import AsyncGenerator
+from typing import Any, Final
+
 import httpx
-from attrs import define, field
+import msgspec
+from attrs import define, field, frozen
 from pydantic import BaseModel
 
+JSON_MEDIA_TYPE: Final = "application/json"
+MSGPACK_MEDIA_TYPE: Final = "application/msgpack"
+
+WIRE_MEDIA_TYPES: Final = {"json": JSON_MEDIA_TYPE, "msgpack": MSGPACK_MEDIA_TYPE}
+"""`settings.wire_format` -> media type negotiated for responses."""
+
+
+@frozen
+class EncodedModel:
+    """A model serialized as JSON elsewhere, passed on without validating it again."""
+
+    content: bytes
+
+
+def encode_model(
+    model: BaseModel | EncodedModel,
+    media_type: str = JSON_MEDIA_TYPE,
+    *,
+    exclude_none: bool = False,
+) -> bytes:
+    """Serialize a model in a single pass, as JSON or msgpack."""
+    if isinstance(model, EncodedModel):
+        if media_type == MSGPACK_MEDIA_TYPE:
+            return msgspec.msgpack.encode(msgspec.json.decode(model.content))
+        return model.content
+    if media_type == MSGPACK_MEDIA_TYPE:
+        data = model.model_dump(mode="json", exclude_none=exclude_none)
+        return msgspec.msgpack.encode(data)
+    return model.model_dump_json(exclude_none=exclude_none).encode()
+
+
+def decode_model[T: BaseModel](
+    schema: type[T], content: bytes, media_type: str = JSON_MEDIA_TYPE
+) -> T | None:
+    """Validate a JSON or msgpack body straight into `schema`, `None` for null."""
+    if media_type.startswith(MSGPACK_MEDIA_TYPE):
+        data = msgspec.msgpack.decode(content)
+        return None if data is None else schema.model_validate(data)
+    if content.strip() == b"null":
+        return None
+    return schema.model_validate_json(content)
+
+
+def _request_args(
+    media_type: str, params: BaseModel | None, json: BaseModel | None
+) -> dict[str, Any]:
+    headers = {"Accept": media_type}
+    if json is not None:
+        headers["Content-Type"] = JSON_MEDIA_TYPE
+    return {
+        "headers": headers,
+        "params": params.model_dump(exclude_none=True, mode="json") if params else None,
+        "content": encode_model(json, exclude_none=True) if json else None,
+    }
+
+
+def _decode_response[T: BaseModel](resp: httpx.Response, schema: type[T]) -> T | None:
+    resp.raise_for_status()
+    if resp.status_code == 204 or not resp.content:
+        return None
+    media_type = resp.headers.get("content-type", JSON_MEDIA_TYPE)
+    return decode_model(schema, resp.content, media_type)
+
 
 @define
 class HttpClient:
     client: httpx.Client = field(factory=httpx.Client)
+    media_type: str = JSON_MEDIA_TYPE
+    """Response encoding asked for unless a request overrides it."""
 
     def request[T: BaseModel](
         self,
@@ -17,22 +86,12 @@ class HttpClient:
         *,
         params: BaseModel | None = None,
         json: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
         resp = self.client.request(
-            method,
-            url,
-            params=params.model_dump(exclude_none=True, mode="json")
-            if params
-            else None,
-            json=json.model_dump(exclude_none=True, mode="json") if json else None,
+            method, url, **_request_args(media_type or self.media_type, params, json)
         )
-        resp.raise_for_status()
-        if resp.status_code == 204 or not resp.content:
-            return None
-        json_data = resp.json()
-        if json_data is None:
-            return None
-        return resp_schema.model_validate(json_data)
+        return _decode_response(resp, resp_schema)
 
     def get[T: BaseModel](
         self,
@@ -40,8 +99,11 @@ class HttpClient:
         resp_schema: type[T],
         *,
         params: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
-        return self.request("GET", url, resp_schema, params=params)
+        return self.request(
+            "GET", url, resp_schema, params=params, media_type=media_type
+        )
 
     def post[T: BaseModel](
         self,
@@ -50,8 +112,11 @@ class HttpClient:
         *,
         params: BaseModel | None = None,
         json: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
-        return self.request("POST", url, resp_schema, params=params, json=json)
+        return self.request(
+            "POST", url, resp_schema, params=params, json=json, media_type=media_type
+        )
 
     def put[T: BaseModel](
         self,
@@ -60,8 +125,11 @@ class HttpClient:
         *,
         params: BaseModel | None = None,
         json: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
-        return self.request("PUT", url, resp_schema, params=params, json=json)
+        return self.request(
+            "PUT", url, resp_schema, params=params, json=json, media_type=media_type
+        )
 
     def patch[T: BaseModel](
         self,
@@ -70,8 +138,11 @@ class HttpClient:
         *,
         params: BaseModel | None = None,
         json: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
-        return self.request("PATCH", url, resp_schema, params=params, json=json)
+        return self.request(
+            "PATCH", url, resp_schema, params=params, json=json, media_type=media_type
+        )
 
     def delete[T: BaseModel](
         self,
@@ -80,8 +151,11 @@ class HttpClient:
         *,
         params: BaseModel | None = None,
         json: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
-        return self.request("DELETE", url, resp_schema, params=params, json=json)
+        return self.request(
+            "DELETE", url, resp_schema, params=params, json=json, media_type=media_type
+        )
 
     def close(self) -> None:
         self.client.close()
@@ -96,6 +170,8 @@ class HttpClient:
 @define
 class AsyncHttpClient:
     client: httpx.AsyncClient = field(factory=httpx.AsyncClient)
+    media_type: str = JSON_MEDIA_TYPE
+    """Response encoding asked for unless a request overrides it."""
 
     async def request[T: BaseModel](
         self,
@@ -105,22 +181,12 @@ class AsyncHttpClient:
         *,
         params: BaseModel | None = None,
         json: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
         resp = await self.client.request(
-            method,
-            url,
-            params=params.model_dump(exclude_none=True, mode="json")
-            if params
-            else None,
-            json=json.model_dump(exclude_none=True, mode="json") if json else None,
+            method, url, **_request_args(media_type or self.media_type, params, json)
         )
-        resp.raise_for_status()
-        if resp.status_code == 204 or not resp.content:
-            return None
-        json_data = resp.json()
-        if json_data is None:
-            return None
-        return resp_schema.model_validate(json_data)
+        return _decode_response(resp, resp_schema)
 
     async def get[T: BaseModel](
         self,
@@ -128,8 +194,11 @@ class AsyncHttpClient:
         resp_schema: type[T],
         *,
         params: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
-        return await self.request("GET", url, resp_schema, params=params)
+        return await self.request(
+            "GET", url, resp_schema, params=params, media_type=media_type
+        )
 
     async def post[T: BaseModel](
         self,
@@ -138,8 +207,11 @@ class AsyncHttpClient:
         *,
         params: BaseModel | None = None,
         json: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
-        return await self.request("POST", url, resp_schema, params=params, json=json)
+        return await self.request(
+            "POST", url, resp_schema, params=params, json=json, media_type=media_type
+        )
 
     async def put[T: BaseModel](
         self,
@@ -148,8 +220,11 @@ class AsyncHttpClient:
         *,
         params: BaseModel | None = None,
         json: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
-        return await self.request("PUT", url, resp_schema, params=params, json=json)
+        return await self.request(
+            "PUT", url, resp_schema, params=params, json=json, media_type=media_type
+        )
 
     async def patch[T: BaseModel](
         self,
@@ -158,8 +233,11 @@ class AsyncHttpClient:
         *,
         params: BaseModel | None = None,
         json: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
-        return await self.request("PATCH", url, resp_schema, params=params, json=json)
+        return await self.request(
+            "PATCH", url, resp_schema, params=params, json=json, media_type=media_type
+        )
 
     async def delete[T: BaseModel](
         self,
@@ -168,8 +246,33 @@ class AsyncHttpClient:
         *,
         params: BaseModel | None = None,
         json: BaseModel | None = None,
+        media_type: str | None = None,
     ) -> T | None:
-        return await self.request("DELETE", url, resp_schema, params=params, json=json)
+        return await self.request(
+            "DELETE", url, resp_schema, params=params, json=json, media_type=media_type
+        )
+
+    async def stream_lines[T: BaseModel](
+        self,
+        method: str,
+        url: str,
+        line_schema: type[T],
+        *,
+        media_type: str,
+        params: BaseModel | None = None,
+        json: BaseModel | None = None,
+    ) -> AsyncGenerator[T]:
+        """Yield each line of a newline-delimited JSON response as it arrives."""
+        async with self.client.stream(
+            method, url, **_request_args(media_type, params, json)
+        ) as resp:
+            if resp.is_error:
+                # Load the error body so callers can report its `detail`
+                await resp.aread()
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if line.strip():
+                    yield line_schema.model_validate_json(line)
 
     async def close(self) -> None:
         await self.client.aclose()
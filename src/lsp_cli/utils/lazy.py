@@ -0,0 +1,43 @@
+from collections.abc import Mapping
+from importlib import import_module
+from typing import Any, ClassVar, TypedDict
+
+import click
+import typer
+from typer.core import MarkupMode, TyperGroup
+
+
+class TyperSettings(TypedDict, total=False):
+    """Keyword arguments of `typer.Typer` shared by the root app and lazy sub-apps."""
+
+    context_settings: dict[Any, Any]
+    add_completion: bool
+    rich_markup_mode: MarkupMode
+    pretty_exceptions_enable: bool
+
+
+class LazyTyperGroup(TyperGroup):
+    """
+    A command group whose subcommands are imported only when they are invoked.
+
+    `lazy_commands` maps each command name to the `"module:attr"` of the Typer
+    app that provides it, so running one command never imports the others.
+    Each app is added to a Typer built from `app_settings`, as to the root app,
+    so its commands render the same as if registered there.
+    """
+
+    lazy_commands: ClassVar[Mapping[str, str]] = {}
+    app_settings: ClassVar[TyperSettings] = {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return [*super().list_commands(ctx), *self.lazy_commands]
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if (target := self.lazy_commands.get(cmd_name)) is None:
+            return super().get_command(ctx, cmd_name)
+
+        module, attr = target.split(":")
+        app: typer.Typer = getattr(import_module(module), attr)
+        parent = typer.Typer(**self.app_settings)
+        parent.add_typer(app)
+        return typer.main.get_group(parent).get_command(ctx, cmd_name)
@@ -0,0 +1,334 @@
+"""Length-prefixed msgpack RPC over a Unix socket.
+
+A lighter alternative to HTTP for round trips between the CLI, the manager and
+its worker processes. Each frame is a 4-byte big-endian length followed by a
+msgpack array. Requests carry an id, so many can be in flight on one connection
+and be answered in any order. A request may be answered by any number of
+`PARTIAL_STATUS` frames before its final response. A caller that gives up on
+a request sends `CANCEL_METHOD` for it, and requests still running when their
+connection closes are cancelled.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import socket
+import struct
+from collections.abc import AsyncGenerator, Callable, Iterator
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager, suppress
+from pathlib import Path
+from typing import Final
+
+import anyio
+import msgspec
+from anyio.abc import ByteSendStream, SocketStream, TaskGroup, UNIXSocketStream
+from anyio.streams.buffered import BufferedByteReceiveStream
+from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
+from attrs import define, field
+from loguru import logger
+from pydantic import BaseModel
+
+from .http import JSON_MEDIA_TYPE, decode_model, encode_model
+
+FRAME_HEADER: Final = struct.Struct(">I")
+
+MAX_FRAME_SIZE: Final = 1 << 30
+"""Frames claiming to be larger than this are treated as a corrupt stream."""
+
+PARTIAL_STATUS: Final = 206
+"""Status of a response frame that more frames for the same request follow."""
+
+CANCEL_METHOD: Final = "/cancel"
+"""Cancels the request whose id is in the `id` param, and is never answered."""
+
+
+class RpcRequest(msgspec.Struct, array_like=True, frozen=True):
+    id: int
+    method: str
+    """Route, as for HTTP, e.g. `/capability/outline`."""
+    params: dict[str, str]
+    """Query parameters, as for HTTP."""
+    accept: str
+    payload: bytes
+    """JSON-encoded request body."""
+
+
+class RpcResponse(msgspec.Struct, array_like=True, frozen=True):
+    id: int
+    status: int
+    """HTTP status code, errors carry a JSON `{"detail": ...}` payload."""
+    content_type: str
+    payload: bytes
+    """Encoded response, empty for `None`."""
+
+
+class RpcError(Exception):
+    """An RPC answered with an error status."""
+
+    def __init__(self, status: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+type RpcHandler = Callable[[RpcRequest], AsyncGenerator[RpcResponse]]
+"""Yields the responses to one request, partial ones first."""
+
+_encoder: Final = msgspec.msgpack.Encoder()
+request_decoder: Final = msgspec.msgpack.Decoder(RpcRequest)
+response_decoder: Final = msgspec.msgpack.Decoder(RpcResponse)
+
+
+def error_response(req_id: int, status: int, detail: str) -> RpcResponse:
+    payload = msgspec.json.encode({"detail": detail})
+    return RpcResponse(req_id, status, JSON_MEDIA_TYPE, payload)
+
+
+async def send_frame(
+    stream: ByteSendStream, msg: RpcRequest | RpcResponse, lock: anyio.Lock
+) -> None:
+    data = _encoder.encode(msg)
+    # One send per frame, so concurrent senders never interleave, and never
+    # cut short by cancellation, which would leave a partial frame behind
+    async with lock:
+        with anyio.CancelScope(shield=True):
+            await stream.send(FRAME_HEADER.pack(len(data)) + data)
+
+
+async def receive_frame(stream: BufferedByteReceiveStream) -> bytes:
+    (size,) = FRAME_HEADER.unpack(await stream.receive_exactly(FRAME_HEADER.size))
+    if size > MAX_FRAME_SIZE:
+        raise ValueError(f"RPC frame of {size} bytes exceeds the size limit")
+    return await stream.receive_exactly(size)
+
+
+@define
+class AsyncRpcClient:
+    """`AsyncHttpClient.post`, and raw calls and streams, over one RPC connection.
+
+    The connection is opened on first use. A single reader task routes each
+    response to the request waiting for its id, so concurrent requests share
+    the connection. Must be used as an async context manager.
+    """
+
+    path: Path
+    media_type: str = JSON_MEDIA_TYPE
+    """Response encoding asked for unless a request overrides it."""
+    timeout: float | None = 30.0
+    """Longest wait for each response frame, `None` waits forever."""
+
+    _stream: SocketStream | None = field(init=False, default=None)
+    _connect_lock: anyio.Lock = field(init=False, factory=anyio.Lock)
+    _send_lock: anyio.Lock = field(init=False, factory=anyio.Lock)
+    _pending: dict[int, MemoryObjectSendStream[RpcResponse]] = field(
+        init=False, factory=dict
+    )
+    _ids: Iterator[int] = field(init=False, factory=itertools.count)
+    _tg: TaskGroup | None = field(init=False, default=None)
+    _exit_stack: AsyncExitStack = field(init=False, factory=AsyncExitStack)
+
+    async def post[T: BaseModel](
+        self,
+        url: str,
+        resp_schema: type[T],
+        *,
+        params: BaseModel | None = None,
+        json: BaseModel | None = None,
+        media_type: str | None = None,
+    ) -> T | None:
+        resp = await self.call(
+            url,
+            params=params.model_dump(exclude_none=True, mode="json") if params else {},
+            accept=media_type,
+            payload=encode_model(json, exclude_none=True) if json else b"",
+        )
+        if not resp.payload:
+            return None
+        return decode_model(resp_schema, resp.payload, resp.content_type)
+
+    async def call(
+        self,
+        method: str,
+        *,
+        params: dict[str, str] | None = None,
+        accept: str | None = None,
+        payload: bytes = b"",
+    ) -> RpcResponse:
+        """Send a request and wait for its response."""
+        async with self._open(method, params, accept, payload) as receive:
+            return await self._receive(receive, method)
+
+    async def stream(
+        self,
+        method: str,
+        *,
+        params: dict[str, str] | None = None,
+        accept: str | None = None,
+        payload: bytes = b"",
+    ) -> AsyncGenerator[RpcResponse]:
+        """Send a request and yield its partial responses until the final one."""
+        async with self._open(method, params, accept, payload) as receive:
+            while True:
+                resp = await self._receive(receive, method)
+                if resp.status != PARTIAL_STATUS:
+                    return
+                yield resp
+
+    @asynccontextmanager
+    async def _open(
+        self,
+        method: str,
+        params: dict[str, str] | None,
+        accept: str | None,
+        payload: bytes,
+    ) -> AsyncGenerator[MemoryObjectReceiveStream[RpcResponse]]:
+        stream = await self._connect()
+        req = RpcRequest(
+            id=next(self._ids),
+            method=method,
+            params=params or {},
+            accept=accept or self.media_type,
+            payload=payload,
+        )
+        # Unbounded, so the reader never waits on one slow request
+        send, receive = anyio.create_memory_object_stream[RpcResponse](math.inf)
+        self._pending[req.id] = send
+        try:
+            await send_frame(stream, req, self._send_lock)
+            with receive:
+                yield receive
+        finally:
+            # An abandoned request's late responses are simply dropped
+            abandoned = self._pending.pop(req.id, None) is not None
+            if abandoned and self._stream is stream:
+                with anyio.CancelScope(shield=True):
+                    await self._cancel(stream, req.id)
+
+    async def _cancel(self, stream: SocketStream, req_id: int) -> None:
+        req = RpcRequest(
+            id=next(self._ids),
+            method=CANCEL_METHOD,
+            params={"id": str(req_id)},
+            accept="",
+            payload=b"",
+        )
+        with suppress(anyio.BrokenResourceError, anyio.ClosedResourceError):
+            await send_frame(stream, req, self._send_lock)
+
+    async def _receive(
+        self, receive: MemoryObjectReceiveStream[RpcResponse], method: str
+    ) -> RpcResponse:
+        with anyio.move_on_after(self.timeout) as scope:
+            try:
+                resp = await receive.receive()
+            except anyio.EndOfStream:
+                raise ConnectionError(
+                    f"Connection to {self.path.name} was lost"
+                ) from None
+        if scope.cancelled_caught:
+            raise TimeoutError(f"Request timed out: {method}")
+        if resp.status >= 400:
+            detail = msgspec.json.decode(resp.payload).get("detail", "")
+            raise RpcError(resp.status, str(detail))
+        return resp
+
+    async def _connect(self) -> SocketStream:
+        if self._tg is None:
+            raise RuntimeError(
+                "AsyncRpcClient must be used as an async context manager"
+            )
+        async with self._connect_lock:
+            if self._stream is None:
+                self._stream = await anyio.connect_unix(self.path)
+                self._tg.start_soon(self._read_loop, self._stream)
+            return self._stream
+
+    async def _read_loop(self, stream: SocketStream) -> None:
+        receive = BufferedByteReceiveStream(stream)
+        try:
+            while True:
+                resp = response_decoder.decode(await receive_frame(receive))
+                if resp.status == PARTIAL_STATUS:
+                    if send := self._pending.get(resp.id):
+                        send.send_nowait(resp)
+                elif send := self._pending.pop(resp.id, None):
+                    send.send_nowait(resp)
+                    send.close()
+        except (anyio.EndOfStream, anyio.IncompleteRead, anyio.BrokenResourceError):
+            pass
+        except (ValueError, msgspec.DecodeError) as e:
+            # A corrupt stream cannot be resynchronised, so it is dropped
+            logger.warning("Dropping RPC connection to {}: {}", self.path.name, e)
+        finally:
+            # Wake every waiting request, they now see the connection is gone
+            for send in self._pending.values():
+                send.close()
+            self._pending.clear()
+            self._stream = None
+            await stream.aclose()
+
+    async def close(self) -> None:
+        await self._exit_stack.aclose()
+
+    async def __aenter__(self) -> AsyncRpcClient:
+        self._tg = await self._exit_stack.enter_async_context(anyio.create_task_group())
+        self._exit_stack.callback(self._tg.cancel_scope.cancel)
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        await self.close()
+
+
+async def _serve_connection(stream: SocketStream, handler: RpcHandler) -> None:
+    receive = BufferedByteReceiveStream(stream)
+    send_lock = anyio.Lock()
+    running: dict[int, anyio.CancelScope] = {}
+
+    async def answer(req: RpcRequest) -> None:
+        with anyio.CancelScope() as running[req.id]:
+            try:
+                async with aclosing(handler(req)) as responses:
+                    async for resp in responses:
+                        await send_frame(stream, resp, send_lock)
+            except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+                logger.debug("RPC client left before request {} was answered", req.id)
+            finally:
+                del running[req.id]
+
+    async with stream, anyio.create_task_group() as tg:
+        while True:
+            try:
+                frame = await receive_frame(receive)
+            except (anyio.EndOfStream, anyio.IncompleteRead, anyio.BrokenResourceError):
+                break
+            except ValueError as e:
+                logger.warning("Dropping RPC connection: {}", e)
+                break
+            try:
+                req = request_decoder.decode(frame)
+            except msgspec.DecodeError as e:
+                logger.warning("Dropping RPC connection: {}", e)
+                break
+            if req.method == CANCEL_METHOD:
+                with suppress(KeyError, ValueError):
+                    running[int(req.params["id"])].cancel()
+            else:
+                tg.start_soon(answer, req)
+        # Nobody is left to receive the answers
+        tg.cancel_scope.cancel()
+
+
+async def serve(sock: socket.socket, handler: RpcHandler) -> None:
+    """Answer requests on every connection to the listening `sock`."""
+    sock.setblocking(False)
+    # anyio wraps listening sockets as TCP listeners only, so accept by hand
+    async with anyio.create_task_group() as tg:
+        while True:
+            await anyio.wait_readable(sock)
+            try:
+                conn, _ = sock.accept()
+            except BlockingIOError:
+                continue
+            stream = await UNIXSocketStream.from_socket(conn)
+            tg.start_soon(_serve_connection, stream, handler)
@@ -1,3 +1,4 @@
+import os
 import socket
 from pathlib import Path
 
@@ -5,6 +6,29 @@ import anyio
 from tenacity import AsyncRetrying, stop_after_delay, wait_fixed
 
 
+def listen_unix(path: Path) -> socket.socket:
+    """Bind a listening Unix socket at `path`, replacing any stale socket file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path.as_posix())
+    sock.listen(socket.SOMAXCONN)
+    return sock
+
+
+async def unlink_unix(path: Path, bound: os.stat_result) -> None:
+    """Remove the socket file at `path`, unless a newer socket has replaced it.
+
+    `bound` is the file's status taken right after `listen_unix` created it.
+    """
+    try:
+        current = await anyio.Path(path).stat()
+    except FileNotFoundError:
+        return
+    if (current.st_dev, current.st_ino) == (bound.st_dev, bound.st_ino):
+        await anyio.Path(path).unlink(missing_ok=True)
+
+
 def is_socket_alive(path: Path) -> bool:
     try:
         with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
@@ -22,6 +46,7 @@ async def wait_socket(path: Path, timeout: float = 10.0) -> None:
     ):
         with attempt:
             try:
-                _ = await anyio.connect_unix(path)
+                stream = await anyio.connect_unix(path)
             except (OSError, RuntimeError) as e:
                 raise OSError(f"Socket {path} not ready") from e
+            await stream.aclose()
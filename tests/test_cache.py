@@ -0,0 +1,211 @@
+from functools import partial
+from pathlib import Path
+
+import anyio
+import pytest
+from pydantic import BaseModel
+
+from lsp_cli.manager.cache import ResponseCache, SingleFlight, collect_paths
+
+
+class Req(BaseModel):
+    file_path: Path
+
+
+class Resp(BaseModel):
+    file_path: Path
+    refs: list[Path] = []
+    text: str = ""
+
+
+@pytest.fixture
+def files(tmp_path):
+    a, b = tmp_path / "a.py", tmp_path / "b.py"
+    a.write_text("a = 1\n")
+    b.write_text("b = 2\n")
+    return a, b
+
+
+def test_collect_paths(files):
+    a, b = files
+    resp = Resp(file_path=a, refs=[a, b])
+    assert collect_paths(resp.model_dump()) == {a, b}
+
+
+def test_hit_until_file_changes(files):
+    a, _ = files
+    cache = ResponseCache(max_bytes=1 << 20)
+    key = cache.make_key("outline", Req(file_path=a))
+
+    assert cache.get(key) is None
+    cache.put(key, Resp(file_path=a), [a])
+    entry = cache.get(key)
+    assert entry is not None
+    assert entry.value == Resp(file_path=a)
+
+    a.write_text("a = 10\n")
+    assert cache.get(key) is None
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.entries) == (1, 2, 0)
+
+
+def test_key_depends_on_request(files):
+    a, b = files
+    assert ResponseCache.make_key("outline", Req(file_path=a)) != (
+        ResponseCache.make_key("outline", Req(file_path=b))
+    )
+    assert ResponseCache.make_key("outline", Req(file_path=a)) != (
+        ResponseCache.make_key("symbol", Req(file_path=a))
+    )
+
+
+def test_invalidate_uses_provenance(files):
+    a, b = files
+    cache = ResponseCache(max_bytes=1 << 20)
+    cache.put("only-a", Resp(file_path=a), [a])
+    cache.put("a-and-b", Resp(file_path=a, refs=[b]), [a, b])
+    cache.put("only-b", Resp(file_path=b), [b])
+
+    assert cache.invalidate([b]) == 2
+    assert cache.get("only-a") is not None
+    assert cache.get("a-and-b") is None
+    assert cache.get("only-b") is None
+
+
+def test_workspace_entries_need_watcher(files):
+    a, b = files
+    cache = ResponseCache(max_bytes=1 << 20)
+    cache.put("refs", Resp(file_path=a), [a], workspace=True)
+    assert cache.get("refs") is None
+
+    cache.watched = True
+    cache.put("refs", Resp(file_path=a), [a], workspace=True)
+    assert cache.get("refs") is not None
+
+    # Any change may add a reference, even in a file outside the provenance
+    cache.invalidate([b])
+    assert cache.get("refs") is None
+
+
+def test_lru_eviction_respects_byte_cap(files):
+    a, _ = files
+    value = Resp(file_path=a, text="x" * 100)
+    size = len(value.model_dump_json())
+    cache = ResponseCache(max_bytes=size * 2)
+
+    cache.put("first", value, [a])
+    cache.put("second", value, [a])
+    assert cache.get("first") is not None  # now most recently used
+    cache.put("third", value, [a])
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+    assert cache.stats.size == size * 2
+
+
+def test_oversized_value_is_not_cached(files):
+    a, _ = files
+    cache = ResponseCache(max_bytes=10)
+    cache.put("big", Resp(file_path=a, text="x" * 100), [a])
+    assert cache.get("big") is None
+    assert cache.stats.size == 0
+
+
+def test_deleted_file_misses(files):
+    a, _ = files
+    cache = ResponseCache(max_bytes=1 << 20)
+    cache.put("key", None, [a])
+    assert cache.get("key") is not None
+
+    a.unlink()
+    assert cache.get("key") is None
+
+
+def test_paused_cache_skips_fills(files):
+    a, _ = files
+    cache = ResponseCache(max_bytes=1 << 20, paused=True)
+    cache.put("key", None, [a])
+    assert cache.get("key") is None
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_results(files):
+    a, _ = files
+    flights = SingleFlight()
+    release = anyio.Event()
+    calls: list[str] = []
+    results: list[BaseModel | None] = []
+
+    async def outline(text: str) -> Resp:
+        calls.append(text)
+        await release.wait()
+        return Resp(file_path=a, text=text)
+
+    async def request(key: str, text: str) -> None:
+        results.append(await flights.do(key, partial(outline, text)))
+
+    async with anyio.create_task_group() as tg:
+        for text in ("first", "second", "third"):
+            tg.start_soon(request, "same", text)
+        tg.start_soon(request, "other", "other")
+        await anyio.wait_all_tasks_blocked()
+        release.set()
+
+    assert calls == ["first", "other"]
+    assert sorted(r.text for r in results if isinstance(r, Resp)) == [
+        "first",
+        "first",
+        "first",
+        "other",
+    ]
+    assert flights.coalesced == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors_but_not_cancellation():
+    flights = SingleFlight()
+    attempts: list[int] = []
+
+    async def fail() -> None:
+        await anyio.wait_all_tasks_blocked()
+        raise ValueError("no such symbol")
+
+    async def hang() -> Resp:
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            await anyio.sleep_forever()
+        return Resp(file_path=Path("x.py"), text="retried")
+
+    errors: list[Exception] = []
+
+    async def failing() -> None:
+        try:
+            await flights.do("fail", fail)
+        except ValueError as e:
+            errors.append(e)
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(failing)
+        tg.start_soon(failing)
+    assert len(errors) == 2
+
+    # A leader whose caller goes away hands the computation to a waiter
+    leader_scope = anyio.CancelScope()
+    results: list[BaseModel | None] = []
+
+    async def leader() -> None:
+        with leader_scope:
+            await flights.do("hang", hang)
+
+    async def follower() -> None:
+        results.append(await flights.do("hang", hang))
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(leader)
+        await anyio.wait_all_tasks_blocked()
+        tg.start_soon(follower)
+        await anyio.wait_all_tasks_blocked()
+        leader_scope.cancel()
+
+    assert attempts == [0, 1]
+    assert results == [Resp(file_path=Path("x.py"), text="retried")]
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import anyio
+import pytest
+from litestar.exceptions import HTTPException, NotFoundException
+
+from lsp_cli.manager import cancel
+from lsp_cli.manager.cancel import CLIENT_CLOSED_STATUS, until_disconnected
+
+
+def fake_request(disconnected: anyio.Event) -> SimpleNamespace:
+    async def receive() -> dict:
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    return SimpleNamespace(receive=receive, url=SimpleNamespace(path="/capability"))
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_call():
+    disconnected = anyio.Event()
+    cancelled = anyio.Event()
+
+    async def call() -> None:
+        try:
+            await anyio.sleep_forever()
+        finally:
+            cancelled.set()
+
+    async def disconnect() -> None:
+        await anyio.wait_all_tasks_blocked()
+        disconnected.set()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(disconnect)
+        with pytest.raises(HTTPException) as exc_info:
+            await until_disconnected(fake_request(disconnected), call)  # ty: ignore[invalid-argument-type]
+    assert exc_info.value.status_code == CLIENT_CLOSED_STATUS
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_call_result_and_errors_pass_through():
+    request = fake_request(anyio.Event())
+
+    async def answer() -> str:
+        return "done"
+
+    async def fail() -> None:
+        raise NotFoundException("Unknown capability: nope")
+
+    assert await until_disconnected(request, answer) == "done"  # ty: ignore[invalid-argument-type]
+    with pytest.raises(NotFoundException):
+        await until_disconnected(request, fail)  # ty: ignore[invalid-argument-type]
+
+
+def test_unsupported_lsp_client_fails_loudly(monkeypatch):
+    cancel._check_internals()
+
+    class Changed:
+        pass
+
+    monkeypatch.setattr(cancel, "StreamServer", Changed)
+    with pytest.raises(RuntimeError, match="not supported"):
+        cancel._check_internals()
+
+
+@pytest.mark.asyncio
+async def test_unanswered_abandoned_requests_are_freed():
+    now = anyio.current_time()
+    live = object()
+    pending = {
+        1: cancel._DroppedResponse(now - 1),
+        2: cancel._DroppedResponse(now + 60),
+        3: live,
+    }
+    cancel._sweep(pending)
+    assert list(pending) == [2, 3]
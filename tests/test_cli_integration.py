@@ -5,6 +5,7 @@ This tests actual CLI command execution to verify that the server
 management system works correctly in real-world usage scenarios.
 """
 
+import json
 import subprocess
 import time
 from pathlib import Path
@@ -259,3 +260,106 @@ class TestConnectionReliability:
         # Subsequent commands should work
         result = self.run_lsp_command("server", "list")
         assert result.returncode == 0, f"Manager not responding: {result.stderr}"
+
+
+class TestBatchCommand(BaseLSPTest):
+    """Test running many queries through `lsp batch`."""
+
+    def test_batch_preserves_input_order(self, test_project_file, tmp_path):
+        """Results come back one per line, in input order, with per-query errors."""
+        queries = tmp_path / "queries.jsonl"
+        queries.write_text(
+            "\n".join(
+                [
+                    json.dumps(
+                        {"capability": "outline", "file_path": str(test_project_file)}
+                    ),
+                    json.dumps(
+                        {"id": "missing", "capability": "doc", "locate": "nope.py:1"}
+                    ),
+                    json.dumps({"capability": "unknown"}),
+                ]
+            )
+        )
+
+        result = self.run_lsp_command("batch", str(queries), timeout=60)
+        assert result.returncode == 0, f"Command failed: {result.stderr}"
+
+        lines = [json.loads(line) for line in result.stdout.splitlines()]
+        assert [line["id"] for line in lines] == [0, "missing", 2]
+        assert lines[0]["error"] is None
+        assert "File not found" in lines[1]["error"]
+        assert lines[2]["error"]
+
+    def test_batch_single_slot(self, tmp_path):
+        """With one slot, each query waits until the previous result is written."""
+        queries = tmp_path / "queries.jsonl"
+        queries.write_text(
+            "\n".join(
+                json.dumps({"capability": "doc", "locate": f"nope{i}.py:1"})
+                for i in range(5)
+            )
+        )
+
+        result = self.run_lsp_command("batch", str(queries), "-j", "1", timeout=60)
+        assert result.returncode == 0, f"Command failed: {result.stderr}"
+        lines = [json.loads(line) for line in result.stdout.splitlines()]
+        assert [line["id"] for line in lines] == list(range(5))
+
+
+class TestMultiLocate(BaseLSPTest):
+    """Test querying several locations in one command."""
+
+    def test_doc_many_locates(self):
+        """Each location gets its own section, failures are reported inline."""
+        client_py = Path(__file__).parent.parent / "src" / "lsp_cli" / "client.py"
+        result = self.run_lsp_command(
+            "doc",
+            "-L",
+            f"{client_py}:find_target",
+            "-L",
+            f"{client_py}:match_target",
+            "-L",
+            "nope.py:1",
+            timeout=60,
+        )
+        assert result.returncode == 1
+        assert f"==> {client_py}:find_target <==" in result.stdout
+        assert f"==> {client_py}:match_target <==" in result.stdout
+        assert "==> nope.py:1 <==\nError: File not found" in result.stdout
+
+    def test_locate_file(self, tmp_path):
+        """Locate strings can be read from a file."""
+        client_py = Path(__file__).parent.parent / "src" / "lsp_cli" / "client.py"
+        locates = tmp_path / "locates.txt"
+        locates.write_text(f"{client_py}:find_target\n\n{client_py}:ClientTarget\n")
+
+        result = self.run_lsp_command(
+            "locate", "--locate-file", str(locates), "--check", timeout=60
+        )
+        assert result.returncode == 0, f"Command failed: {result.stderr}"
+        assert result.stdout.count("Located") == 2
+
+
+class TestStreaming(BaseLSPTest):
+    """Test printing results as they are streamed from the server."""
+
+    def test_reference_stream(self):
+        """Each reference is printed as its own section."""
+        shared_py = (
+            Path(__file__).parent.parent / "src" / "lsp_cli" / "cli" / "shared.py"
+        )
+        result = self.run_lsp_command(
+            "reference", "-L", f"{shared_py}:get_msg", "--stream", timeout=60
+        )
+        assert result.returncode == 0, f"Command failed: {result.stderr}"
+        assert result.stdout.count("### `") >= 2
+        assert "cli/batch.py" in result.stdout
+
+    def test_search_stream(self):
+        """Search matches are printed one per line."""
+        result = self.run_lsp_command(
+            "search", "get_msg", "--stream", "-w", "src", timeout=60
+        )
+        assert result.returncode == 0, f"Command failed: {result.stderr}"
+        assert "- `get_msg` (function)" in result.stdout
@@ -39,8 +39,8 @@ class TestCLIProjectOption:
         target_file = root_dir / "src" / "lsp_cli" / "cli" / "shared.py"
         project_dir = root_dir
 
-        # We need a location string. Let's use something simple like line 22 (managed_client)
-        locate_str = f"{target_file}:22"
+        # Locate by symbol so the test does not depend on line numbers
+        locate_str = f"{target_file}:managed_client"
 
         result = self.run_lsp_command(
             "definition", "--locate", locate_str, "--project", str(project_dir)
@@ -55,7 +55,7 @@ class TestCLIProjectOption:
         target_file = root_dir / "src" / "lsp_cli" / "cli" / "shared.py"
         project_dir = root_dir
 
-        locate_str = f"{target_file}:22"
+        locate_str = f"{target_file}:managed_client"
 
         result = self.run_lsp_command(
             "locate", locate_str, "--project", str(project_dir)
@@ -70,7 +70,7 @@ class TestCLIProjectOption:
         target_file = root_dir / "src" / "lsp_cli" / "cli" / "shared.py"
         project_dir = root_dir
 
-        locate_str = f"{target_file}:22"
+        locate_str = f"{target_file}:managed_client"
 
         result = self.run_lsp_command(
             "symbol", "--locate", locate_str, "--project", str(project_dir)
@@ -98,7 +98,7 @@ class TestCLIProjectOption:
         target_file = root_dir / "src" / "lsp_cli" / "cli" / "shared.py"
         project_dir = root_dir
 
-        locate_str = f"{target_file}:22"
+        locate_str = f"{target_file}:managed_client"
 
         # Preview rename
         result = self.run_lsp_command(
@@ -121,7 +121,7 @@ class TestCLIProjectOption:
         target_file = root_dir / "src" / "lsp_cli" / "cli" / "shared.py"
         project_dir = root_dir
 
-        locate_str = f"{target_file}:22"
+        locate_str = f"{target_file}:managed_client"
 
         result = self.run_lsp_command(
             "doc", "--locate", locate_str, "--project", str(project_dir)
@@ -139,7 +139,7 @@ class TestCLIProjectOption:
         target_file = root_dir / "src" / "lsp_cli" / "cli" / "shared.py"
         project_dir = root_dir
 
-        locate_str = f"{target_file}:22"
+        locate_str = f"{target_file}:managed_client"
 
         result = self.run_lsp_command(
             "reference", "--locate", locate_str, "--project", str(project_dir)
@@ -2,7 +2,7 @@ from pathlib import Path
 
 import pytest
 
-from lsp_cli.client import find_target
+from lsp_cli.client import TargetResolver, find_target
 
 
 @pytest.fixture
@@ -81,3 +81,62 @@ def test_find_no_client():
     path = Path("/tmp/nonexistent_project_12345/file.txt")
     target = find_target(path)
     assert target is None
+
+
+@pytest.mark.parametrize(
+    "relpath",
+    [
+        "go_project/main.go",
+        "rust_project/src/main.rs",
+        "typescript_project/index.ts",
+        "deno_project/main.ts",
+        "java_project/src/main/java/com/example/Greeter.java",
+    ],
+)
+def test_resolver_matches_find_target(fixtures_dir, relpath):
+    path = fixtures_dir / relpath
+    assert TargetResolver().find(path) == find_target(path)
+
+
+@pytest.fixture
+def nested_project(tmp_path):
+    (tmp_path / "pyproject.toml").touch()
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    (sub / "pyproject.toml").touch()
+    (sub / "main.py").touch()
+    (sub / "main.go").touch()
+    return tmp_path
+
+
+def test_resolver_reuses_covering_client(nested_project):
+    resolver = TargetResolver()
+    file = nested_project / "sub" / "main.py"
+
+    target = resolver.find(file)
+    assert target is not None
+    assert target.project_path == nested_project / "sub"
+
+    root = resolver.find(nested_project)
+    assert root is not None
+    resolver.add(root)
+    assert resolver.find(file) == root
+
+    # A running client only covers files of its own language
+    assert resolver.find(nested_project / "sub" / "main.go") is None
+
+    resolver.remove(root)
+    assert resolver.find(file) == target
+
+
+def test_resolver_revalidates_markers(tmp_path):
+    resolver = TargetResolver()
+    file = tmp_path / "main.py"
+    file.touch()
+    assert resolver.find(file) is None
+
+    (tmp_path / "pyproject.toml").touch()
+    target = resolver.find(file)
+    assert target is not None
+    assert target.project_path == tmp_path
+    assert resolver.match(tmp_path) == target
@@ -0,0 +1,159 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+from lsap.schema.models import SymbolKind
+from lsap.schema.search import SearchItem, SearchRequest
+from lsprotocol import types as lsp_type
+
+from lsp_cli.manager.index import SymbolIndex, to_search_items
+
+
+def item(path: Path, name: str, kind=SymbolKind.Function, line=1, container=None):
+    return SearchItem(
+        name=name, kind=kind, file_path=path, line=line, container=container
+    )
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SymbolIndex.open(tmp_path / "index.sqlite", tmp_path, [".py"])
+    a, b = tmp_path / "a.py", tmp_path / "b.py"
+    index.replace(
+        a,
+        (1, 1),
+        "da",
+        [
+            item(a, "AuthService", SymbolKind.Class),
+            item(a, "login", SymbolKind.Method, 2, "AuthService"),
+            item(a, "get_auth_token", line=10),
+        ],
+    )
+    index.replace(b, (1, 1), "db", [item(b, "auth"), item(b, "main", line=5)])
+    yield index
+    index.close()
+
+
+def names(index: SymbolIndex, **kwargs) -> list[str]:
+    return [i.name for i in index.search(SearchRequest(**kwargs)).items]
+
+
+def test_substring_search_ranks_exact_and_prefix_first(index):
+    assert names(index, query="auth") == ["auth", "AuthService", "get_auth_token"]
+
+
+def test_short_query_uses_prefix(index):
+    assert names(index, query="ma") == ["main"]
+    assert names(index, query="in") == []
+
+
+def test_kinds_filter(index):
+    assert names(index, query="auth", kinds=[SymbolKind.Class]) == ["AuthService"]
+
+
+def test_pagination(index):
+    resp = index.search(SearchRequest(query="auth", max_items=2, start_index=1))
+    assert [i.name for i in resp.items] == ["AuthService", "get_auth_token"]
+    assert (resp.total, resp.has_more) == (3, False)
+
+    resp = index.search(SearchRequest(query="auth", max_items=1))
+    assert (resp.total, resp.has_more) == (3, True)
+
+
+def test_replace_and_remove(index, tmp_path):
+    a = tmp_path / "a.py"
+    index.replace(a, (2, 2), "da2", [item(a, "logout")])
+    assert names(index, query="AuthService") == []
+    assert names(index, query="logout") == ["logout"]
+
+    index.remove([a])
+    assert names(index, query="logout") == []
+    assert a not in index.files()
+
+
+def test_persists_and_rebuilds_outdated_schema(index, tmp_path):
+    path = tmp_path / "index.sqlite"
+    index.close()
+    reopened = SymbolIndex.open(path, tmp_path, [".py"])
+    assert names(reopened, query="main") == ["main"]
+    reopened.close()
+
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA user_version = 999")
+    db.close()
+    rebuilt = SymbolIndex.open(path, tmp_path, [".py"])
+    assert rebuilt.files() == {}
+    rebuilt.close()
+
+
+def test_scan_and_mark_stale_skip_ignored(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "node_modules").mkdir()
+    src, ignored = tmp_path / "pkg" / "m.py", tmp_path / "node_modules" / "x.py"
+    for path in (src, ignored, tmp_path / "README.md"):
+        path.write_text("")
+
+    index = SymbolIndex.open(tmp_path / "index.sqlite", tmp_path, [".py"])
+    assert set(index.scan()) == {src}
+    assert index.is_source(src)
+    assert not index.is_source(ignored)
+    assert not index.is_source(tmp_path / "README.md")
+    index.close()
+
+
+def test_to_search_items_flattens_document_symbols(tmp_path):
+    def rng(line: int) -> lsp_type.Range:
+        pos = lsp_type.Position(line=line, character=0)
+        return lsp_type.Range(start=pos, end=pos)
+
+    method = lsp_type.DocumentSymbol(
+        name="run",
+        kind=lsp_type.SymbolKind.Method,
+        range=rng(3),
+        selection_range=rng(3),
+    )
+    cls = lsp_type.DocumentSymbol(
+        name="Job",
+        kind=lsp_type.SymbolKind.Class,
+        range=rng(2),
+        selection_range=rng(2),
+        children=[method],
+    )
+    path = tmp_path / "a.py"
+    assert to_search_items(path, [cls]) == [
+        item(path, "Job", SymbolKind.Class, 3),
+        item(path, "run", SymbolKind.Method, 4, "Job"),
+    ]
+
+
+def test_locals_are_not_indexed(tmp_path):
+    def symbol(name: str, kind: lsp_type.SymbolKind, line: int, children=None):
+        pos = lsp_type.Position(line=line, character=0)
+        rng = lsp_type.Range(start=pos, end=pos)
+        return lsp_type.DocumentSymbol(
+            name=name, kind=kind, range=rng, selection_range=rng, children=children
+        )
+
+    local = symbol("retry_count", lsp_type.SymbolKind.Variable, 3)
+    func = symbol("fetch", lsp_type.SymbolKind.Function, 2, [local])
+    constant = symbol("retry_limit", lsp_type.SymbolKind.Constant, 0)
+    path = tmp_path / "a.py"
+
+    index = SymbolIndex.open(tmp_path / "index.sqlite", tmp_path, [".py"])
+    index.replace(path, (1, 1), "da", to_search_items(path, [constant, func]))
+    assert names(index, query="retry") == ["retry_limit"]
+    index.close()
+
+    flat = [
+        lsp_type.SymbolInformation(
+            name=name,
+            kind=kind,
+            location=lsp_type.Location(uri=path.as_uri(), range=local.range),
+            container_name=container,
+        )
+        for name, kind, container in [
+            ("fetch", lsp_type.SymbolKind.Function, None),
+            ("retry_count", lsp_type.SymbolKind.Variable, "fetch"),
+        ]
+    ]
+    assert [i.name for i in to_search_items(path, flat)] == ["fetch"]
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+from loguru import logger
+
+from lsp_cli.manager.manager import Manager
+from lsp_cli.manager.memory import ProcessMemory, process_tree_rss
+from lsp_cli.settings import settings
+
+MIB = 2**20
+
+
+def test_process_tree_rss_includes_children():
+    child = subprocess.Popen(
+        [sys.executable, "-c", "import sys; sys.stdin.read()"],
+        stdin=subprocess.PIPE,
+    )
+    try:
+        usage = process_tree_rss([os.getpid(), child.pid, 2**22 + 1])
+        assert usage[child.pid] > 0
+        assert usage[os.getpid()] > usage[child.pid]
+        # Processes that do not exist are left out
+        assert len(usage) == 2
+    finally:
+        child.communicate(b"")
+
+
+def fake_client(name: str, deadline: float, rss: int) -> SimpleNamespace:
+    client = SimpleNamespace(
+        id=name, deadline=deadline, stopping=False, memory=ProcessMemory()
+    )
+    client.memory.update(rss)
+
+    def stop() -> None:
+        client.stopping = True
+
+    client.stop = stop
+    return client
+
+
+@pytest.mark.asyncio
+async def test_evicts_least_recently_used_idle_clients(monkeypatch):
+    monkeypatch.setattr(settings, "memory_budget", 250 * MIB)
+    clients = [
+        fake_client("oldest", 1.0, 100 * MIB),
+        fake_client("busy", 0.0, 100 * MIB),
+        fake_client("older", 2.0, 100 * MIB),
+        fake_client("newest", 3.0, 100 * MIB),
+    ]
+    manager = Manager()
+    logger.remove(manager._logger_sink_id)
+    manager._clients.update({c.id: c for c in clients})
+    manager._in_flight["busy"] += 1
+
+    manager._evict()
+    stopped = [c.id for c in clients if c.stopping]
+    assert stopped == ["oldest", "older"]
+    assert manager.memory_usage().evicted == 2
+
+    # Clients already stopping no longer count against the limits
+    monkeypatch.setattr(settings, "max_clients", 2)
+    manager._evict(reserve=1)
+    stopped = [c.id for c in clients if c.stopping]
+    assert stopped == ["oldest", "older", "newest"]
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from lsp_cli.cli.query import (
+    DocQuery,
+    OutlineQuery,
+    QueryAdapter,
+    ReferenceQuery,
+)
+
+
+def test_parse_query_by_capability():
+    query = QueryAdapter.validate_json(
+        '{"id": "a", "capability": "doc", "locate": "main.py:main"}'
+    )
+    assert isinstance(query, DocQuery)
+    assert query.id == "a"
+    assert query.locate == "main.py:main"
+
+
+def test_parse_query_defaults():
+    query = QueryAdapter.validate_python(
+        {"capability": "reference", "locate": "main.py:main"}
+    )
+    assert isinstance(query, ReferenceQuery)
+    assert query.mode == "references"
+    assert query.start_index == 0
+
+    query = QueryAdapter.validate_python(
+        {"capability": "outline", "file_path": "main.py", "project": "."}
+    )
+    assert isinstance(query, OutlineQuery)
+    assert query.file_path == Path("main.py")
+    assert not query.all_symbols
+
+
+def test_parse_unknown_capability():
+    with pytest.raises(ValidationError):
+        QueryAdapter.validate_python({"capability": "unknown"})
+
+
+def test_parse_missing_argument():
+    with pytest.raises(ValidationError):
+        QueryAdapter.validate_python({"capability": "definition"})
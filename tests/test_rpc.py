@@ -0,0 +1,160 @@
+import anyio
+import msgspec
+import pytest
+from anyio.streams.buffered import BufferedByteReceiveStream
+from pydantic import BaseModel
+
+from lsp_cli.utils.rpc import (
+    PARTIAL_STATUS,
+    AsyncRpcClient,
+    RpcError,
+    RpcRequest,
+    RpcResponse,
+    receive_frame,
+    request_decoder,
+    send_frame,
+)
+from lsp_cli.utils.rpc import serve as serve_rpc
+from lsp_cli.utils.socket import listen_unix
+
+
+class Echo(BaseModel):
+    text: str
+
+
+async def serve(path, *, answered=2):
+    """Answer requests in reverse order of arrival, then hang up."""
+    async with await anyio.create_unix_listener(path) as listener:
+        stream = await listener.accept()
+        async with stream:
+            receive, lock = BufferedByteReceiveStream(stream), anyio.Lock()
+            reqs = [
+                request_decoder.decode(await receive_frame(receive))
+                for _ in range(answered + 1)
+            ]
+            for req in reversed(reqs[:answered]):
+                if req.method == "/fail":
+                    payload = msgspec.json.encode({"detail": "no such thing"})
+                    resp = RpcResponse(req.id, 404, "application/json", payload)
+                else:
+                    echo = Echo.model_validate_json(req.payload)
+                    resp = RpcResponse(
+                        req.id, 200, req.accept, echo.model_dump_json().encode()
+                    )
+                await send_frame(stream, resp, lock)
+
+
+@pytest.mark.asyncio
+async def test_multiplexed_requests(tmp_path):
+    path = tmp_path / "rpc.sock"
+    results: dict[str, object] = {}
+
+    async def call(client: AsyncRpcClient, name: str, url: str) -> None:
+        try:
+            results[name] = await client.post(url, Echo, json=Echo(text=name))
+        except (RpcError, ConnectionError) as e:
+            results[name] = e
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(serve, path)
+        await anyio.wait_all_tasks_blocked()
+        async with AsyncRpcClient(path) as client:
+            async with anyio.create_task_group() as calls:
+                calls.start_soon(call, client, "a", "/echo")
+                await anyio.wait_all_tasks_blocked()
+                calls.start_soon(call, client, "b", "/fail")
+                await anyio.wait_all_tasks_blocked()
+                calls.start_soon(call, client, "c", "/echo")
+
+    assert results["a"] == Echo(text="a")
+    assert isinstance(results["b"], RpcError)
+    assert (results["b"].status, results["b"].detail) == (404, "no such thing")
+    # The server hung up without answering
+    assert isinstance(results["c"], ConnectionError)
+
+
+async def count(req):
+    """Stream one partial frame per number up to the request's payload."""
+    for i in range(int(req.payload)):
+        yield RpcResponse(req.id, PARTIAL_STATUS, "application/json", str(i).encode())
+    yield RpcResponse(req.id, 200, "application/json", b"")
+
+
+@pytest.mark.asyncio
+async def test_streamed_responses(tmp_path):
+    path = tmp_path / "rpc.sock"
+    with listen_unix(path) as sock:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(serve_rpc, sock, count)
+            async with AsyncRpcClient(path) as client:
+                frames = [
+                    f.payload async for f in client.stream("/count", payload=b"3")
+                ]
+                assert frames == [b"0", b"1", b"2"]
+                final = await client.call("/count", payload=b"0")
+                assert (final.status, final.payload) == (200, b"")
+            tg.cancel_scope.cancel()
+
+
+@pytest.mark.asyncio
+async def test_abandoned_requests_are_cancelled(tmp_path):
+    path = tmp_path / "rpc.sock"
+    started, cancelled = [], []
+
+    async def hang(req):
+        started.append(req.method)
+        try:
+            await anyio.sleep_forever()
+        finally:
+            cancelled.append(req.method)
+        yield RpcResponse(req.id, 200, "application/json", b"")
+
+    async def wait_for(items: list, n: int) -> None:
+        with anyio.fail_after(1):
+            while len(items) < n:
+                await anyio.sleep(0.01)
+
+    with listen_unix(path) as sock:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(serve_rpc, sock, hang)
+            async with AsyncRpcClient(path, timeout=0.05) as client:
+                with pytest.raises(TimeoutError):
+                    await client.call("/timeout")
+                with anyio.move_on_after(0.05):
+                    await client.call("/cancel-scope")
+                await wait_for(cancelled, 2)
+
+            # Closing the connection cancels what is left on it
+            async with await anyio.connect_unix(path) as stream:
+                req = RpcRequest(0, "/disconnect", {}, "application/json", b"")
+                await send_frame(stream, req, anyio.Lock())
+                await wait_for(started, 3)
+            await wait_for(cancelled, 3)
+            tg.cancel_scope.cancel()
+
+    assert cancelled == ["/timeout", "/cancel-scope", "/disconnect"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "frame",
+    [b"\x00\x00\x00\x03abc", b"\xff\xff\xff\xff"],
+    ids=["undecodable", "oversized"],
+)
+async def test_corrupt_response_fails_pending_requests(tmp_path, frame):
+    path = tmp_path / "rpc.sock"
+
+    async def corrupt() -> None:
+        async with await anyio.create_unix_listener(path) as listener:
+            async with await listener.accept() as stream:
+                await receive_frame(BufferedByteReceiveStream(stream))
+                await stream.send(frame)
+                await anyio.sleep_forever()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(corrupt)
+        await anyio.wait_all_tasks_blocked()
+        async with AsyncRpcClient(path, timeout=None) as client:
+            with anyio.fail_after(1), pytest.raises(ConnectionError):
+                await client.call("/echo")
+        tg.cancel_scope.cancel()
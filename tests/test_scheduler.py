@@ -0,0 +1,122 @@
+import anyio
+import pytest
+from litestar.exceptions import TooManyRequestsException
+
+from lsp_cli.manager.scheduler import Priority, Scheduler, SessionQuotas
+from lsp_cli.settings import settings
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(settings, "interactive_concurrency", 2)
+    monkeypatch.setattr(settings, "bulk_concurrency", 1)
+    return Scheduler.create()
+
+
+@pytest.mark.asyncio
+async def test_point_queries_skip_bulk_queue(scheduler):
+    release = anyio.Event()
+    order: list[str] = []
+
+    async def run(name: str) -> None:
+        async with scheduler.slot(name):
+            order.append(name)
+            if name == "reference":
+                await release.wait()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(run, "reference")
+        tg.start_soon(run, "search")
+        await anyio.wait_all_tasks_blocked()
+        # The bulk slot is taken, the second bulk query queues
+        bulk = scheduler.queues[Priority.BULK].stats
+        assert (bulk.running, bulk.waiting) == (1, 1)
+
+        await run("hover")
+        assert order == ["reference", "hover"]
+        release.set()
+
+    assert order == ["reference", "hover", "search"]
+    stats = {queue.priority: queue for queue in scheduler.stats}
+    assert stats["bulk"].completed == 2
+    assert stats["interactive"].completed == 1
+    assert stats["bulk"].wait_p99_ms > 0
+
+
+@pytest.mark.asyncio
+async def test_stream_holds_slot_until_closed(scheduler):
+    async def items():
+        for i in range(3):
+            yield i
+
+    stream = scheduler.stream("reference", items())
+    assert await anext(stream) == 0
+    assert scheduler.queues[Priority.BULK].running == 1
+    await stream.aclose()
+    assert scheduler.queues[Priority.BULK].running == 0
+
+
+@pytest.mark.asyncio
+async def test_unclassified_routes_run_unscheduled(scheduler):
+    async with scheduler.slot("batch"):
+        assert all(queue.running == 0 for queue in scheduler.stats)
+    assert all(queue.completed == 0 for queue in scheduler.stats)
+
+
+@pytest.mark.asyncio
+async def test_sessions_take_turns_by_weight(scheduler, monkeypatch):
+    monkeypatch.setattr(settings, "session_weights", {"light": 0.5})
+    release = anyio.Event()
+    order: list[str] = []
+
+    async def run(session: str) -> None:
+        async with scheduler.slot("search", session):
+            order.append(session)
+            if session == "first":
+                await release.wait()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(run, "first")
+        await anyio.wait_all_tasks_blocked()
+        # A noisy session queues up before the others arrive
+        for _ in range(4):
+            tg.start_soon(run, "noisy")
+            await anyio.wait_all_tasks_blocked()
+        for session in ("light", "quiet", "light"):
+            tg.start_soon(run, session)
+            await anyio.wait_all_tasks_blocked()
+        release.set()
+
+    # Ties go to the earlier arrival, half weight spaces `light` out twice as far
+    assert order[1:] == ["noisy", "light", "quiet", "noisy", "noisy", "light", "noisy"]
+
+
+@pytest.mark.asyncio
+async def test_session_quotas(monkeypatch):
+    monkeypatch.setattr(settings, "session_rate_limit", 2.0)
+    monkeypatch.setattr(settings, "session_max_in_flight", 1)
+    quotas = SessionQuotas()
+
+    quotas.take("noisy")
+    quotas.take("noisy")
+    with pytest.raises(TooManyRequestsException):
+        quotas.take("noisy")
+    quotas.take("quiet")
+
+    release = anyio.Event()
+
+    async def hold() -> None:
+        async with quotas.slot("noisy"):
+            await release.wait()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(hold)
+        tg.start_soon(hold)
+        await anyio.wait_all_tasks_blocked()
+        usage = {u.session: u for u in quotas.usage}
+        assert (usage["noisy"].in_flight, usage["noisy"].waiting) == (1, 1)
+        release.set()
+
+    usage = {u.session: u for u in quotas.usage}
+    assert (usage["noisy"].completed, usage["noisy"].rejected) == (2, 1)
+    assert (usage["quiet"].completed, usage["quiet"].rejected) == (0, 0)
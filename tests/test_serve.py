@@ -0,0 +1,43 @@
+import json
+from typing import cast
+
+import anyio
+import pytest
+
+from lsp_cli.cli.serve import (
+    INVALID_PARAMS,
+    INVALID_REQUEST,
+    METHOD_NOT_FOUND,
+    PARSE_ERROR,
+    _handle,
+)
+from lsp_cli.cli.shared import ClientPool
+
+# None of these requests reach the pool, so no manager is needed
+NO_POOL = cast(ClientPool, None)
+
+
+def handle(line: str, capsys: pytest.CaptureFixture[str]) -> dict | None:
+    anyio.run(_handle, NO_POOL, line, "json")
+    out = capsys.readouterr().out
+    return json.loads(out) if out else None
+
+
+@pytest.mark.parametrize(
+    ("line", "code"),
+    [
+        ("not json", PARSE_ERROR),
+        ('{"id": 1}', INVALID_REQUEST),
+        ('{"id": 1, "method": "nope"}', METHOD_NOT_FOUND),
+        ('{"id": 1, "method": "doc", "params": {}}', INVALID_PARAMS),
+    ],
+)
+def test_error_responses(line, code, capsys):
+    resp = handle(line, capsys)
+    assert resp is not None
+    assert resp["error"]["code"] == code
+    assert "result" not in resp
+
+
+def test_notification_gets_no_response(capsys):
+    assert handle('{"method": "nope"}', capsys) is None
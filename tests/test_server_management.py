@@ -8,22 +8,55 @@ ensuring that commands can always connect to the server without failures.
 import subprocess
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import anyio
 import httpx
 import pytest
+from litestar.exceptions import HTTPException
+from lsap.schema.outline import OutlineRequest, OutlineResponse
+from lsap.schema.reference import ReferenceItem, ReferenceRequest, ReferenceResponse
+from lsap.schema.search import SearchItem, SearchRequest
+from lsap.utils.capability import ensure_capability
+from lsp_client.capability.request import (
+    WithRequestDocumentSymbol,
+    WithRequestWorkspaceSymbol,
+)
 
+from lsp_cli.cli.shared import ClientPool, create_locate
+from lsp_cli.client import TargetResolver
 from lsp_cli.manager import (
+    NDJSON_MEDIA_TYPE,
+    CapabilityBatchItem,
+    CapabilityBatchRequest,
+    CapabilityBatchResponse,
+    CapabilityStreamEvent,
+    CapabilityTarget,
     CreateClientRequest,
     CreateClientResponse,
     DeleteClientRequest,
     DeleteClientResponse,
     ManagedClientInfoList,
+    MemoryUsage,
+    SessionUsageList,
     connect_manager,
+    connect_manager_async,
+    connect_manager_rpc,
+)
+from lsp_cli.manager.cancel import cancellable
+from lsp_cli.manager.client import ManagedClient
+from lsp_cli.manager.manager import Manager
+from lsp_cli.manager.memory import process_tree_rss
+from lsp_cli.manager.worker import WorkerClient
+from lsp_cli.settings import MANAGER_UDS_PATH, RUNTIME_DIR, settings
+from lsp_cli.utils.http import (
+    MSGPACK_MEDIA_TYPE,
+    AsyncHttpClient,
+    EncodedModel,
+    HttpClient,
 )
-from lsp_cli.settings import MANAGER_UDS_PATH, RUNTIME_DIR
-from lsp_cli.utils.http import AsyncHttpClient, HttpClient
+from lsp_cli.utils.rpc import RpcError
 from lsp_cli.utils.socket import is_socket_alive, wait_socket
 
 
@@ -73,6 +106,15 @@ def test_file():
     return file
 
 
+@pytest.fixture
+def demo_file(tmp_path):
+    """A file in a small project of its own, not served by any manager."""
+    (tmp_path / "pyproject.toml").write_text("[project]\nname = 'demo'\n")
+    file = tmp_path / "demo.py"
+    file.write_text("def greet():\n    return 'hi'\n")
+    return file
+
+
 class TestManagerConnection:
     """Test manager connection reliability."""
 
@@ -383,6 +425,375 @@ class TestClientSocket:
                 # If no health endpoint, that's also acceptable
                 pass
 
+    @pytest.mark.asyncio
+    async def test_client_without_socket(self, monkeypatch, demo_file):
+        """With client sockets off, a client is served only through its owner."""
+        monkeypatch.setattr(settings, "client_sockets", False)
+        test_file = demo_file
+        target = TargetResolver().find(test_file)
+        assert target is not None
+        client = ManagedClient(target)
+        assert client.uds_path is None
+        assert not (RUNTIME_DIR / f"{client.id}.sock").exists()
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(client.run)
+            req = OutlineRequest(file_path=test_file)
+            resp = await client.request("outline", req.model_dump_json().encode())
+            assert isinstance(resp, OutlineResponse)
+            assert resp.file_path == test_file
+            client.stop()
+
+    @pytest.mark.asyncio
+    async def test_client_socket_uses_cache(self, demo_file):
+        """Requests on a client's own socket share its response cache."""
+        target = TargetResolver().find(demo_file)
+        assert target is not None
+        client = ManagedClient(target)
+        req = OutlineRequest(file_path=demo_file)
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(client.run)
+            await client.request("outline", req.model_dump_json().encode())
+            assert client.uds_path is not None
+            await wait_socket(client.uds_path, timeout=10.0)
+
+            transport = httpx.AsyncHTTPTransport(uds=client.uds_path.as_posix())
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://localhost", timeout=30.0
+            ) as http_client:
+                response = await http_client.post(
+                    "/capability/outline",
+                    content=req.model_dump_json(),
+                    params={"session": "agent"},
+                )
+            assert response.is_success
+            assert OutlineResponse.model_validate_json(response.content).file_path == (
+                demo_file
+            )
+            cache = client.info.cache
+            assert cache is not None
+            assert cache.hits == 1
+            client.stop()
+
+    @pytest.mark.asyncio
+    async def test_identical_requests_coalesced(self, demo_file):
+        """Identical requests in flight at once share one computation."""
+        target = TargetResolver().find(demo_file)
+        assert target is not None
+        client = ManagedClient(target)
+        req = ReferenceRequest(locate=create_locate(f"{demo_file}:greet"))
+        body = req.model_dump_json().encode()
+        results: list[object] = []
+
+        async def reference() -> None:
+            results.append(await client.request("reference", body))
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(client.run)
+            async with anyio.create_task_group() as requests:
+                for _ in range(3):
+                    requests.start_soon(reference)
+            assert client.info.coalesced == 2
+            client.stop()
+
+        assert all(isinstance(r, ReferenceResponse) for r in results)
+        assert results[0] == results[1] == results[2]
+
+    @pytest.mark.asyncio
+    async def test_reference_stream_closed_early(self, demo_file):
+        """A stream left after its first item stops, and the client keeps serving."""
+        demo_file.write_text("def greet():\n    return 'hi'\n\n" + "greet()\n" * 20)
+        target = TargetResolver().find(demo_file)
+        assert target is not None
+        client = ManagedClient(target)
+        req = ReferenceRequest(locate=create_locate(f"{demo_file}:greet"))
+        body = req.model_dump_json().encode()
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(client.run)
+            stream = await client.open_stream("reference", body)
+            assert isinstance(await anext(stream), ReferenceItem)
+            await stream.aclose()
+
+            resp = await client.request("reference", body)
+            assert isinstance(resp, ReferenceResponse)
+            assert len(resp.items) == 21
+            client.stop()
+
+    @pytest.mark.asyncio
+    async def test_request_after_eviction(self, monkeypatch, demo_file):
+        """A project whose client is being evicted gets a new client."""
+        monkeypatch.setattr(settings, "max_clients", 1)
+        body = OutlineRequest(file_path=demo_file).model_dump_json().encode()
+        async with Manager().run() as manager:
+            assert isinstance(
+                await manager.request("outline", body, demo_file), OutlineResponse
+            )
+            (evicted,) = manager._clients.values()
+            # Make room for a client of another project
+            manager._evict(reserve=1)
+            assert evicted.stopping
+
+            resp = await manager.request("outline", body, demo_file)
+            assert isinstance(resp, OutlineResponse)
+            replacement = manager._clients[evicted.id]
+            assert replacement is not evicted
+            assert not replacement.stopping
+            replacement.stop()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_lsp_request(self, demo_file):
+        """A cancelled request is cancelled on the server, which keeps serving."""
+        target = TargetResolver().find(demo_file)
+        assert target is not None
+        client_cls = cancellable(target.client_cls)
+        async with client_cls(workspace=target.project_path) as client:
+            symbols = ensure_capability(client, WithRequestWorkspaceSymbol)
+            with anyio.move_on_after(0.01):
+                await symbols.request_workspace_symbol_list("")
+
+            # The server's late answer is taken off the response table
+            with anyio.fail_after(5):
+                await client.get_server().wait_requests_completed()
+            outline = ensure_capability(client, WithRequestDocumentSymbol)
+            found = await outline.request_document_symbol_list(demo_file)
+            assert [s.name for s in found or ()] == ["greet"]
+
+    @pytest.mark.asyncio
+    async def test_client_in_worker(self, demo_file):
+        """A worker process answers requests and streams, and exits when stopped."""
+        target = TargetResolver().find(demo_file)
+        assert target is not None
+        client = WorkerClient(target)
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(client.run)
+            req = OutlineRequest(file_path=demo_file)
+            resp = await client.request("outline", req.model_dump_json().encode())
+            assert isinstance(resp, EncodedModel)
+            outline = OutlineResponse.model_validate_json(resp.content)
+            assert outline.file_path == demo_file
+            # The worker's tree holds its language server
+            assert client.pid is not None
+            assert process_tree_rss([client.pid])[client.pid] > 0
+
+            search = SearchRequest(query="greet").model_dump_json().encode()
+            items = [
+                SearchItem.model_validate_json(item.content)
+                async for item in await client.open_stream("search", search)
+            ]
+            assert [item.name for item in items] == ["greet"]
+
+            with pytest.raises(HTTPException) as exc_info:
+                await client.request("nope", b"{}")
+            assert exc_info.value.status_code == 404
+
+            client.stop()
+        assert not client.rpc_path.exists()
+
+    def test_capability_routed_through_manager(self, manager_process, test_file):
+        """Capability requests sent to the manager start and reach the client."""
+        with connect_manager() as mgr_client:
+            resp = mgr_client.post(
+                "/capability/outline",
+                OutlineResponse,
+                params=CapabilityTarget(path=test_file),
+                json=OutlineRequest(file_path=test_file),
+            )
+            assert resp is not None
+            assert resp.file_path == test_file
+
+            packed = mgr_client.post(
+                "/capability/outline",
+                OutlineResponse,
+                params=CapabilityTarget(path=test_file),
+                json=OutlineRequest(file_path=test_file),
+                media_type=MSGPACK_MEDIA_TYPE,
+            )
+            assert packed == resp
+
+            info = mgr_client.get("/list", ManagedClientInfoList)
+            assert info is not None
+            assert len(info.root) >= 1
+
+    def test_capability_session_usage(self, manager_process, test_file):
+        """Requests are accounted to the session they name."""
+        with connect_manager() as mgr_client:
+            mgr_client.post(
+                "/capability/outline",
+                OutlineResponse,
+                params=CapabilityTarget(path=test_file, session="agent-a"),
+                json=OutlineRequest(file_path=test_file),
+            )
+            resp = mgr_client.get("/sessions", SessionUsageList)
+
+        assert resp is not None
+        usage = {u.session: u for u in resp.root}
+        assert usage["agent-a"].completed >= 1
+        assert usage["agent-a"].in_flight == 0
+
+    def test_memory_usage(self, manager_process, test_file):
+        """The manager reports the servers it runs against its limits."""
+        with connect_manager() as mgr_client:
+            mgr_client.post(
+                "/create",
+                CreateClientResponse,
+                json=CreateClientRequest(path=test_file),
+            )
+            resp = mgr_client.get("/memory", MemoryUsage)
+
+        assert resp is not None
+        assert resp.clients >= 1
+        assert resp.peak_rss >= resp.rss
+        assert (resp.budget, resp.max_clients) == (
+            settings.memory_budget,
+            settings.max_clients,
+        )
+
+    def test_capability_batch(self, manager_process, test_file):
+        """Batched requests return one result or error per item, in order."""
+        batch = CapabilityBatchRequest(
+            items=[
+                CapabilityBatchItem(
+                    capability="outline", request={"file_path": str(test_file)}
+                ),
+                CapabilityBatchItem(capability="hover", request={}),
+                CapabilityBatchItem(capability="nope", request={}),
+            ]
+        )
+        with connect_manager() as mgr_client:
+            resp = mgr_client.post(
+                "/capability/batch",
+                CapabilityBatchResponse,
+                params=CapabilityTarget(path=test_file),
+                json=batch,
+            )
+
+        assert resp is not None
+        outline, invalid, unknown = resp.items
+        assert outline.error is None
+        assert outline.result is not None
+        assert invalid.error
+        assert unknown.error == "Unknown capability: nope"
+
+    def test_unknown_capability(self, manager_process, test_file):
+        """Unknown capability names are rejected with 404."""
+        with connect_manager() as mgr_client:
+            with pytest.raises(httpx.HTTPStatusError) as exc_info:
+                mgr_client.post(
+                    "/capability/nope",
+                    OutlineResponse,
+                    params=CapabilityTarget(path=test_file),
+                    json=OutlineRequest(file_path=test_file),
+                )
+            assert exc_info.value.response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_capability_over_rpc(self, manager_process, test_file):
+        """The framed RPC socket answers like HTTP, for concurrent requests too."""
+        target = CapabilityTarget(path=test_file)
+        req = OutlineRequest(file_path=test_file)
+        async with (
+            await connect_manager_async() as http,
+            await connect_manager_rpc() as rpc,
+        ):
+            expected = await http.post(
+                "/capability/outline", OutlineResponse, params=target, json=req
+            )
+            results: list[OutlineResponse | None] = []
+
+            async def outline() -> None:
+                results.append(
+                    await rpc.post(
+                        "/capability/outline", OutlineResponse, params=target, json=req
+                    )
+                )
+
+            async with anyio.create_task_group() as tg:
+                for _ in range(8):
+                    tg.start_soon(outline)
+            assert results == [expected] * 8
+
+            with pytest.raises(RpcError) as exc_info:
+                await rpc.post(
+                    "/capability/nope", OutlineResponse, params=target, json=req
+                )
+            assert exc_info.value.status == 404
+
+    def test_capability_cache(self, manager_process, test_file):
+        """Repeated requests are answered from the client's response cache."""
+        with connect_manager() as mgr_client:
+
+            def outline():
+                return mgr_client.post(
+                    "/capability/outline",
+                    OutlineResponse,
+                    params=CapabilityTarget(path=test_file),
+                    json=OutlineRequest(file_path=test_file),
+                )
+
+            def cache_hits():
+                infos = mgr_client.get("/list", ManagedClientInfoList)
+                assert infos is not None
+                (info,) = [i for i in infos.root if i.language == "python"]
+                assert info.cache is not None
+                return info.cache.hits
+
+            first = outline()
+            hits = cache_hits()
+            assert outline() == first
+            assert cache_hits() == hits + 1
+
+    @pytest.mark.asyncio
+    async def test_capability_stream(self, manager_process):
+        """Streamed references arrive as NDJSON events matching the full response."""
+        shared = Path(__file__).parent.parent / "src" / "lsp_cli" / "cli" / "shared.py"
+        target = CapabilityTarget(path=shared)
+        req = ReferenceRequest(locate=create_locate(f"{shared}:get_msg"))
+
+        async with await connect_manager_async() as mgr_client:
+            full = await mgr_client.post(
+                "/capability/reference", ReferenceResponse, params=target, json=req
+            )
+            events = [
+                event
+                async for event in mgr_client.stream_lines(
+                    "POST",
+                    "/capability/reference",
+                    CapabilityStreamEvent,
+                    media_type=NDJSON_MEDIA_TYPE,
+                    params=target,
+                    json=req,
+                )
+            ]
+
+        assert full is not None
+        assert events
+        assert all(event.error is None for event in events)
+        streamed = [ReferenceItem.model_validate(event.item) for event in events]
+
+        def key(item: ReferenceItem):
+            return item.location.file_path, item.location.range.start.line
+
+        assert sorted(map(key, streamed)) == sorted(map(key, full.items))
+
+    @pytest.mark.asyncio
+    async def test_stream_unsupported_capability(self, manager_process, test_file):
+        """Capabilities without a streaming variant reject NDJSON requests."""
+        async with await connect_manager_async() as mgr_client:
+            with pytest.raises(httpx.HTTPStatusError) as exc_info:
+                async for _ in mgr_client.stream_lines(
+                    "POST",
+                    "/capability/outline",
+                    CapabilityStreamEvent,
+                    media_type=NDJSON_MEDIA_TYPE,
+                    params=CapabilityTarget(path=test_file),
+                    json=OutlineRequest(file_path=test_file),
+                ):
+                    pass
+            assert exc_info.value.response.status_code == 404
+
 
 class TestAutoStartManager:
     """Test that the manager auto-starts when not running."""
@@ -401,6 +812,57 @@ class TestAutoStartManager:
             resp = client.get("/list", ManagedClientInfoList)
             assert resp is not None
 
+    def test_concurrent_cold_start(self):
+        """Concurrent cold callers converge on one manager without retries."""
+        MANAGER_UDS_PATH.unlink(missing_ok=True)
+
+        def list_clients() -> ManagedClientInfoList | None:
+            # No sleep: connect_manager returns only once the manager listens
+            with connect_manager() as client:
+                return client.get("/list", ManagedClientInfoList)
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(lambda _: list_clients(), range(6)))
+
+        assert all(resp is not None for resp in results)
+        assert is_socket_alive(MANAGER_UDS_PATH)
+
+    @pytest.mark.asyncio
+    async def test_async_cold_start_keeps_event_loop_running(self):
+        """Waiting for a new manager leaves other tasks free to run."""
+        MANAGER_UDS_PATH.unlink(missing_ok=True)
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                await anyio.sleep(0.01)
+                ticks += 1
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(tick)
+            client = await connect_manager_async()
+            assert ticks > 0
+            async with client:
+                assert await client.get("/list", ManagedClientInfoList) is not None
+            tg.cancel_scope.cancel()
+
+    @pytest.mark.asyncio
+    async def test_pool_restarts_manager(self, test_file):
+        """A pool whose manager went away starts a new one and retries once."""
+        async with ClientPool() as pool:
+            # The old manager keeps running but can no longer be reached
+            MANAGER_UDS_PATH.unlink(missing_ok=True)
+            resp = await pool.post(
+                test_file,
+                None,
+                "/capability/outline",
+                OutlineResponse,
+                json=OutlineRequest(file_path=test_file),
+            )
+        assert resp is not None
+        assert is_socket_alive(MANAGER_UDS_PATH)
+
 
 class TestErrorHandling:
     """Test error handling in server management."""
@@ -0,0 +1,174 @@
+from pathlib import Path
+
+import pytest
+from lsap.schema.models import Position, Range, SymbolDetailInfo, SymbolKind
+from lsap.schema.outline import OutlineResponse
+from lsprotocol import types as lsp_type
+
+from lsp_cli.manager.outline import OutlineFilterRequest
+from lsp_cli.manager.snapshot import OutlineSnapshot, to_declarations
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_text("class A:\n    def f(self): ...\n")
+    return path
+
+
+def outline(path, *names: str, kind=SymbolKind.Class) -> OutlineResponse:
+    pos = Position(line=1, character=1)
+    return OutlineResponse(
+        file_path=path,
+        items=[
+            SymbolDetailInfo(
+                file_path=path,
+                name=name.rpartition(".")[2],
+                path=name.split("."),
+                kind=kind,
+                range=Range(start=pos, end=pos),
+                hover=f"class {name}",
+            )
+            for name in names
+        ],
+    )
+
+
+def test_outline_round_trip_until_file_changes(tmp_path, source):
+    snapshot = OutlineSnapshot.open(tmp_path / "snap.sqlite", 1 << 20)
+    assert snapshot.get_outline(source) is None
+
+    resp = outline(source, "A")
+    snapshot.put_outline(snapshot.digest(source) or "", resp)
+    assert snapshot.get_outline(source) == resp
+
+    source.write_text("class B: ...\n")
+    assert snapshot.get_outline(source) is None
+
+
+def test_survives_reopen(tmp_path, source):
+    path = tmp_path / "snap.sqlite"
+    snapshot = OutlineSnapshot.open(path, 1 << 20)
+    snapshot.put_outline(snapshot.digest(source) or "", outline(source, "A"))
+    size = snapshot.size
+    snapshot.close()
+
+    reopened = OutlineSnapshot.open(path, 1 << 20)
+    assert reopened.size == size
+    assert reopened.get_outline(source) == outline(source, "A")
+
+
+def test_declarations(tmp_path, source):
+    def rng(line: int, character: int) -> lsp_type.Range:
+        pos = lsp_type.Position(line=line, character=character)
+        return lsp_type.Range(start=pos, end=pos)
+
+    method = lsp_type.DocumentSymbol(
+        name="f",
+        kind=lsp_type.SymbolKind.Method,
+        range=rng(1, 4),
+        selection_range=rng(1, 8),
+    )
+    cls = lsp_type.DocumentSymbol(
+        name="A",
+        kind=lsp_type.SymbolKind.Class,
+        range=rng(0, 0),
+        selection_range=rng(0, 6),
+        children=[method],
+    )
+    declarations = to_declarations([cls])
+
+    snapshot = OutlineSnapshot.open(tmp_path / "snap.sqlite", 1 << 20)
+    snapshot.put_symbols(source, snapshot.digest(source) or "", declarations)
+    loaded = snapshot.get_symbols(source)
+    assert loaded == declarations
+    assert [(d.path, d.selection_start) for d in loaded] == [
+        (["A"], lsp_type.Position(line=0, character=6)),
+        (["A", "f"], lsp_type.Position(line=1, character=8)),
+    ]
+
+
+def test_evicts_least_recently_used(tmp_path):
+    files = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.py"
+        path.write_text(name)
+        files.append(path)
+    a, b, c = files
+
+    size = len(OutlineSnapshot.encode_outline(outline(a, "A" * 100)))
+    snapshot = OutlineSnapshot.open(tmp_path / "snap.sqlite", size * 2 + size // 2)
+    for path in (a, b):
+        snapshot.put_outline(snapshot.digest(path) or "", outline(path, "A" * 100))
+    assert snapshot.get_outline(a) is not None  # now most recently used
+    snapshot.put_outline(snapshot.digest(c) or "", outline(c, "A" * 100))
+
+    assert snapshot.get_outline(b) is None
+    assert snapshot.get_outline(a) is not None
+    assert snapshot.get_outline(c) is not None
+    assert snapshot.size <= size * 2 + size // 2
+
+
+def test_outline_filter_prunes_by_kind_and_depth(tmp_path, source):
+    full = outline(source, "A", "A.B", "A.B.C")
+    full.items.append(outline(source, "A.x", kind=SymbolKind.Variable).items[0])
+
+    def names(req: OutlineFilterRequest) -> list[str]:
+        return [".".join(item.path) for item in req.prune(full).items]
+
+    assert names(OutlineFilterRequest(file_path=source)) == [
+        "A",
+        "A.B",
+        "A.B.C",
+        "A.x",
+    ]
+    assert names(OutlineFilterRequest(file_path=source, kinds=[SymbolKind.Class])) == [
+        "A",
+        "A.B",
+        "A.B.C",
+    ]
+    assert names(OutlineFilterRequest(file_path=source, max_depth=2)) == [
+        "A",
+        "A.B",
+        "A.x",
+    ]
+
+    # Equivalent filters share one cache key and snapshot view
+    kinds = [SymbolKind.Function, SymbolKind.Class, SymbolKind.Class]
+    a = OutlineFilterRequest(file_path=source, kinds=kinds)
+    b = OutlineFilterRequest(file_path=source, kinds=kinds[:2][::-1])
+    assert a == b and a.view == b.view != "outline"
+
+
+def test_filtered_outline_views(tmp_path, source):
+    snapshot = OutlineSnapshot.open(tmp_path / "snap.sqlite", 1 << 20)
+    digest = snapshot.digest(source) or ""
+    top = OutlineFilterRequest(file_path=source, max_depth=1)
+
+    # A stored full outline answers any filter
+    snapshot.put_outline(digest, outline(source, "A", "A.B"))
+    assert snapshot.outline(top) == outline(source, "A")
+
+    # A view only answers its own filter
+    snapshot = OutlineSnapshot.open(tmp_path / "views.sqlite", 1 << 20)
+    snapshot.put_outline(digest, outline(source, "A"), top.view)
+    assert snapshot.outline(top) == outline(source, "A")
+    assert snapshot.outline(OutlineFilterRequest(file_path=source)) is None
+
+
+def test_lookups_do_not_write_or_rehash(tmp_path, source, monkeypatch):
+    snapshot = OutlineSnapshot.open(tmp_path / "snap.sqlite", 1 << 20)
+    snapshot.put_outline(snapshot.digest(source) or "", outline(source, "A"))
+    changes = snapshot._db.total_changes
+
+    def read_bytes(self):
+        raise AssertionError(f"{self} read again")
+
+    with monkeypatch.context() as m:
+        m.setattr(Path, "read_bytes", read_bytes)
+        assert snapshot.get_outline(source) == outline(source, "A")
+    assert snapshot._db.total_changes == changes
+
+    # A changed file is hashed again
+    source.write_text("class A: ...\n")
+    assert snapshot.get_outline(source) is None
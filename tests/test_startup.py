@@ -0,0 +1,92 @@
+"""
+Startup-time regression tests for the CLI.
+
+Each subcommand is resolved lazily, so running one must not import the others
+or any of the server-side modules that only the manager process needs.
+"""
+
+import subprocess
+import sys
+import time
+
+import pytest
+
+# Only the manager process should ever load these
+SERVER_SIDE_MODULES = ("litestar", "uvicorn", "lsp_client.clients.lang")
+
+# Generous ceilings: they catch a regression back to eager imports, not noise
+MAX_MODULES = 1100
+MAX_SECONDS = 5.0
+
+SUBCOMMANDS = [
+    (),
+    ("server", "list"),
+    ("rename", "preview"),
+    ("definition",),
+    ("doc",),
+    ("locate",),
+    ("reference",),
+    ("outline",),
+    ("symbol",),
+    ("search",),
+    ("batch",),
+    ("serve",),
+]
+
+
+# Dump the loaded modules on exit, after the subcommand has been resolved
+PROFILE_SCRIPT = """
+import atexit, sys
+atexit.register(lambda: print(*sys.modules, sep="\\n", file=sys.stderr))
+from lsp_cli.__main__ import run
+run()
+"""
+
+
+def import_profile(*args: str) -> tuple[list[str], float]:
+    """Run `lsp <args> --help` and return the imported modules and wall time."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", PROFILE_SCRIPT, *args, "--help"],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    elapsed = time.perf_counter() - start
+    assert result.returncode == 0, result.stderr
+    return result.stderr.splitlines(), elapsed
+
+
+@pytest.mark.parametrize("args", SUBCOMMANDS, ids=lambda a: " ".join(a) or "lsp")
+def test_subcommand_startup(args, record_property):
+    modules, elapsed = import_profile(*args)
+    record_property("imported_modules", len(modules))
+    record_property("wall_time", round(elapsed, 3))
+
+    loaded = [m for m in modules if m.startswith(SERVER_SIDE_MODULES)]
+    assert not loaded, f"server-side modules imported: {loaded[:5]}"
+    assert len(modules) <= MAX_MODULES
+    assert elapsed <= MAX_SECONDS
+
+
+def test_subcommands_are_imported_lazily():
+    modules, _ = import_profile("server", "list")
+    assert "lsp_cli.server" in modules
+    commands = [m for m in modules if m.startswith("lsp_cli.cli.")]
+    assert commands == ["lsp_cli.cli.main"]
+    assert not [m for m in modules if m.startswith("lsap")]
+
+
+@pytest.mark.parametrize("args", SUBCOMMANDS[1:], ids=" ".join)
+def test_subcommand_help_uses_root_settings(args):
+    result = subprocess.run(
+        [sys.executable, "-m", "lsp_cli", *args, "--help"],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "--install-completion" not in result.stdout
+    assert "--show-completion" not in result.stdout
+    # Plain help, as the root app disables rich markup
+    assert "╭" not in result.stdout
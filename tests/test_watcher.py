@@ -0,0 +1,147 @@
+from pathlib import Path
+
+import anyio
+import pytest
+from loguru import logger
+from lsp_client.client.document_state import DocumentStateManager
+from lsprotocol import types as lsp_type
+from watchfiles import Change
+
+from lsp_cli.manager.cache import ResponseCache
+from lsp_cli.manager.watcher import WorkspaceWatcher, coalesce, content_change
+
+
+def apply(text: str, change: lsp_type.TextDocumentContentChangePartial) -> str:
+    """Apply an LSP edit, counting characters in UTF-16 code units."""
+    lines = text.splitlines(keepends=True) or [""]
+
+    def offset(pos: lsp_type.Position) -> int:
+        line = lines[pos.line] if pos.line < len(lines) else ""
+        units = line.encode("utf-16-le")[: pos.character * 2].decode("utf-16-le")
+        return sum(len(x) for x in lines[: pos.line]) + len(units)
+
+    start, end = offset(change.range.start), offset(change.range.end)
+    return text[:start] + change.text + text[end:]
+
+
+@pytest.mark.parametrize(
+    ("old", "new"),
+    [
+        ("a = 1\nb = 2\n", "a = 1\nb = 3\n"),
+        ("a = 1\n", "x = 0\na = 1\n"),
+        ("a = 1\nb = 2\n", "a = 1\n"),
+        ("", "print()\n"),
+        ("same\n", "same\n"),
+        ("s = '😀'\nt = 1\n", "s = '😀😀'\nt = 1\n"),
+        ("a\r\nb\r\n", "a\r\nc\r\n"),
+        ("aaaa", "aa"),
+    ],
+)
+def test_content_change_round_trips(old, new):
+    change = content_change(old, new)
+    assert apply(old, change) == new
+
+
+def test_content_change_is_minimal():
+    change = content_change("def f():\n    return 1\n", "def f():\n    return 2\n")
+    assert change.range.start == lsp_type.Position(line=1, character=11)
+    assert change.range.end == lsp_type.Position(line=1, character=12)
+    assert change.text == "2"
+
+
+def test_content_change_counts_utf16_units():
+    change = content_change("x = '😀'\n", "x = '😀!'\n")
+    # The emoji is a surrogate pair, so it takes two code units
+    assert change.range.start == lsp_type.Position(line=0, character=7)
+
+
+def test_coalesce(tmp_path):
+    created, changed, deleted = (tmp_path / n for n in ("new.py", "mod.py", "gone.py"))
+    created.write_text("")
+    changed.write_text("")
+
+    result = coalesce(
+        [
+            (Change.added, str(created)),
+            (Change.modified, str(created)),
+            (Change.modified, str(changed)),
+            (Change.added, str(deleted)),
+            (Change.deleted, str(deleted)),
+        ]
+    )
+    assert result == {
+        created: lsp_type.FileChangeType.Created,
+        changed: lsp_type.FileChangeType.Changed,
+        deleted: lsp_type.FileChangeType.Deleted,
+    }
+
+
+class RecordingClient:
+    """Just enough of a language client to observe what the watcher sends."""
+
+    def __init__(self) -> None:
+        self.document_state = DocumentStateManager()
+        self.notifications: list[object] = []
+
+    def as_uri(self, path: Path) -> str:
+        return path.as_uri()
+
+    async def notify(self, msg: object) -> None:
+        self.notifications.append(msg)
+
+
+@pytest.mark.asyncio
+async def test_forward_invalidates_cache_and_notifies(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_text("a = 1\n")
+    cache = ResponseCache(max_bytes=1 << 20, watched=True)
+    cache.put("outline", None, [path])
+    cache.put("refs", None, [tmp_path / "b.py"], workspace=True)
+
+    client = RecordingClient()
+    watcher = WorkspaceWatcher(tmp_path, client, logger, cache=cache)  # ty: ignore[invalid-argument-type]
+    await watcher.forward({path: lsp_type.FileChangeType.Changed})
+
+    assert cache.stats.entries == 0
+    [msg] = client.notifications
+    assert isinstance(msg, lsp_type.DidChangeWatchedFilesNotification)
+    assert msg.params.changes == [
+        lsp_type.FileEvent(uri=path.as_uri(), type=lsp_type.FileChangeType.Changed)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_change_storm_is_forwarded_once(tmp_path):
+    paths = [tmp_path / f"m{i}.py" for i in range(6)]
+    for path in paths:
+        path.write_text("")
+    cache = ResponseCache(max_bytes=1 << 20, watched=True)
+    client = RecordingClient()
+    watcher = WorkspaceWatcher(tmp_path, client, logger, cache=cache, storm_threshold=4)  # ty: ignore[invalid-argument-type]
+
+    await watcher.handle({(Change.modified, str(p)) for p in paths[:2]})
+    assert not watcher.storming
+    assert len(client.notifications) == 1
+
+    await watcher.handle({(Change.modified, str(p)) for p in paths[:4]})
+    await watcher.handle({(Change.added, str(p)) for p in paths[3:]})
+    assert watcher.storming
+    assert cache.paused
+    assert len(client.notifications) == 1
+
+    # Requests are held until the storm settles
+    with anyio.move_on_after(0.05) as scope:
+        await watcher.settled()
+    assert scope.cancelled_caught
+
+    await watcher.handle(set())
+    assert not watcher.storming
+    assert not cache.paused
+    await watcher.settled()
+
+    [_, msg] = client.notifications
+    assert isinstance(msg, lsp_type.DidChangeWatchedFilesNotification)
+    assert {e.uri: e.type for e in msg.params.changes} == {
+        **{p.as_uri(): lsp_type.FileChangeType.Changed for p in paths[:3]},
+        **{p.as_uri(): lsp_type.FileChangeType.Created for p in paths[3:]},
+    }
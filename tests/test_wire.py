@@ -0,0 +1,28 @@
+import pytest
+from lsap.schema.models import Location, Position, Range
+from lsap.schema.reference import ReferenceItem
+
+from lsp_cli.utils.http import (
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    decode_model,
+    encode_model,
+)
+
+
+@pytest.mark.parametrize("media_type", [JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE])
+def test_round_trip(tmp_path, media_type):
+    pos = Position(line=3, character=1)
+    item = ReferenceItem(
+        location=Location(file_path=tmp_path / "a.py", range=Range(start=pos, end=pos)),
+        code="x = '😀'\n",
+    )
+    data = encode_model(item, media_type)
+    assert decode_model(ReferenceItem, data, media_type) == item
+
+
+def test_decode_null():
+    assert decode_model(ReferenceItem, b"null", JSON_MEDIA_TYPE) is None
+    assert decode_model(ReferenceItem, b"\xc0", MSGPACK_MEDIA_TYPE) is None
+    # Response content types may carry parameters
+    assert decode_model(ReferenceItem, b"\xc0", MSGPACK_MEDIA_TYPE + "; v=1") is None